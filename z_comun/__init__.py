@@ -0,0 +1,6 @@
+"""
+Código compartido por los ETL IRIS → MySQL / Excel / Google Sheets.
+
+Los scripts se ejecutan desde la raíz del proyecto (ver crontab.txt), por
+lo que agregan esa carpeta a sys.path antes de importar z_comun.
+"""
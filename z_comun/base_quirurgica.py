@@ -0,0 +1,333 @@
+"""
+Base quirúrgica compartida (RB_OperatingRoom + OR_Anaesthesia +
+OR_Anaest_Operation + OR_An_Oper_SecondaryProc).
+
+Los procesos de pabellón recorrían el mismo grafo de joins en IRIS, cada
+uno con sus predicados. Aquí se extrae una vez por ciclo, con los valores
+tal como los entrega IRIS (fechas 'AAAA-MM-DD', horas 'HH:MM:SS', '' para
+NULL), y se guarda en Parquet por mes de la fecha base de cada fila, la
+mayor entre RBOP_DateOper y ANA_TheatreInDate:
+
+    <PABELLON_BASE_DIR>/<AAAA-MM>.parquet
+    <PABELLON_BASE_DIR>/feriados.parquet     CT_PubHol, una fila por fecha
+
+La base no filtra más que el hospital: cada proceso aplica en pandas sus
+propios predicados (RBOP_DateOper o ANA_TheatreInDate desde su fecha,
+RBOP_RowId > 0, ...) y su proyección. Los que mostraban feriados los
+cruzan con leer_feriados().
+
+Actualización:
+    - la primera vez se extrae desde PABELLON_BASE_DESDE,
+    - después solo los meses desde hoy - PABELLON_BASE_VENTANA_DIAS (datos
+      que todavía cambian); los meses anteriores quedan como están. Como el
+      mes es el de la fecha base, se vuelve a extraer toda fila con
+      agendamiento o ingreso a quirófano reciente,
+    - si una fila cambia de mes (p. ej. se registra el ingreso a quirófano
+      de una cirugía agendada hace meses), leer_base() descarta la copia
+      antigua que quedó en el mes anterior,
+    - la base se considera vigente por PABELLON_BASE_VIGENCIA_HORAS: el
+      primer proceso del ciclo la actualiza y los siguientes la reutilizan.
+      Un bloqueo evita que dos procesos la extraigan a la vez.
+
+Uso en cron, antes de los procesos de pabellón (desde la raíz del proyecto):
+    python -m z_comun.base_quirurgica
+"""
+import os
+import glob
+import json
+import time
+import logging
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from z_comun.iris import consultar, consultar_por_ventanas, ventanas_fechas, cerrar_iris
+from z_comun.intermedios import guardar_tabla, leer_tabla, bloqueo
+
+load_dotenv()
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+PABELLON_BASE_DIR = os.getenv('PABELLON_BASE_DIR', 'z_pabellon/base_quirurgica')
+
+# Antes de la fecha histórica más antigua de los procesos (2025-01-01). Se
+# compara con la fecha base: incluye toda cirugía agendada u operada desde aquí
+PABELLON_BASE_DESDE = os.getenv('PABELLON_BASE_DESDE', '2024-10-01')
+PABELLON_BASE_VENTANA_DIAS = int(os.getenv('PABELLON_BASE_VENTANA_DIAS', 90))
+PABELLON_BASE_VIGENCIA_HORAS = float(os.getenv('PABELLON_BASE_VIGENCIA_HORAS', 6))
+
+ARCHIVO_ESTADO = 'estado.json'
+ARCHIVO_FERIADOS = 'feriados.parquet'
+
+# Sube cuando cambia la consulta o la partición: fuerza una extracción completa
+VERSION_BASE = 2
+
+# Identifican una fila del LEFT JOIN, de la tabla padre a la hija
+CLAVES = ["RBOP_RowId", "ANA_RowId", "ANAOP_RowId", "SECPR_RowId"]
+
+QUERY_BASE = """
+    SELECT %nolock
+        RBOP_RowId,
+        RBOP_PAADM_DR->PAADM_ADMNO AS PAADM_ADMNo,
+        RBOP_PAADM_DR->PAADM_Type AS PAADM_Type,
+        RBOP_PAADM_DR->PAADM_AdmDate AS PAADM_AdmDate,
+        RBOP_PAADM_DR->PAADM_EpisSubType_DR->SUBT_Desc AS SUBT_Desc,
+        RBOP_PAADM_DR->PAADM_PAPMI_DR->PAPMI_ID AS PAPMI_ID,
+        RBOP_PAADM_DR->PAADM_PAPMI_DR->PAPMI_PAPER_DR->PAPER_Name2 AS PAPER_Name2,
+        RBOP_PAADM_DR->PAADM_PAPMI_DR->PAPMI_PAPER_DR->PAPER_Name AS PAPER_Name,
+        RBOP_PAADM_DR->PAADM_PAPMI_DR->PAPMI_PAPER_DR->PAPER_Name3 AS PAPER_Name3,
+        RBOP_PAADM_DR->PAADM_PAPMI_DR->PAPMI_PAPER_DR->PAPER_Dob AS PAPER_Dob,
+        RBOP_PAADM_DR->PAADM_PAPMI_DR->PAPMI_PAPER_DR->PAPER_AgeYr AS PAPER_AgeYr,
+        RBOP_PAADM_DR->PAADM_PAPMI_DR->PAPMI_PAPER_DR->PAPER_Sex_DR->CTSEX_Desc AS Sexo_Desc,
+        RBOP_DateOper,
+        RBOP_TimeOper,
+        RBOP_Status,
+        RBOP_BookingType,
+        RBOP_DaySurgery,
+        RBOP_EstimatedTime,
+        RBOP_PreopTestDone,
+        RBOP_YesNo3,
+        RBOP_Appoint_DR,
+        RBOP_PreOpDiagnosis,
+        RBOP_PreopDiagn_DR->MRCID_Desc AS PreopDiagn_Desc,
+        RBOP_PreopDiagn_DR->MRCID_Code AS PreopDiagn_Code,
+        RBOP_ReasonSuspend_DR->SUSP_Desc AS Suspension_Desc,
+        RBOP_Resource_DR,
+        RBOP_Resource_DR->RES_Desc AS Recurso_Desc,
+        RBOP_Loc_DR->CTLOC_Desc AS Local_Desc,
+        RBOP_OperDepartment_DR->CTLOC_Dep_DR->DEP_Desc AS Especialidad_Desc,
+        RBOP_Operation_DR->OPER_Code AS RBOP_Oper_Code,
+        RBOP_Operation_DR->OPER_Desc AS RBOP_Oper_Desc,
+        RBOP_Surgeon_DR->CTPCP_Desc AS RBOP_Cirujano_Desc,
+        RBOP_Priority_DR->RBP_Desc AS Prioridad_Desc,
+        ANA_RowId,
+        ANA_TheatreInDate,
+        ANA_TheatreInTime,
+        ANA_TheatreOutDate,
+        ANA_TheatreOutTime,
+        ANA_CustomDate1,
+        ANA_CustomTime1,
+        ANA_CustomDate2,
+        ANA_CustomTime2,
+        ANA_PACU_StartDate,
+        ANA_PACU_StartTime,
+        ANA_PACU_FinishDate,
+        ANA_PACU_FinishTime,
+        ANA_AreaInDate,
+        ANA_AreaInTime,
+        ANA_Anest_Duration,
+        ANA_Method->ANMET_Desc AS Anestesia_Desc,
+        ANAOP_RowId,
+        ANAOP_No,
+        OR_Anaest_Operation.ANAOP_Notes,
+        ANAOP_Status,
+        ANAOP_OperType,
+        ANAOP_CancelReason,
+        ANAOP_Type_DR->OPER_Code AS ANAOP_Oper_Code,
+        ANAOP_Type_DR->OPER_Desc AS ANAOP_Oper_Desc,
+        ANAOP_Depar_Oper_DR->CTLOC_Code AS Equipo_Code,
+        ANAOP_Depar_Oper_DR->CTLOC_Desc AS Equipo_Desc,
+        ANAOP_OpStartDate,
+        ANAOP_OpStartTime,
+        ANAOP_OpEndDate,
+        ANAOP_OpEndTime,
+        ANAOP_BodySite_DR->BODS_Desc AS Sitio_Desc,
+        ANAOP_Surgeon_DR->CTPCP_Code AS Cirujano_Code,
+        ANAOP_Surgeon_DR->CTPCP_Desc AS Cirujano_Desc,
+        ANAOP_SecondSurgeon_DR->CTPCP_Code AS Cirujano2_Code,
+        SECPR_RowId,
+        SECPR_Operation_DR->OPER_Code AS SECPR_Oper_Code,
+        SECPR_Operation_DR->OPER_Desc AS SECPR_Oper_Desc
+    FROM RB_OperatingRoom
+    LEFT JOIN OR_Anaesthesia ON RBOP_PAADM_DR = ANA_PAADM_ParRef
+    LEFT JOIN OR_Anaest_Operation ON ANA_RowId = ANAOP_Par_Ref
+    LEFT JOIN OR_An_Oper_SecondaryProc ON ANAOP_RowId = SECPR_ParRef
+    WHERE (RBOP_DateOper >= '{desde}' OR ANA_TheatreInDate >= '{desde}')
+      AND (RBOP_DateOper IS NULL OR RBOP_DateOper < '{hasta}')
+      AND (ANA_TheatreInDate IS NULL OR ANA_TheatreInDate < '{hasta}')
+      AND RBOP_PAADM_DR->PAADM_DepCode_DR->CTLOC_Hospital_DR = 10448
+"""
+
+# Agrupado: un código repetido en CT_PubHol no multiplica las cirugías
+QUERY_FERIADOS = """
+    SELECT %nolock CTHOL_Code, MIN(CTHOL_Desc) AS CTHOL_Desc
+    FROM CT_PubHol
+    GROUP BY CTHOL_Code
+"""
+
+
+# ============================================================
+# ARCHIVOS
+# ============================================================
+def _ruta(nombre):
+    return os.path.join(PABELLON_BASE_DIR, nombre)
+
+
+def _ruta_mes(mes):
+    return _ruta(f"{mes:%Y-%m}.parquet")
+
+
+def _meses_guardados():
+    meses = []
+    for ruta in glob.glob(_ruta("????-??.parquet")):
+        nombre = os.path.splitext(os.path.basename(ruta))[0]
+        meses.append(datetime.strptime(nombre, "%Y-%m").date())
+    return sorted(meses)
+
+
+def _primer_dia(fecha):
+    return fecha.replace(day=1)
+
+
+def leer_estado():
+    try:
+        with open(_ruta(ARCHIVO_ESTADO), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def vigente(horas=PABELLON_BASE_VIGENCIA_HORAS):
+    estado = leer_estado()
+    if not estado or estado.get('version') != VERSION_BASE:
+        return False
+    actualizada = datetime.fromisoformat(estado['actualizada'])
+    return datetime.now() - actualizada < timedelta(hours=horas)
+
+
+# ============================================================
+# ACTUALIZACIÓN
+# ============================================================
+def actualizar_base(completa=False, hoy=None):
+    """
+    Extrae de IRIS los meses pendientes y los que todavía cambian, y los
+    reemplaza en disco (un Parquet por mes). Devuelve las filas extraídas.
+    """
+    hoy = hoy or date.today()
+    historico = _primer_dia(date.fromisoformat(PABELLON_BASE_DESDE))
+    guardados = set(_meses_guardados())
+    estado = leer_estado()
+    if not estado or estado.get('version') != VERSION_BASE:
+        logging.info(f"Base quirúrgica: versión {VERSION_BASE}, se extrae completa")
+        completa = True
+
+    meses = [v[0] for v in ventanas_fechas(historico, hoy + timedelta(days=1), meses=1)]
+    refresco = _primer_dia(hoy - timedelta(days=PABELLON_BASE_VENTANA_DIAS))
+    faltantes = [m for m in meses if m not in guardados]
+    desde = min(faltantes + [max(refresco, historico)]) if not completa else historico
+    pendientes = [m for m in meses if m >= desde]
+    logging.info(f"Base quirúrgica: extracción desde {desde} ({len(pendientes)} meses)")
+
+    inicio = time.perf_counter()
+    _, feriados = consultar(QUERY_FERIADOS)
+    guardar_tabla(pd.DataFrame(feriados, columns=["CTHOL_Code", "CTHOL_Desc"], dtype=object),
+                  _ruta(ARCHIVO_FERIADOS))
+
+    total = 0
+    # Ventanas mensuales en orden; la última queda abierta (cirugías futuras)
+    for mes, (columnas, filas) in zip(pendientes, consultar_por_ventanas(QUERY_BASE, desde)):
+        df = pd.DataFrame(filas, columns=columnas, dtype=object)
+        guardar_tabla(df, _ruta_mes(mes))
+        total += len(df)
+
+    # Meses posteriores al actual (de una corrida con otra fecha) ya quedaron
+    # incluidos en la ventana abierta
+    for mes in guardados:
+        if mes > pendientes[-1]:
+            os.remove(_ruta_mes(mes))
+
+    with open(_ruta(ARCHIVO_ESTADO), 'w', encoding='utf-8') as f:
+        json.dump({
+            'actualizada': datetime.now().isoformat(timespec='seconds'),
+            'version': VERSION_BASE,
+            'desde': desde.isoformat(),
+            'filas': total,
+        }, f)
+    logging.info(f"Base quirúrgica: {total} filas en {time.perf_counter() - inicio:.2f}s")
+    return total
+
+
+def asegurar_base(horas=PABELLON_BASE_VIGENCIA_HORAS):
+    """Actualiza la base si no está vigente (una sola vez aunque la pidan varios procesos)."""
+    if vigente(horas):
+        return
+    with bloqueo(PABELLON_BASE_DIR):
+        # Otro proceso pudo actualizarla mientras se esperaba el bloqueo
+        if not vigente(horas):
+            actualizar_base()
+
+
+def _depurar(base):
+    """
+    Quita las copias antiguas de filas que cambiaron de mes: la misma fila
+    en dos meses (queda la del más reciente, recién extraído) y la fila sin
+    hija del LEFT JOIN cuando el padre ya tiene hijas (p. ej. la cirugía
+    sin protocolo anestésico que después lo tuvo).
+    """
+    base = base.drop_duplicates(CLAVES, keep='last')
+    for i in range(1, len(CLAVES)):
+        padre, hija = CLAVES[:i], CLAVES[i]
+        sin_hija = base[hija].fillna('') == ''
+        con_hijas = pd.MultiIndex.from_frame(base.loc[~sin_hija, padre])
+        huerfana = pd.MultiIndex.from_frame(base.loc[sin_hija, padre]).isin(con_hijas)
+        base = base.drop(base.index[sin_hija][huerfana])
+    return base
+
+
+def leer_base(columnas=None, desde=None, horas=PABELLON_BASE_VIGENCIA_HORAS):
+    """
+    DataFrame (texto) con la base vigente. 'desde' (date o 'AAAA-MM-DD')
+    solo descarta los meses de fecha base anteriores (no hay filas con
+    RBOP_DateOper ni ANA_TheatreInDate posteriores en ellos); el filtro
+    exacto lo hace cada proceso.
+    """
+    asegurar_base(horas)
+    if isinstance(desde, str):
+        desde = date.fromisoformat(desde)
+
+    leidas = None if columnas is None else list(dict.fromkeys(list(columnas) + CLAVES))
+    partes = [
+        leer_tabla(_ruta_mes(mes), leidas)
+        for mes in _meses_guardados()
+        if desde is None or mes >= _primer_dia(desde)
+    ]
+    partes = [p for p in partes if len(p)]
+    if not partes:
+        return pd.DataFrame(columns=columnas or [])
+    base = _depurar(pd.concat(partes, ignore_index=True)).reset_index(drop=True)
+    return base if columnas is None else base[list(columnas)]
+
+
+def leer_feriados(horas=PABELLON_BASE_VIGENCIA_HORAS):
+    """CT_PubHol (CTHOL_Code 'AAAA-MM-DD', CTHOL_Desc), una fila por fecha."""
+    asegurar_base(horas)
+    return leer_tabla(_ruta(ARCHIVO_FERIADOS)).fillna('')
+
+
+# ============================================================
+# FORMATO (equivalentes a las conversiones de IRIS)
+# ============================================================
+def fecha_dmy(serie):
+    """'AAAA-MM-DD' -> 'DD-MM-AAAA' (CONVERT(VARCHAR, fecha, 105)); '' se mantiene."""
+    serie = serie.fillna('').astype(str)
+    convertida = serie.str.slice(8, 10) + '-' + serie.str.slice(5, 7) + '-' + serie.str.slice(0, 4)
+    return convertida.where(serie != '', '')
+
+
+def mapear(serie, valores, otro=''):
+    """CASE columna WHEN ... THEN ... ELSE otro."""
+    return serie.map(valores).fillna(otro)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(threadName)s - %(levelname)s - %(message)s'
+    )
+    try:
+        with bloqueo(PABELLON_BASE_DIR):
+            actualizar_base(completa=os.getenv('ETL_CARGA_COMPLETA', '0') == '1')
+    finally:
+        cerrar_iris()
@@ -0,0 +1,470 @@
+"""
+Carga masiva a MySQL.
+
+Las filas se acumulan en bloques y cada bloque se escribe a un TSV temporal
+que se ingiere con LOAD DATA LOCAL INFILE (una sola sentencia, sin
+round-trips por fila). Si el servidor o el cliente tienen LOCAL INFILE
+deshabilitado se cae a INSERT multi-fila. LOAD DATA LOCAL no falla por
+valores truncados o claves duplicadas (solo deja advertencias); se revisan
+y se falla igual que lo haría el INSERT.
+
+La conexión debe abrirse con allow_local_infile=True.
+
+MYSQL_CARGA=insert fuerza el INSERT multi-fila.
+
+Para recargas completas, carga_publicada() escribe en <tabla>__staging,
+crea los índices secundarios una sola vez al final y publica con un único
+RENAME TABLE: los lectores nunca ven la tabla vacía ni a medio cargar.
+
+FusionMySQL actualiza por clave natural: solo escribe filas nuevas o cuyo
+hash de contenido cambió y borra las que ya no vienen en la extracción.
+"""
+import os
+import time
+import hashlib
+import logging
+import tempfile
+from datetime import datetime
+from contextlib import contextmanager
+
+import mysql.connector
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MYSQL_CARGA = os.getenv('MYSQL_CARGA', 'infile')
+MYSQL_FILAS_POR_CARGA = int(os.getenv('MYSQL_FILAS_POR_CARGA', 50000))
+MYSQL_FILAS_POR_INSERT = int(os.getenv('MYSQL_FILAS_POR_INSERT', 1000))
+
+# LOCAL INFILE deshabilitado en servidor (1148, 3948) o rechazado en cliente (2068)
+ERRORES_INFILE = (1148, 2068, 3948)
+
+
+def conectar_mysql():
+    """Conexión MySQL con las variables DB_MYSQL_* y LOCAL INFILE habilitado."""
+    host = os.getenv('DB_MYSQL_HOST')
+    user = os.getenv('DB_MYSQL_USER')
+    password = os.getenv('DB_MYSQL_PASSWORD')
+    database = os.getenv('DB_MYSQL_DATABASE')
+    if not host or not user or not password or not database:
+        raise ValueError("Variables MySQL no configuradas correctamente.")
+    return mysql.connector.connect(
+        host=host,
+        port=int(os.getenv('DB_MYSQL_PORT', 3306)),
+        user=user,
+        password=password,
+        database=database,
+        allow_local_infile=True
+    )
+
+
+_ESCAPES_TSV = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\0': '\\0',
+})
+
+
+def escapar_tsv(valor):
+    """Valor -> campo TSV con los escapes por defecto de LOAD DATA (NULL -> \\N)."""
+    if valor is None:
+        return '\\N'
+    if isinstance(valor, datetime):
+        return valor.strftime('%Y-%m-%d %H:%M:%S')
+    return str(valor).translate(_ESCAPES_TSV)
+
+
+def _ruta_sql(ruta):
+    return ruta.replace('\\', '/').replace("'", "\\'")
+
+
+class CargaMySQL:
+    """
+    Carga filas (listas o tuplas en el orden de 'columnas', o de la tabla si
+    no se indican) en bloques de 'filas_por_carga'. Hace commit por bloque,
+    salvo commit_por_bloque=False (el commit queda a cargo de quien llama).
+
+        with CargaMySQL(conn_mysql, "tabla") as carga:
+            for lote in lotes:
+                carga.agregar(lote)
+    """
+
+    def __init__(self, conn, tabla, columnas=None,
+                 filas_por_carga=MYSQL_FILAS_POR_CARGA, modo=MYSQL_CARGA,
+                 commit_por_bloque=True):
+        self.conn = conn
+        self.tabla = tabla
+        self.columnas = list(columnas) if columnas else None
+        self.filas_por_carga = filas_por_carga
+        self.modo = modo
+        self.commit_por_bloque = commit_por_bloque
+        self.total = 0
+        self._buffer = []
+        self._segundos = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        # Si hubo error no se vuelca lo pendiente
+        if tipo is None:
+            self.cerrar()
+        return False
+
+    def agregar(self, filas):
+        self._buffer.extend(filas)
+        if len(self._buffer) >= self.filas_por_carga:
+            self._volcar()
+
+    def cerrar(self):
+        self._volcar()
+        logging.info(
+            f"{self.tabla}: {self.total} filas cargadas ({self.modo}) en {self._segundos:.2f}s"
+        )
+        return self.total
+
+    def _lista_columnas(self):
+        return f" ({', '.join(self.columnas)})" if self.columnas else ""
+
+    def _volcar(self):
+        if not self._buffer:
+            return
+        inicio = time.perf_counter()
+        filas, self._buffer = self._buffer, []
+
+        if self.modo == 'infile':
+            try:
+                self._load_data(filas)
+            except mysql.connector.Error as e:
+                if e.errno not in ERRORES_INFILE:
+                    raise
+                # Sin rollback: el LOAD fallido no escribió nada y puede haber
+                # un DELETE previo de la misma transacción (carga incremental)
+                logging.warning(f"LOAD DATA LOCAL INFILE no disponible ({e}); se usa INSERT multi-fila")
+                self.modo = 'insert'
+
+        if self.modo != 'infile':
+            self._insert_multifila(filas)
+
+        if self.commit_por_bloque:
+            self.conn.commit()
+        self.total += len(filas)
+        self._segundos += time.perf_counter() - inicio
+
+    def _load_data(self, filas):
+        archivo = tempfile.NamedTemporaryFile(
+            'w', encoding='utf-8', newline='', suffix='.tsv', delete=False
+        )
+        try:
+            with archivo:
+                for fila in filas:
+                    archivo.write('\t'.join(escapar_tsv(v) for v in fila))
+                    archivo.write('\n')
+
+            cursor = self.conn.cursor()
+            try:
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE '{_ruta_sql(archivo.name)}' "
+                    f"INTO TABLE {self.tabla} CHARACTER SET utf8mb4 "
+                    f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                    f"LINES TERMINATED BY '\\n'"
+                    f"{self._lista_columnas()}"
+                )
+                self._revisar_advertencias(cursor)
+            finally:
+                cursor.close()
+        finally:
+            os.unlink(archivo.name)
+
+    def _revisar_advertencias(self, cursor):
+        """
+        LOCAL implica IGNORE: los valores demasiado largos se truncan y las
+        claves duplicadas se saltan con advertencias. El INSERT multi-fila
+        falla en esos casos, así que aquí también.
+        """
+        cursor.execute("SHOW WARNINGS")
+        advertencias = [a for a in cursor.fetchall() if a[0] != 'Note']
+        if not advertencias:
+            return
+        for nivel, codigo, mensaje in advertencias[:5]:
+            logging.error(f"{self.tabla}: LOAD DATA {nivel} {codigo}: {mensaje}")
+        nivel, codigo, mensaje = advertencias[0]
+        raise mysql.connector.Error(
+            msg=f"LOAD DATA en {self.tabla}: {len(advertencias)} advertencias ({mensaje})",
+            errno=codigo,
+        )
+
+    def _insert_multifila(self, filas):
+        n = len(filas[0])
+        marcadores = "(" + ",".join(["%s"] * n) + ")"
+        cursor = self.conn.cursor()
+        try:
+            for i in range(0, len(filas), MYSQL_FILAS_POR_INSERT):
+                bloque = filas[i:i + MYSQL_FILAS_POR_INSERT]
+                sql = (
+                    f"INSERT INTO {self.tabla}{self._lista_columnas()} VALUES "
+                    + ",".join([marcadores] * len(bloque))
+                )
+                cursor.execute(sql, [v for fila in bloque for v in fila])
+        finally:
+            cursor.close()
+
+
+# ============================================================
+# STAGING + RENAME TABLE
+# ============================================================
+def _indices_secundarios(cursor, tabla):
+    """Devuelve {nombre: 'ADD [UNIQUE] INDEX ...'} de los índices no PRIMARY."""
+    cursor.execute("""
+        SELECT INDEX_NAME, NON_UNIQUE, COLUMN_NAME, SUB_PART
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME <> 'PRIMARY'
+        ORDER BY INDEX_NAME, SEQ_IN_INDEX
+    """, (tabla,))
+    columnas = {}
+    unico = {}
+    for nombre, no_unico, columna, sub_part in cursor.fetchall():
+        parte = f"`{columna}`" + (f"({sub_part})" if sub_part else "")
+        columnas.setdefault(nombre, []).append(parte)
+        unico[nombre] = not int(no_unico)
+    return {
+        nombre: f"ADD {'UNIQUE ' if unico[nombre] else ''}INDEX `{nombre}` ({', '.join(partes)})"
+        for nombre, partes in columnas.items()
+    }
+
+
+@contextmanager
+def tabla_staging(conn, tabla):
+    """
+    Crea <tabla>__staging con la estructura de 'tabla' pero sin índices
+    secundarios y entrega su nombre. Al salir sin error crea los índices y
+    reemplaza la tabla publicada con un RENAME TABLE atómico; si hay error
+    se descarta la staging y la tabla publicada queda intacta.
+    """
+    staging = f"{tabla}__staging"
+    anterior = f"{tabla}__anterior"
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        cursor.execute(f"CREATE TABLE {staging} LIKE {tabla}")
+        indices = _indices_secundarios(cursor, staging)
+        if indices:
+            cursor.execute(
+                f"ALTER TABLE {staging} " + ", ".join(f"DROP INDEX `{n}`" for n in indices)
+            )
+
+        try:
+            yield staging
+        except BaseException:
+            conn.rollback()
+            cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+            raise
+
+        conn.commit()
+        try:
+            if indices:
+                inicio = time.perf_counter()
+                cursor.execute(f"ALTER TABLE {staging} " + ", ".join(indices.values()))
+                logging.info(f"{staging}: {len(indices)} índices creados en {time.perf_counter() - inicio:.2f}s")
+
+            cursor.execute(f"DROP TABLE IF EXISTS {anterior}")
+            cursor.execute(f"RENAME TABLE {tabla} TO {anterior}, {staging} TO {tabla}")
+        except Exception:
+            # p. ej. duplicados al crear un índice UNIQUE: no se publica nada
+            cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+            raise
+        cursor.execute(f"DROP TABLE {anterior}")
+        logging.info(f"{tabla}: publicada desde {staging}")
+    finally:
+        cursor.close()
+
+
+@contextmanager
+def carga_publicada(conn, tabla, columnas=None):
+    """
+    Recarga completa de 'tabla' vía staging + RENAME TABLE. La tabla debe
+    existir (CREATE TABLE IF NOT EXISTS antes de llamar).
+
+        with carga_publicada(conn_mysql, "tabla") as carga:
+            carga.agregar(filas)
+    """
+    with tabla_staging(conn, tabla) as staging:
+        with CargaMySQL(conn, staging, columnas) as carga:
+            yield carga
+
+
+# ============================================================
+# FUSIÓN POR CLAVE (UPSERT + HASH DE FILA)
+# ============================================================
+COLUMNA_HASH = 'hash_fila'
+
+
+def hash_fila(valores):
+    texto = '\x1f'.join('' if v is None else str(v) for v in valores)
+    return hashlib.md5(texto.encode('utf-8')).hexdigest()
+
+
+class FusionMySQL:
+    """
+    Fusiona las filas extraídas con 'tabla' usando la clave natural 'clave':
+      - calcula un hash por fila (sin las columnas de 'sin_hash', p. ej.
+        fechaActualizacion, que cambian en cada corrida),
+      - hace INSERT ... ON DUPLICATE KEY UPDATE solo de filas nuevas o con
+        hash distinto al guardado en la columna hash_fila,
+      - al cerrar borra las claves que ya no vinieron.
+    'alcance' (SQL) limita las filas existentes que se comparan y pueden
+    borrarse, p. ej. una ventana incremental. Todo va en una transacción.
+    Si la tabla aún no tiene la clave única, la primera corrida fusiona
+    sobre <tabla>__staging y la publica con RENAME TABLE (tabla_staging).
+
+        with FusionMySQL(conn_mysql, "tabla", "NumeroEpisodio", columnas) as fusion:
+            fusion.agregar(filas)
+    """
+
+    def __init__(self, conn, tabla, clave, columnas=None,
+                 sin_hash=('fechaActualizacion',), alcance=None):
+        self.conn = conn
+        self.tabla = tabla
+        self.clave = clave
+        self.cursor = conn.cursor()
+        # Tabla donde se escribe: la publicada, o su staging en la primera corrida
+        self.destino = tabla
+        self._staging = None
+        self._asegurar_estructura()
+
+        self.columnas = list(columnas) if columnas else self._columnas_tabla()
+        self._i_clave = self.columnas.index(clave)
+        self._i_hash = [i for i, c in enumerate(self.columnas) if c not in sin_hash]
+
+        where = f" WHERE {alcance}" if alcance else ""
+        self.cursor.execute(f"SELECT {clave}, {COLUMNA_HASH} FROM {self.destino}{where}")
+        self._existentes = dict(self.cursor.fetchall())
+        self._vistas = set()
+
+        self.total = 0
+        self.nuevas = self.cambiadas = self.sin_cambios = self.borradas = self.duplicadas = 0
+        self._inicio = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        if tipo is None:
+            self.cerrar()
+        else:
+            self.conn.rollback()
+            self.cursor.close()
+            if self._staging is not None:
+                # Descarta la staging; la tabla publicada queda intacta
+                self._staging.__exit__(tipo, valor, tb)
+        return False
+
+    def _columnas_tabla(self):
+        self.cursor.execute("""
+            SELECT COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME <> %s
+            ORDER BY ORDINAL_POSITION
+        """, (self.tabla, COLUMNA_HASH))
+        return [fila[0] for fila in self.cursor.fetchall()]
+
+    def _asegurar_estructura(self):
+        """Agrega hash_fila y el índice UNIQUE de la clave si la tabla no los tiene."""
+        self.cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """, (self.tabla, COLUMNA_HASH))
+        if not self.cursor.fetchone()[0]:
+            logging.info(f"{self.tabla}: agregando columna {COLUMNA_HASH}")
+            self.cursor.execute(f"ALTER TABLE {self.tabla} ADD COLUMN {COLUMNA_HASH} CHAR(32)")
+
+        self.cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.STATISTICS s
+            WHERE s.TABLE_SCHEMA = DATABASE() AND s.TABLE_NAME = %s
+              AND s.COLUMN_NAME = %s AND s.NON_UNIQUE = 0
+              AND (SELECT COUNT(*) FROM information_schema.STATISTICS s2
+                   WHERE s2.TABLE_SCHEMA = s.TABLE_SCHEMA AND s2.TABLE_NAME = s.TABLE_NAME
+                     AND s2.INDEX_NAME = s.INDEX_NAME) = 1
+        """, (self.tabla, self.clave))
+        if not self.cursor.fetchone()[0]:
+            self._crear_staging_con_clave()
+
+    def _crear_staging_con_clave(self):
+        """
+        Una sola vez: la tabla puede traer claves repetidas de las recargas
+        completas anteriores. Se copia a la staging con la clave única
+        (queda la fila más reciente de cada clave) y esta corrida fusiona
+        ahí; la tabla publicada no se toca hasta el RENAME final.
+        """
+        logging.warning(f"{self.tabla}: creando clave única {self.clave} en {self.tabla}__staging")
+        self._staging = tabla_staging(self.conn, self.tabla)
+        staging = self._staging.__enter__()
+        try:
+            self.cursor.execute(f"ALTER TABLE {staging} ADD UNIQUE KEY uk_{self.clave} ({self.clave})")
+            orden = " ORDER BY fechaActualizacion DESC" if 'fechaActualizacion' in self._columnas_tabla() else ""
+            self.cursor.execute(f"INSERT IGNORE INTO {staging} SELECT * FROM {self.tabla}{orden}")
+            logging.info(f"{staging}: {self.cursor.rowcount} filas copiadas sin claves repetidas")
+        except BaseException as e:
+            self._staging.__exit__(type(e), e, e.__traceback__)
+            raise
+        self.destino = staging
+
+    def agregar(self, filas):
+        pendientes = []
+        for fila in filas:
+            clave = fila[self._i_clave]
+            h = hash_fila([fila[i] for i in self._i_hash])
+            self.total += 1
+            if clave in self._vistas:
+                self.duplicadas += 1
+            self._vistas.add(clave)
+
+            if clave in self._existentes:
+                if self._existentes[clave] == h:
+                    self.sin_cambios += 1
+                    continue
+                self.cambiadas += 1
+            else:
+                self.nuevas += 1
+            self._existentes[clave] = h
+            pendientes.append(list(fila) + [h])
+
+        if pendientes:
+            self._upsert(pendientes)
+
+    def _upsert(self, filas):
+        columnas = self.columnas + [COLUMNA_HASH]
+        marcadores = "(" + ",".join(["%s"] * len(columnas)) + ")"
+        actualizar = ", ".join(f"{c} = VALUES({c})" for c in columnas if c != self.clave)
+        for i in range(0, len(filas), MYSQL_FILAS_POR_INSERT):
+            bloque = filas[i:i + MYSQL_FILAS_POR_INSERT]
+            self.cursor.execute(
+                f"INSERT INTO {self.destino} ({', '.join(columnas)}) VALUES "
+                + ",".join([marcadores] * len(bloque))
+                + f" ON DUPLICATE KEY UPDATE {actualizar}",
+                [v for fila in bloque for v in fila]
+            )
+
+    def cerrar(self):
+        desaparecidas = [k for k in self._existentes if k not in self._vistas]
+        for i in range(0, len(desaparecidas), MYSQL_FILAS_POR_INSERT):
+            bloque = desaparecidas[i:i + MYSQL_FILAS_POR_INSERT]
+            self.cursor.execute(
+                f"DELETE FROM {self.destino} WHERE {self.clave} IN ({','.join(['%s'] * len(bloque))})",
+                bloque
+            )
+        self.borradas = len(desaparecidas)
+        self.conn.commit()
+        self.cursor.close()
+        if self._staging is not None:
+            self._staging.__exit__(None, None, None)
+
+        if self.duplicadas:
+            logging.warning(f"{self.tabla}: {self.duplicadas} filas con {self.clave} repetida (queda la última)")
+        logging.info(
+            f"{self.tabla}: {self.total} filas extraídas, {self.nuevas} nuevas, "
+            f"{self.cambiadas} cambiadas, {self.sin_cambios} sin cambios, "
+            f"{self.borradas} borradas en {time.perf_counter() - self._inicio:.2f}s"
+        )
+        return self.total
@@ -0,0 +1,116 @@
+"""
+Última cita de episodios ambulatorios (RB_APPOINTMENT).
+
+Las contrarreferencias (oftalmología, UTO, coloproctología) mostraban la
+última cita del episodio hasta el alta con una subconsulta TOP 1 por
+columna, todas con el mismo predicado: RB_APPOINTMENT se recorría cinco
+veces por episodio. Aquí las citas de los episodios extraídos se traen una
+vez (por lotes de ids) y la última por episodio se elige en pandas.
+
+La consulta principal termina con tres columnas de apoyo, que
+agregar_citas() reemplaza por COLUMNAS_CITA:
+
+    PAADM_RowID "id_episodio",
+    PAADM_PAPMI_DR "id_paciente",
+    PAADM_DischgDate "fecha_alta"
+"""
+import logging
+
+import pandas as pd
+
+from z_comun.iris import consultar
+
+COLUMNAS_CITA = ["local", "cod_recurso_cita", "recurso_cita", "fecha_cita", "estado_cita"]
+
+COLUMNAS_APOYO = ["id_episodio", "id_paciente", "fecha_alta"]
+
+ESTADOS_CITA = {
+    'P': 'Agendado',
+    'D': 'Atendido',
+    'X': 'Cancelado',
+    'A': 'Llegó',
+    'N': 'No atendido',
+    'T': 'Transferido',
+    'H': 'En Espera',
+}
+
+EPISODIOS_POR_CONSULTA = 500
+
+QUERY_CITAS = """
+SELECT %nolock
+    APPT_Adm_DR AS id_episodio,
+    APPT_PAPMI_DR AS id_paciente,
+    APPT_AS_ParRef->AS_Date AS fecha,
+    APPT_AS_ParRef->AS_RES_ParRef->RES_CTLOC_DR->CTLOC_desc AS local,
+    APPT_AS_ParRef->AS_RES_ParRef->RES_Code AS cod_recurso_cita,
+    APPT_AS_ParRef->AS_RES_ParRef->RES_Desc AS recurso_cita,
+    APPT_status AS estado
+FROM RB_APPOINTMENT
+WHERE APPT_Adm_DR IN ({episodios})
+"""
+
+
+def citas_episodios(ids):
+    """Todas las citas de los episodios (PAADM_RowID), por lotes."""
+    ids = sorted(set(ids) - {""})
+    filas = []
+    for i in range(0, len(ids), EPISODIOS_POR_CONSULTA):
+        lista = ", ".join(f"'{e}'" for e in ids[i:i + EPISODIOS_POR_CONSULTA])
+        _, lote = consultar(QUERY_CITAS.format(episodios=lista))
+        filas.extend(lote)
+    return pd.DataFrame(filas, columns=[
+        "id_episodio", "id_paciente", "fecha", "local", "cod_recurso_cita", "recurso_cita", "estado",
+    ])
+
+
+def ultima_cita(episodios):
+    """
+    Última cita de cada episodio con fecha hasta el alta y del mismo
+    paciente (como el TOP 1 ... ORDER BY AS_Date DESC original).
+
+    episodios: DataFrame con id_episodio, id_paciente y fecha_alta.
+    Devuelve un DataFrame indexado por id_episodio con COLUMNAS_CITA.
+    """
+    citas = citas_episodios(episodios["id_episodio"])
+    alta = episodios.drop_duplicates("id_episodio").set_index("id_episodio")
+    citas = citas[citas["id_paciente"] == citas["id_episodio"].map(alta["id_paciente"])]
+
+    fecha = pd.to_datetime(citas["fecha"], errors="coerce")
+    # Sin fecha de alta la comparación es falsa, igual que en SQL
+    citas = citas[fecha <= pd.to_datetime(citas["id_episodio"].map(alta["fecha_alta"]), errors="coerce")]
+    fecha = fecha[citas.index]
+
+    ultimas = citas.assign(_fecha=fecha).sort_values(["id_episodio", "_fecha"], kind="stable")
+    # tail(1): la fila completa de una sola cita (last() toma el último no
+    # nulo de cada columna por separado y podría mezclar citas)
+    ultimas = ultimas.groupby("id_episodio").tail(1).set_index("id_episodio")
+    resultado = pd.DataFrame({
+        "local": ultimas["local"],
+        "cod_recurso_cita": ultimas["cod_recurso_cita"],
+        "recurso_cita": ultimas["recurso_cita"],
+        "fecha_cita": ultimas["_fecha"].dt.strftime("%d-%m-%Y"),
+        "estado_cita": ultimas["estado"].map(lambda e: ESTADOS_CITA.get(e, e)),
+    }, index=ultimas.index)
+    logging.info(f"Citas: {len(citas)} hasta el alta, {len(resultado)} episodios con cita")
+    return resultado
+
+
+def agregar_citas(columnas, filas, despues="nro_registro"):
+    """
+    Reemplaza las columnas de apoyo (las tres últimas) por COLUMNAS_CITA,
+    insertadas tras la columna 'despues'. Devuelve las filas como listas.
+    """
+    posicion = [c.lower() for c in columnas].index(despues) + 1
+    n = len(COLUMNAS_APOYO)
+    episodios = pd.DataFrame([fila[-n:] for fila in filas], columns=COLUMNAS_APOYO, dtype=object)
+    citas = ultima_cita(episodios) if len(episodios) else pd.DataFrame(columns=COLUMNAS_CITA)
+    valores = dict(zip(citas.index, citas[COLUMNAS_CITA].fillna("").values.tolist()))
+    sin_cita = [""] * len(COLUMNAS_CITA)
+
+    resultado = []
+    for fila in filas:
+        id_episodio = fila[-n]
+        fila = list(fila[:-n])
+        fila[posicion:posicion] = valores.get(id_episodio, sin_cita)
+        resultado.append(fila)
+    return resultado
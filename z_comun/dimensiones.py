@@ -0,0 +1,279 @@
+"""
+Caché local de tablas de códigos de IRIS (CT_Loc, PAC_Ward, CT_CareProv,
+SS_User, ...).
+
+Las consultas resuelven descripciones con joins implícitos por fila
+(->CTLOC_Desc, ->CTPCP_Desc, ->SSUSR_Name, ...) en cada corrida, aunque esas
+tablas casi no cambian. Aquí se copian una vez al día a SQLite:
+
+    <DIMENSIONES_DB>             una tabla por dimensión (id PRIMARY KEY)
+        _versiones               versión, huella, filas y fecha de cada copia
+
+La versión de una dimensión sube solo si cambió su contenido. La consulta
+del trabajo trae los _DR crudos y las descripciones se resuelven en pandas
+con búsquedas vectorizadas sobre diccionarios {id: valor}, siguiendo
+punteros si hace falta:
+
+    resolver(df["NOT_User_DR"], "SS_User.SSUSR_Name")
+    resolver(df["NOT_UserAuth_DR"], "SS_User.SSUSR_DefaultDept_DR", "CT_Loc.CTLOC_Desc")
+
+Los ids que no están en la copia (creados después de la última
+actualización) se consultan a IRIS y se agregan. Los que IRIS tampoco
+devuelve quedan como fila con campos NULL (valor ''), así no se vuelven a
+consultar mientras dure esa versión de la copia: una actualización con
+cambios reemplaza la tabla completa y con ella esas filas.
+
+Uso en cron (desde la raíz del proyecto):
+    python -m z_comun.dimensiones
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from z_comun.iris import consultar, cerrar_iris
+from z_comun.intermedios import bloqueo
+
+load_dotenv()
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+DIMENSIONES_DB = os.getenv('DIMENSIONES_DB', 'cache/dimensiones.sqlite')
+DIMENSIONES_VIGENCIA_HORAS = float(os.getenv('DIMENSIONES_VIGENCIA_HORAS', 24))
+
+IDS_POR_CONSULTA = 500
+
+
+class Dimension:
+    def __init__(self, tabla, id, campos):
+        self.tabla = tabla
+        self.id = id
+        self.campos = list(campos)
+
+    def __repr__(self):
+        return f"Dimension({self.tabla})"
+
+    def query(self, filtro=""):
+        return (
+            f"SELECT %nolock {self.id}, {', '.join(self.campos)} FROM {self.tabla}"
+            + (f" WHERE {filtro}" if filtro else "")
+        )
+
+
+DIMENSIONES = {d.tabla: d for d in [
+    Dimension("CT_Loc", "CTLOC_RowID",
+              ["CTLOC_Code", "CTLOC_Desc", "CTLOC_Hospital_DR", "CTLOC_Dep_DR"]),
+    Dimension("PAC_Ward", "WARD_RowID", ["WARD_Code", "WARD_Desc"]),
+    Dimension("CT_CareProv", "CTPCP_RowId", ["CTPCP_Code", "CTPCP_Desc", "CTPCP_CarPrvTp_DR"]),
+    Dimension("CT_CarPrvTp", "CTCPT_RowId", ["CTCPT_Code", "CTCPT_Desc"]),
+    Dimension("SS_User", "SSUSR_RowId",
+              ["SSUSR_Initials", "SSUSR_Name", "SSUSR_DefaultDept_DR", "SSUSR_Hospital_DR"]),
+    Dimension("CT_Sex", "CTSEX_RowId", ["CTSEX_Code", "CTSEX_Desc"]),
+]}
+
+
+# ============================================================
+# ALMACÉN SQLITE
+# ============================================================
+@contextmanager
+def _conectar():
+    """Conexión a la copia local; confirma al salir (o revierte si hay error) y la cierra."""
+    os.makedirs(os.path.dirname(DIMENSIONES_DB) or '.', exist_ok=True)
+    conn = sqlite3.connect(DIMENSIONES_DB, timeout=60)
+    try:
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS _versiones (
+                    dimension TEXT PRIMARY KEY,
+                    version INTEGER,
+                    huella TEXT,
+                    filas INTEGER,
+                    actualizada TEXT
+                )
+            """)
+            yield conn
+    finally:
+        conn.close()
+
+
+def _crear_tabla(conn, dimension):
+    columnas = ", ".join(f'"{c}" TEXT' for c in dimension.campos)
+    conn.execute(f'CREATE TABLE IF NOT EXISTS "{dimension.tabla}" (id TEXT PRIMARY KEY, {columnas})')
+
+
+def _insertar(conn, dimension, filas, reemplazar=False):
+    marcas = ", ".join("?" * (len(dimension.campos) + 1))
+    verbo = "INSERT OR REPLACE" if reemplazar else "INSERT"
+    conn.executemany(f'{verbo} INTO "{dimension.tabla}" VALUES ({marcas})', filas)
+
+
+def _huella(filas):
+    h = hashlib.sha1()
+    for fila in sorted(map(tuple, filas)):
+        h.update("\x1f".join(fila).encode("utf-8"))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+
+def versiones():
+    """{dimension: (version, actualizada)} de la copia local."""
+    with _conectar() as conn:
+        return {
+            d: (v, datetime.fromisoformat(a))
+            for d, v, a in conn.execute("SELECT dimension, version, actualizada FROM _versiones")
+        }
+
+
+def actualizar_dimension(dimension):
+    """Copia la dimensión desde IRIS; la versión sube solo si cambió el contenido."""
+    inicio = time.perf_counter()
+    _, filas = consultar(dimension.query())
+    huella = _huella(filas)
+    ahora = datetime.now().isoformat(timespec='seconds')
+
+    with _conectar() as conn:
+        _crear_tabla(conn, dimension)
+        anterior = conn.execute(
+            "SELECT version, huella FROM _versiones WHERE dimension = ?", (dimension.tabla,)
+        ).fetchone()
+        if anterior and anterior[1] == huella:
+            version = anterior[0]
+            conn.execute("UPDATE _versiones SET actualizada = ? WHERE dimension = ?",
+                         (ahora, dimension.tabla))
+        else:
+            # En la misma transacción: quien lea ve la copia anterior o la nueva
+            version = (anterior[0] if anterior else 0) + 1
+            conn.execute(f'DELETE FROM "{dimension.tabla}"')
+            _insertar(conn, dimension, filas, reemplazar=True)
+            conn.execute("INSERT OR REPLACE INTO _versiones VALUES (?, ?, ?, ?, ?)",
+                         (dimension.tabla, version, huella, len(filas), ahora))
+    _diccionarios.clear()
+    logging.info(f"Dimensión {dimension.tabla}: {len(filas)} filas, versión {version} "
+                 f"en {time.perf_counter() - inicio:.2f}s")
+
+
+def asegurar_dimensiones(tablas=None, horas=DIMENSIONES_VIGENCIA_HORAS):
+    """Actualiza las dimensiones sin copia o con copia más vieja que 'horas'."""
+    tablas = list(tablas or DIMENSIONES)
+
+    def vencidas():
+        actuales = versiones()
+        limite = datetime.now() - timedelta(hours=horas)
+        return [t for t in tablas if t not in actuales or actuales[t][1] < limite]
+
+    if not vencidas():
+        return
+    with bloqueo(os.path.dirname(DIMENSIONES_DB) or '.'):
+        # Otro proceso pudo actualizarlas mientras se esperaba el bloqueo
+        for tabla in vencidas():
+            actualizar_dimension(DIMENSIONES[tabla])
+
+
+# ============================================================
+# RESOLUCIÓN
+# ============================================================
+# (tabla, campo) -> (pd.Index de ids, valores + '' al final)
+_diccionarios = {}
+
+
+def _diccionario(tabla, campo):
+    if (tabla, campo) not in _diccionarios:
+        dimension = DIMENSIONES[tabla]
+        if campo not in dimension.campos:
+            raise ValueError(f"{tabla}: campo '{campo}' no está en la dimensión")
+        asegurar_dimensiones([tabla])
+        with _conectar() as conn:
+            filas = conn.execute(f'SELECT id, "{campo}" FROM "{tabla}"').fetchall()
+        ids = pd.Index([f[0] for f in filas])
+        valores = np.array([f[1] for f in filas] + [""], dtype=object)
+        _diccionarios[(tabla, campo)] = (ids, valores)
+    return _diccionarios[(tabla, campo)]
+
+
+def _completar(tabla, ids):
+    """Agrega a la copia local los ids que no estaban (altas posteriores)."""
+    dimension = DIMENSIONES[tabla]
+    filas = []
+    for i in range(0, len(ids), IDS_POR_CONSULTA):
+        lista = ", ".join(f"'{x}'" for x in ids[i:i + IDS_POR_CONSULTA])
+        _, lote = consultar(dimension.query(f"{dimension.id} IN ({lista})"))
+        filas.extend(lote)
+    logging.info(f"Dimensión {tabla}: {len(ids)} ids fuera de la copia, {len(filas)} encontrados")
+    encontrados = {str(f[0]) for f in filas}
+    inexistentes = [(x,) + (None,) * len(dimension.campos) for x in ids if x not in encontrados]
+    with _conectar() as conn:
+        _insertar(conn, dimension, filas, reemplazar=True)
+        # Sin pisar una fila real que otro proceso haya agregado entretanto
+        marcas = ", ".join("?" * (len(dimension.campos) + 1))
+        conn.executemany(f'INSERT OR IGNORE INTO "{tabla}" VALUES ({marcas})', inexistentes)
+    for clave in [k for k in _diccionarios if k[0] == tabla]:
+        del _diccionarios[clave]
+
+
+def _buscar(serie, tabla, campo):
+    ids, valores = _diccionario(tabla, campo)
+    claves = serie.fillna("").astype(str)
+    posiciones = ids.get_indexer(claves)
+
+    faltantes = claves[(posiciones == -1) & (claves != "")].unique().tolist()
+    if faltantes:
+        _completar(tabla, faltantes)
+        ids, valores = _diccionario(tabla, campo)
+        posiciones = ids.get_indexer(claves)
+    return pd.Series(valores[posiciones], index=serie.index, dtype=object).fillna("")
+
+
+def resolver(serie, *pasos):
+    """
+    Valor de la dimensión para cada id de 'serie' ('' si no hay). Cada paso
+    es 'Tabla.Campo'; con varios pasos se siguen punteros _DR.
+    """
+    if not pasos:
+        raise ValueError("resolver: falta al menos un paso 'Tabla.Campo'")
+    for paso in pasos:
+        tabla, campo = paso.split(".", 1)
+        serie = _buscar(serie, tabla, campo)
+    return serie
+
+
+def con_dimensiones(columnas, resoluciones):
+    """
+    Función 'transformar' para z_comun.trabajos.Trabajo: en las filas de una
+    consulta con 'columnas', reemplaza el id de cada columna de
+    'resoluciones' ({columna: paso o (pasos...)}) por su valor.
+    """
+    columnas = list(columnas)
+    resoluciones = {
+        c: (p,) if isinstance(p, str) else tuple(p) for c, p in resoluciones.items()
+    }
+
+    def transformar(filas):
+        if not filas:
+            return filas
+        df = pd.DataFrame(filas, columns=columnas, dtype=object)
+        for columna, pasos in resoluciones.items():
+            df[columna] = resolver(df[columna], *pasos)
+        return df.values.tolist()
+
+    return transformar
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(threadName)s - %(levelname)s - %(message)s'
+    )
+    try:
+        with bloqueo(os.path.dirname(DIMENSIONES_DB) or '.'):
+            for dimension in DIMENSIONES.values():
+                actualizar_dimension(dimension)
+    finally:
+        cerrar_iris()
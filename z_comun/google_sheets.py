@@ -0,0 +1,343 @@
+"""
+Publicación por lotes en Google Sheets.
+
+PublicadorSheets junta los datos de varias hojas de un mismo spreadsheet y
+los sube con el mínimo de llamadas a la API:
+
+    1. una lectura de metadatos (ids y tamaño de las hojas)
+    2. spreadsheets.batchUpdate con addSheet, solo si falta alguna hoja
+    3. spreadsheets.values.batchUpdate con todas las hojas (se parte en
+       varios si el cuerpo supera GSHEETS_MAX_BYTES)
+    4. un spreadsheets.batchUpdate final: borra lo que quedó de la carga
+       anterior fuera del rango nuevo, autoajusta columnas y mueve hojas
+
+A diferencia de clear() + update(), la hoja nunca queda vacía entre una
+llamada y otra: los datos nuevos se escriben encima y después se limpia
+el sobrante.
+
+Con una carpeta de snapshots, cada hoja guarda el hash de cada fila
+publicada y la corrida siguiente solo envía los tramos de filas que
+cambiaron, se agregaron o se borraron. Se reescribe la hoja completa si
+no hay snapshot, si cambió la estructura (encabezado o número de
+columnas), si la hoja no existe o con GSHEETS_SYNC=completo (por ejemplo
+después de editar la hoja a mano). Si nada cambió no se llama a la API.
+
+Las columnas_siempre de una hoja (p. ej. la fecha de carga, igual en todas
+las filas) no cuentan para el diff, pero se reescriben enteras en cada
+publicación, como un rango de una columna: siguen indicando la última
+corrida sin obligar a reescribir la hoja completa.
+
+Al final se registra cuántas llamadas y bytes usó la corrida.
+"""
+import os
+import json
+import hashlib
+import logging
+
+from gspread.utils import absolute_range_name, rowcol_to_a1
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Tamaño máximo del cuerpo de cada values.batchUpdate (Google recomienda ~2 MB)
+GSHEETS_MAX_BYTES = int(os.getenv('GSHEETS_MAX_BYTES', 2_000_000))
+
+# diff: solo filas cambiadas (si hay snapshot) | completo: siempre toda la hoja
+GSHEETS_SYNC = os.getenv('GSHEETS_SYNC', 'diff')
+
+FILAS_HOJA_NUEVA = 100
+COLUMNAS_HOJA_NUEVA = 50
+
+
+def _bytes_json(valor):
+    return len(json.dumps(valor, ensure_ascii=False).encode('utf-8'))
+
+
+def _rango(nombre_hoja, fila_inicio, filas, columna=0):
+    return {"range": absolute_range_name(nombre_hoja, rowcol_to_a1(fila_inicio + 1, columna + 1)), "values": filas}
+
+
+def hash_fila(fila, ignorar=()):
+    valores = [v for i, v in enumerate(fila) if i not in ignorar]
+    return hashlib.md5(json.dumps(valores, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _tramos_consecutivos(indices):
+    """[3, 4, 5, 9] -> [(3, 6), (9, 10)]"""
+    tramos = []
+    for i in indices:
+        if tramos and tramos[-1][1] == i:
+            tramos[-1][1] = i + 1
+        else:
+            tramos.append([i, i + 1])
+    return [tuple(t) for t in tramos]
+
+
+class HojaPendiente:
+    def __init__(self, nombre, filas, fila_encabezado=0, columnas_siempre=(), ancho_columnas=None):
+        self.nombre = nombre
+        self.filas = filas
+        self.n_columnas = max((len(f) for f in filas), default=0)
+        self.ancho_columnas = ancho_columnas
+        self.fila_encabezado = fila_encabezado
+
+        encabezado = list(filas[fila_encabezado]) if len(filas) > fila_encabezado else []
+        self.estructura = {"encabezado": encabezado, "columnas": self.n_columnas}
+        self.siempre = sorted(encabezado.index(c) for c in set(columnas_siempre) if c in encabezado)
+        self.hashes = [hash_fila(f, set(self.siempre)) for f in filas]
+
+        # Por defecto se escribe completa; PublicadorSheets._planificar decide
+        self.completa = True
+        self.tramos = [(0, len(filas))] if filas else []
+        self.filas_anteriores = 0
+
+
+class PublicadorSheets:
+    def __init__(self, sh, max_bytes=GSHEETS_MAX_BYTES, snapshots=None):
+        """
+        snapshots: carpeta donde guardar los hashes por fila de cada hoja
+        publicada; sin ella siempre se reescribe la hoja completa.
+        """
+        self.sh = sh
+        self.max_bytes = max_bytes
+        self.snapshots = snapshots
+        self.hojas = {}
+        self.llamadas = 0
+        self.bytes_enviados = 0
+
+    def agregar(self, nombre_hoja, filas, fila_encabezado=0, columnas_siempre=(), ancho_columnas=None):
+        """
+        Encola una hoja completa para publicar().
+
+        fila_encabezado: fila con los nombres de columna (define la estructura).
+        columnas_siempre: columnas que no cuentan para decidir si una fila
+            cambió pero se escriben en cada publicación (p. ej. una fecha
+            de carga igual en todas las filas).
+        ancho_columnas: ancho fijo en píxeles después del autoajuste.
+        """
+        self.hojas[nombre_hoja] = HojaPendiente(
+            nombre_hoja, filas, fila_encabezado, columnas_siempre, ancho_columnas
+        )
+
+    # ------------------------------------------------------------
+    # Llamadas a la API (todas pasan por aquí para contarlas)
+    # ------------------------------------------------------------
+    def _batch_update(self, requests):
+        cuerpo = {"requests": requests}
+        self.llamadas += 1
+        self.bytes_enviados += _bytes_json(cuerpo)
+        return self.sh.batch_update(cuerpo)
+
+    def _values_batch_update(self, data):
+        cuerpo = {"valueInputOption": "RAW", "data": data}
+        self.llamadas += 1
+        self.bytes_enviados += _bytes_json(cuerpo)
+        return self.sh.values_batch_update(cuerpo)
+
+    def _propiedades_hojas(self):
+        self.llamadas += 1
+        metadatos = self.sh.fetch_sheet_metadata()
+        return {
+            s["properties"]["title"]: s["properties"]
+            for s in metadatos.get("sheets", [])
+        }
+
+    # ------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------
+    def _ruta_snapshot(self, nombre_hoja):
+        archivo = nombre_hoja.replace(os.sep, "_") + ".json"
+        return os.path.join(self.snapshots, self.sh.id, archivo)
+
+    def _leer_snapshot(self, nombre_hoja):
+        ruta = self._ruta_snapshot(nombre_hoja)
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logging.warning(f"{ruta}: snapshot ilegible, se reescribe la hoja ({e})")
+            return None
+
+    def _guardar_snapshot(self, hoja):
+        ruta = self._ruta_snapshot(hoja.nombre)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({"estructura": hoja.estructura, "hashes": hoja.hashes}, f, ensure_ascii=False)
+        os.replace(temporal, ruta)
+
+    def _planificar(self, hoja):
+        """Deja la hoja completa o, si hay snapshot compatible, solo sus filas cambiadas."""
+        if not self.snapshots or GSHEETS_SYNC == 'completo':
+            return
+        anterior = self._leer_snapshot(hoja.nombre)
+        if anterior is None:
+            return
+        if anterior["estructura"] != hoja.estructura:
+            logging.info(f"Hoja '{hoja.nombre}': cambió la estructura, se reescribe completa")
+            return
+
+        previos = anterior["hashes"]
+        cambiadas = [
+            i for i, h in enumerate(hoja.hashes)
+            if i >= len(previos) or previos[i] != h
+        ]
+        hoja.completa = False
+        hoja.tramos = _tramos_consecutivos(cambiadas)
+        hoja.filas_anteriores = len(previos)
+
+    def _reescribir_completa(self, hoja):
+        hoja.completa = True
+        hoja.tramos = [(0, len(hoja.filas))] if hoja.filas else []
+
+    @staticmethod
+    def _hay_cambios(hoja):
+        return (hoja.completa or hoja.tramos or hoja.filas_anteriores > len(hoja.filas)
+                or (hoja.siempre and len(hoja.filas) > hoja.fila_encabezado))
+
+    @staticmethod
+    def _bloques(hoja):
+        """(columna, fila_inicio, filas) a escribir: los tramos y, si no va completa, columnas_siempre."""
+        for desde, hasta in hoja.tramos:
+            yield 0, desde, hoja.filas[desde:hasta]
+        if not hoja.completa:
+            for c in hoja.siempre:
+                yield c, hoja.fila_encabezado, [[f[c]] for f in hoja.filas[hoja.fila_encabezado:]]
+
+    # ------------------------------------------------------------
+    # Pasos
+    # ------------------------------------------------------------
+    def _crear_faltantes(self, propiedades, hojas):
+        faltantes = [h for h in hojas if h.nombre not in propiedades]
+        if not faltantes:
+            return propiedades
+
+        respuesta = self._batch_update([
+            {"addSheet": {"properties": {
+                "title": hoja.nombre,
+                "gridProperties": {
+                    "rowCount": max(FILAS_HOJA_NUEVA, len(hoja.filas)),
+                    "columnCount": max(COLUMNAS_HOJA_NUEVA, hoja.n_columnas),
+                },
+            }}}
+            for hoja in faltantes
+        ])
+        for reply in respuesta.get("replies", []):
+            nuevas = reply["addSheet"]["properties"]
+            propiedades[nuevas["title"]] = nuevas
+            logging.info(f"Hoja '{nuevas['title']}' creada")
+        return propiedades
+
+    def _lotes_valores(self, hojas):
+        """
+        Rangos para values.batchUpdate agrupados en lotes de hasta max_bytes.
+        Un tramo más grande que el límite se parte en tramos de filas.
+        """
+        lote, tamano = [], 0
+        for hoja in hojas:
+            for columna, desde, filas in self._bloques(hoja):
+                inicio, tramo = desde, []
+                for i, fila in enumerate(filas, start=desde):
+                    bytes_fila = _bytes_json(fila) + 1
+                    if tamano + bytes_fila > self.max_bytes and (tramo or lote):
+                        if tramo:
+                            lote.append(_rango(hoja.nombre, inicio, tramo, columna))
+                        yield lote
+                        lote, tamano, inicio, tramo = [], 0, i, []
+                    tramo.append(fila)
+                    tamano += bytes_fila
+                if tramo:
+                    lote.append(_rango(hoja.nombre, inicio, tramo, columna))
+        if lote:
+            yield lote
+
+    def _formato_final(self, hojas, propiedades, mover_al_inicio):
+        requests = []
+        for hoja in hojas:
+            sheet_id = propiedades[hoja.nombre]["sheetId"]
+            grilla = propiedades[hoja.nombre].get("gridProperties", {})
+            n_filas = len(hoja.filas)
+
+            # Sobrante de la carga anterior: filas bajo los datos nuevos y
+            # (si se reescribió completa) columnas a su derecha
+            if hoja.completa:
+                borrar_filas = grilla.get("rowCount", 0) > n_filas
+            else:
+                borrar_filas = hoja.filas_anteriores > n_filas
+            if borrar_filas:
+                requests.append({"updateCells": {
+                    "range": {"sheetId": sheet_id, "startRowIndex": n_filas},
+                    "fields": "userEnteredValue",
+                }})
+            if hoja.completa and grilla.get("columnCount", 0) > hoja.n_columnas:
+                requests.append({"updateCells": {
+                    "range": {
+                        "sheetId": sheet_id,
+                        "startRowIndex": 0,
+                        "endRowIndex": n_filas,
+                        "startColumnIndex": hoja.n_columnas,
+                    },
+                    "fields": "userEnteredValue",
+                }})
+
+            columnas = {"sheetId": sheet_id, "dimension": "COLUMNS", "startIndex": 0, "endIndex": hoja.n_columnas}
+            requests.append({"autoResizeDimensions": {"dimensions": columnas}})
+            if hoja.ancho_columnas:
+                requests.append({"updateDimensionProperties": {
+                    "range": columnas,
+                    "properties": {"pixelSize": hoja.ancho_columnas},
+                    "fields": "pixelSize",
+                }})
+
+        for nombre in mover_al_inicio:
+            if nombre in propiedades:
+                requests.append({"updateSheetProperties": {
+                    "properties": {"sheetId": propiedades[nombre]["sheetId"], "index": 0},
+                    "fields": "index",
+                }})
+            else:
+                logging.warning(f"No se pudo mover la hoja '{nombre}': no existe")
+        return requests
+
+    def publicar(self, mover_al_inicio=()):
+        """Sube las hojas encoladas (solo lo que cambió). Devuelve (llamadas, bytes)."""
+        for hoja in self.hojas.values():
+            self._planificar(hoja)
+
+        pendientes = [h for h in self.hojas.values() if self._hay_cambios(h)]
+        for hoja in self.hojas.values():
+            if hoja not in pendientes:
+                logging.info(f"Hoja '{hoja.nombre}' sin cambios")
+
+        if pendientes:
+            propiedades = self._propiedades_hojas()
+
+            # Una hoja borrada a mano se vuelve a crear y se escribe completa
+            for hoja in pendientes:
+                if hoja.nombre not in propiedades:
+                    self._reescribir_completa(hoja)
+            propiedades = self._crear_faltantes(propiedades, pendientes)
+
+            for lote in self._lotes_valores(pendientes):
+                self._values_batch_update(lote)
+
+            self._batch_update(self._formato_final(pendientes, propiedades, mover_al_inicio))
+
+        for hoja in pendientes:
+            if self.snapshots:
+                self._guardar_snapshot(hoja)
+            if hoja.completa:
+                detalle = "completa"
+            else:
+                detalle = f"{sum(b - a for a, b in hoja.tramos)} filas reescritas"
+                if hoja.siempre:
+                    detalle += f" + {len(hoja.siempre)} columna(s) por corrida"
+            logging.info(f"Hoja '{hoja.nombre}' actualizada ({detalle}). Filas: {max(len(hoja.filas) - 1, 0)}")
+
+        logging.info(
+            f"Google Sheets: {len(pendientes)} de {len(self.hojas)} hojas en {self.llamadas} llamadas, "
+            f"{self.bytes_enviados / 1024:.1f} KB enviados"
+        )
+        return self.llamadas, self.bytes_enviados
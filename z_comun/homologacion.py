@@ -0,0 +1,230 @@
+"""
+Homologación de códigos del reporte Teamcoder.
+
+Cada libro de reglas (reglas_homologacion/*.xlsx) se compila una vez a un
+diccionario {código normalizado: código Teamcoder} y se guarda en
+reglas_homologacion/.compiladas/. El compilado se reutiliza mientras el
+libro no cambie (mismo mtime y tamaño, o mismo hash si solo cambió el
+mtime), así que los .xlsx no se vuelven a leer en cada corrida.
+
+Las columnas del reporte se homologan con búsquedas vectorizadas sobre
+esos diccionarios; lo que no está en la regla toma el valor por defecto
+de la columna (0 o nulo).
+
+Lo usan z_teamcoder y z_teamcoder_quimioterapia_ambulatoria.
+"""
+import os
+import pickle
+import hashlib
+import logging
+
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# REGLAS
+# ============================================================
+class Regla:
+    def __init__(self, columna, archivo, clave, valor, hoja=0,
+                 normalizar='simple', formato='int', sin_regla=pd.NA,
+                 nulo=None, minusculas=True):
+        self.columna = columna
+        self.archivo = archivo
+        self.clave = clave
+        self.valor = valor
+        self.hoja = hoja
+        self.normalizar = normalizar
+        self.formato = formato
+        self.sin_regla = sin_regla
+        # Valor si la columna viene vacía (por defecto, igual que sin regla)
+        self.nulo = sin_regla if nulo is None else nulo
+        # OCUPACION y REGCON_01 se leen con sus encabezados tal cual
+        self.minusculas = minusculas
+
+    def __repr__(self):
+        return f"Regla({self.columna} <- {self.archivo})"
+
+
+REGLAS = [
+    Regla("OCUPACION", "OCUPACION.xlsx", "Codigo", "Categoria",
+          hoja="Hoja1", sin_regla=0, nulo=99, minusculas=False),
+    Regla("REGCON_01", "REGCON_01.xlsx", "AUXIT_Desc", "Teamcode",
+          sin_regla=0, nulo=99, minusculas=False),
+    Regla("ESPECIALIDAD", "ESPECIALIDADES.xlsx", "codigo_trakcare", "codigo_teamcoder",
+          normalizar='codigo'),
+    Regla("SERVALT", "SERVALT.xlsx", "codigo_hds", "codigo", normalizar='codigo'),
+    Regla("SERVING", "SERVING.xlsx", "codigo_hds", "codigo", normalizar='codigo'),
+    Regla("ETNIA", "ETNIA.xlsx", "codigo_trakcare", "codigo", normalizar='codigo'),
+    # mantiene el 0 inicial
+    Regla("SEXO", "SEXO.xlsx", "codigo_trakcare", "codigo",
+          normalizar='codigo', formato='zfill2'),
+]
+
+CARPETA_COMPILADAS = ".compiladas"
+
+# Cambiar si cambia la forma de compilar, para descartar los compilados viejos
+VERSION_COMPILADO = 1
+
+
+# ============================================================
+# NORMALIZACIÓN
+# ============================================================
+def normalizar_texto(serie):
+    return serie.astype(str).str.strip().str.upper()
+
+
+def normalizar_codigo(serie):
+    """Versión vectorizada de la normalización de códigos (guiones, espacios, '.0')."""
+    return (
+        normalizar_texto(serie)
+        .str.replace("–", "-", regex=False)
+        .str.replace("—", "-", regex=False)
+        .str.replace(" ", "", regex=False)
+        .str.replace(r"\.0$", "", regex=True)
+    )
+
+
+NORMALIZADORES = {'simple': normalizar_texto, 'codigo': normalizar_codigo}
+
+
+def _formatear(valor, formato):
+    if formato == 'zfill2':
+        return str(valor).zfill(2)
+    return int(valor)
+
+
+# ============================================================
+# COMPILACIÓN Y CACHÉ
+# ============================================================
+def _hash_archivo(ruta):
+    with open(ruta, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def compilar_regla(regla, ruta):
+    """{clave normalizada: valor Teamcoder} a partir del libro de la regla."""
+    df = pd.read_excel(ruta, sheet_name=regla.hoja)
+    df.rename(columns=lambda x: x.strip(), inplace=True)
+    if regla.minusculas:
+        df.rename(columns=lambda x: x.lower(), inplace=True)
+
+    claves = NORMALIZADORES[regla.normalizar](df[regla.clave])
+    mapa = {}
+    for clave, valor in zip(claves, df[regla.valor]):
+        if pd.isna(valor):
+            continue
+        valor = _formatear(valor, regla.formato)
+        if clave in mapa:
+            if mapa[clave] != valor:
+                logging.warning(
+                    f"{regla.archivo}: '{clave}' aparece con {mapa[clave]} y {valor}, se usa {mapa[clave]}"
+                )
+            continue
+        mapa[clave] = valor
+    return mapa
+
+
+def cargar_regla(regla, dir_reglas):
+    """
+    Diccionario compilado de la regla, desde .compiladas/ si el libro no
+    cambió; si cambió se recompila y se vuelve a guardar.
+    """
+    ruta = os.path.join(dir_reglas, regla.archivo)
+    ruta_cache = os.path.join(dir_reglas, CARPETA_COMPILADAS, regla.archivo + ".pkl")
+    stat = os.stat(ruta)
+    firma = (VERSION_COMPILADO, regla.hoja, regla.clave, regla.valor, regla.normalizar, regla.formato)
+
+    cache = None
+    if os.path.exists(ruta_cache):
+        try:
+            with open(ruta_cache, 'rb') as f:
+                cache = pickle.load(f)
+        except Exception as e:
+            logging.warning(f"{ruta_cache}: compilado ilegible, se recompila ({e})")
+
+    if cache and cache['firma'] == firma:
+        if (cache['mtime'], cache['tamano']) == (stat.st_mtime_ns, stat.st_size):
+            return cache['mapa']
+        if cache['hash'] == _hash_archivo(ruta):
+            # Mismo contenido con otro mtime (copia, checkout): solo se actualiza la marca
+            cache['mtime'], cache['tamano'] = stat.st_mtime_ns, stat.st_size
+            _guardar_cache(ruta_cache, cache)
+            return cache['mapa']
+
+    logging.info(f"Compilando regla {regla.archivo}")
+    cache = {
+        'firma': firma,
+        'mtime': stat.st_mtime_ns,
+        'tamano': stat.st_size,
+        'hash': _hash_archivo(ruta),
+        'mapa': compilar_regla(regla, ruta),
+    }
+    _guardar_cache(ruta_cache, cache)
+    return cache['mapa']
+
+
+def _guardar_cache(ruta_cache, cache):
+    os.makedirs(os.path.dirname(ruta_cache), exist_ok=True)
+    temporal = f"{ruta_cache}.tmp"
+    with open(temporal, 'wb') as f:
+        pickle.dump(cache, f)
+    os.replace(temporal, ruta_cache)
+
+
+# ============================================================
+# APLICACIÓN
+# ============================================================
+def aplicar_regla(serie, regla, mapa):
+    """Serie homologada: valor de la regla, 'nulo' si viene vacía, 'sin_regla' si no está."""
+    normalizada = NORMALIZADORES[regla.normalizar](serie)
+    posiciones = pd.Index(list(mapa)).get_indexer(normalizada)
+    valores = np.array(list(mapa.values()) + [regla.sin_regla], dtype=object)
+    resultado = pd.Series(valores[posiciones], index=serie.index, dtype=object)
+    # Se evalúa sobre la columna ya normalizada a texto, como las reglas originales
+    resultado[normalizada.isna()] = regla.nulo
+
+    if regla.formato == 'int' and not pd.isna(regla.sin_regla):
+        return resultado.astype('int64')
+    return resultado
+
+
+def homologar(df, dir_reglas, reglas=REGLAS):
+    """Aplica todas las reglas sobre df (columnas ya sin espacios) y lo devuelve."""
+    df = df.copy()
+    for regla in reglas:
+        df[regla.columna] = aplicar_regla(df[regla.columna], regla, cargar_regla(regla, dir_reglas))
+    return df
+
+
+# ============================================================
+# FORMATO DE CAMPOS
+# ============================================================
+def rellenar_ceros(texto, ancho, con_punto=False):
+    """zfill(ancho) solo a los valores numéricos (con con_punto, admite un '.')."""
+    digitos = texto.str.replace(".", "", n=1, regex=False) if con_punto else texto
+    return texto.where(~digitos.str.isdigit(), texto.str.zfill(ancho))
+
+
+def formatear_identificadores(df):
+    """Identificadores como texto sin '.0' y PROGRAMA con su formato original '00'."""
+    df = df.copy()
+    for col in ["HISTORIA", "RUN_PACIENTE", "NRO_HISTORIA", "EPISODIO"]:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.replace(r"\.0$", "", regex=True).str.strip()
+
+    if "PROGRAMA" in df.columns:
+        df["PROGRAMA"] = rellenar_ceros(df["PROGRAMA"].astype(str), 2, con_punto=True)
+    return df
+
+
+def formatear_geograficos(df):
+    """DIST_PAC a 3 dígitos, MRES a 5, y RUT (MEDICOALT, CIP) en mayúsculas."""
+    df = df.copy()
+    if "DIST_PAC" in df.columns:
+        df["DIST_PAC"] = rellenar_ceros(df["DIST_PAC"].astype(str).str.strip(), 3)
+    if "MRES" in df.columns:
+        df["MRES"] = rellenar_ceros(df["MRES"].astype(str).str.strip(), 5)
+    for col in ["MEDICOALT", "CIP"]:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.strip().str.upper()
+    return df
@@ -0,0 +1,110 @@
+"""
+Extracción incremental por marca de agua (watermark).
+
+Cada tabla MySQL guarda en etl_watermark la fecha de su última carga
+exitosa. La corrida siguiente re-extrae de IRIS solo desde esa fecha menos
+ETL_VENTANA_DIAS (datos recientes que todavía cambian: altas, estados,
+suspensiones), borra ese mismo rango en MySQL y lo vuelve a insertar.
+
+Sin watermark (primera corrida) o con ETL_CARGA_COMPLETA=1 se recarga la
+historia completa desde la fecha histórica del script.
+
+En ambos casos los lectores no ven datos a medias: la recarga completa se
+publica con staging + RENAME TABLE y la incremental hace el DELETE y los
+INSERT en una sola transacción. Si la tabla tiene clave natural se fusiona
+por hash de fila (FusionMySQL) y solo se escriben los cambios.
+"""
+import os
+import logging
+from datetime import date, timedelta
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+from z_comun.carga_mysql import CargaMySQL, FusionMySQL, carga_publicada
+
+load_dotenv()
+
+ETL_VENTANA_DIAS = int(os.getenv('ETL_VENTANA_DIAS', 30))
+ETL_CARGA_COMPLETA = os.getenv('ETL_CARGA_COMPLETA', '0') == '1'
+
+
+def asegurar_tabla_watermark(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS etl_watermark (
+            tabla               VARCHAR(64) PRIMARY KEY,
+            ultima_carga        DATE NOT NULL,
+            fechaActualizacion  DATETIME NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+
+def leer_watermark(cursor, tabla):
+    cursor.execute("SELECT ultima_carga FROM etl_watermark WHERE tabla = %s", (tabla,))
+    fila = cursor.fetchone()
+    return fila[0] if fila else None
+
+
+def guardar_watermark(cursor, tabla, fecha):
+    cursor.execute("""
+        INSERT INTO etl_watermark (tabla, ultima_carga, fechaActualizacion)
+        VALUES (%s, %s, NOW())
+        ON DUPLICATE KEY UPDATE ultima_carga = VALUES(ultima_carga),
+                                fechaActualizacion = VALUES(fechaActualizacion)
+    """, (tabla, fecha))
+
+
+def inicio_extraccion(cursor, tabla, desde_historico, dias=ETL_VENTANA_DIAS):
+    """
+    Devuelve (desde, completa): la fecha desde la que hay que extraer y si
+    corresponde una recarga completa de la tabla.
+    """
+    if isinstance(desde_historico, str):
+        desde_historico = date.fromisoformat(desde_historico)
+
+    asegurar_tabla_watermark(cursor)
+    watermark = None if ETL_CARGA_COMPLETA else leer_watermark(cursor, tabla)
+    if watermark is None:
+        logging.info(f"{tabla}: carga completa desde {desde_historico}")
+        return desde_historico, True
+
+    desde = max(desde_historico, watermark - timedelta(days=dias))
+    logging.info(f"{tabla}: carga incremental desde {desde} (watermark {watermark}, ventana {dias} días)")
+    return desde, False
+
+
+@contextmanager
+def carga_incremental(conn, tabla, expresion_fecha, desde, completa, columnas=None, clave=None):
+    """
+    Entrega un CargaMySQL para las filas extraídas desde 'desde'.
+    Completa: recarga vía staging + RENAME TABLE. Incremental: borra las filas
+    con expresion_fecha >= desde y las reemplaza, todo en una transacción.
+    Con 'clave' entrega un FusionMySQL: compara por hash contra toda la tabla
+    (completa) o solo contra la ventana (incremental).
+    'expresion_fecha' es SQL MySQL que entrega una fecha comparable, p. ej.
+    STR_TO_DATE(fechaEpisodio, '%d-%m-%Y').
+    """
+    if clave:
+        alcance = None if completa else f"{expresion_fecha} >= '{desde.isoformat()}'"
+        with FusionMySQL(conn, tabla, clave, columnas, alcance=alcance) as fusion:
+            yield fusion
+        return
+
+    if completa:
+        with carga_publicada(conn, tabla, columnas) as carga:
+            yield carga
+        return
+
+    cursor = conn.cursor()
+    try:
+        # Sin parámetros: la expresión puede traer '%' de STR_TO_DATE
+        cursor.execute(f"DELETE FROM {tabla} WHERE {expresion_fecha} >= '{desde.isoformat()}'")
+        logging.info(f"{tabla}: {cursor.rowcount} filas a reemplazar desde {desde}")
+        with CargaMySQL(conn, tabla, columnas, commit_por_bloque=False) as carga:
+            yield carga
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
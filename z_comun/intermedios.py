@@ -0,0 +1,182 @@
+"""
+Archivos intermedios columnares (Parquet / Arrow IPC).
+
+Los pasos de un pipeline se pasan tablas por disco. Leer y escribir .xlsx
+es lo más lento de esas entregas, así que los intermedios se guardan en
+Parquet (o Arrow IPC con FORMATO_INTERMEDIO=arrow) y el .xlsx se genera
+solo para los archivos que abre una persona (excel=True).
+
+Las rutas se declaran sin importar la extensión: ruta_intermedio() la
+reemplaza por la del formato configurado. Mientras exista solo el .xlsx de
+una corrida anterior, leer_tabla() lo sigue leyendo.
+"""
+import os
+import time
+import logging
+from contextlib import contextmanager
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+FORMATO_INTERMEDIO = os.getenv('FORMATO_INTERMEDIO', 'parquet')
+
+# INTERMEDIOS_XLSX=1 escribe además una copia .xlsx de cada intermedio
+INTERMEDIOS_XLSX = os.getenv('INTERMEDIOS_XLSX', '0') == '1'
+
+EXTENSIONES = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+ARCHIVO_BLOQUEO = '.bloqueo'
+
+# Un bloqueo más viejo que esto se da por abandonado
+BLOQUEO_MAX_SEGUNDOS = 2 * 3600
+
+
+def ruta_intermedio(ruta):
+    return os.path.splitext(ruta)[0] + EXTENSIONES[FORMATO_INTERMEDIO]
+
+
+def ruta_excel(ruta):
+    return os.path.splitext(ruta)[0] + '.xlsx'
+
+
+# ============================================================
+# CONVERSIÓN
+# ============================================================
+def tabla_desde_filas(columnas, filas):
+    """
+    DataFrame tipado a partir de filas de texto (consultar() de z_comun.iris).
+    Usa el mismo TextParser que pd.read_excel: vacíos como nulos y números
+    como números, así los pasos siguientes ven los mismos tipos que antes.
+    """
+    columnas = [str(c) for c in columnas]
+    if not filas:
+        return pd.DataFrame(columns=columnas)
+    return TextParser([columnas] + [list(f) for f in filas], header=0).read()
+
+
+def _texto_en_columnas_mixtas(df):
+    # Parquet exige un tipo por columna: lo mixto (p. ej. int y str) va a texto
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        valores = df[col].dropna()
+        if valores.map(type).nunique() > 1:
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+    return df
+
+
+# ============================================================
+# ESCRITURA / LECTURA
+# ============================================================
+def _escribir(df, ruta):
+    if FORMATO_INTERMEDIO == 'arrow':
+        df.reset_index(drop=True).to_feather(ruta)
+    else:
+        df.to_parquet(ruta, index=False)
+
+
+def guardar_tabla(df, ruta, excel=False):
+    """
+    Escribe df en el formato intermedio configurado. El archivo se publica
+    con os.replace para que un paso concurrente nunca lea uno a medias.
+    Con excel=True (o INTERMEDIOS_XLSX=1) deja también el .xlsx.
+    """
+    destino = ruta_intermedio(ruta)
+    os.makedirs(os.path.dirname(destino) or '.', exist_ok=True)
+    temporal = f"{destino}.tmp"
+
+    try:
+        _escribir(df, temporal)
+    except (TypeError, ValueError) as e:
+        # pyarrow.ArrowTypeError / ArrowInvalid heredan de estos
+        logging.warning(f"{destino}: columnas con tipos mixtos, se guardan como texto ({e})")
+        _escribir(_texto_en_columnas_mixtas(df), temporal)
+    os.replace(temporal, destino)
+
+    if excel or INTERMEDIOS_XLSX:
+        df.to_excel(ruta_excel(ruta), index=False)
+    elif os.path.exists(ruta_excel(ruta)):
+        # .xlsx de antes del cambio: que leer_tabla no lo tome por vigente
+        os.remove(ruta_excel(ruta))
+    return destino
+
+
+def guardar_filas(columnas, filas, ruta, excel=False):
+    return guardar_tabla(tabla_desde_filas(columnas, filas), ruta, excel)
+
+
+def existe_tabla(ruta):
+    return any(os.path.exists(r) for r in _candidatas(ruta))
+
+
+def _candidatas(ruta):
+    base = os.path.splitext(ruta)[0]
+    preferida = ruta_intermedio(ruta)
+    otras = [base + ext for ext in EXTENSIONES.values() if base + ext != preferida]
+    return [preferida] + otras + [base + '.xlsx']
+
+
+def leer_tabla(ruta, columnas=None):
+    for candidata in _candidatas(ruta):
+        if not os.path.exists(candidata):
+            continue
+        if candidata.endswith('.parquet'):
+            return pd.read_parquet(candidata, columns=columnas)
+        if candidata.endswith('.arrow'):
+            return pd.read_feather(candidata, columns=columnas)
+        logging.warning(f"{ruta}: no hay intermedio columnar, se lee {candidata}")
+        return pd.read_excel(candidata, usecols=columnas)
+    raise FileNotFoundError(ruta_intermedio(ruta))
+
+
+def leer_filas(ruta):
+    """
+    (columnas, filas) con nulos como None, como las entregaba
+    openpyxl.iter_rows(values_only=True).
+    """
+    df = leer_tabla(ruta)
+    filas = df.astype(object).where(df.notna(), None).values.tolist()
+    return list(df.columns), [tuple(f) for f in filas]
+
+
+# ============================================================
+# BLOQUEO DE UN DIRECTORIO DE INTERMEDIOS
+# ============================================================
+@contextmanager
+def bloqueo(directorio, espera_max=BLOQUEO_MAX_SEGUNDOS):
+    """
+    Exclusión entre procesos para actualizar los archivos de 'directorio'
+    (base quirúrgica, traslados): un archivo .bloqueo creado con O_EXCL.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, ARCHIVO_BLOQUEO)
+    inicio = time.monotonic()
+    while True:
+        try:
+            fd = os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(ruta) > BLOQUEO_MAX_SEGUNDOS:
+                    logging.warning(f"{ruta}: bloqueo abandonado, se elimina")
+                    os.remove(ruta)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() - inicio > espera_max:
+                raise TimeoutError(f"{ruta}: otro proceso sigue actualizando {directorio}")
+            time.sleep(5)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,501 @@
+"""
+Acceso compartido a InterSystems IRIS vía JDBC.
+
+Cada proceso levanta como máximo una JVM y reutiliza un pool de conexiones
+autenticadas. Si hay un worker de extracción corriendo (z_comun/iris_worker.py)
+las consultas se delegan a él y el script no levanta su propia JVM.
+"""
+import os
+import time
+import queue
+import logging
+import calendar
+import threading
+from collections import deque
+from datetime import date, timedelta
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Client
+
+import jaydebeapi
+import jpype
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+jdbc_driver_name = os.getenv('JDBC_DRIVER_NAME')
+jdbc_driver_loc = os.getenv('JDBC_DRIVER_PATH')
+iris_connection_string = os.getenv('CONEXION_STRING')
+iris_user = os.getenv('DB_USER')
+iris_password = os.getenv('DB_PASSWORD')
+
+IRIS_POOL_SIZE = int(os.getenv('IRIS_POOL_SIZE', 4))
+
+# Filas por lote en consultar_por_lotes (y fetch size JDBC del ResultSet)
+IRIS_FETCH_SIZE = int(os.getenv('IRIS_FETCH_SIZE', 5000))
+
+# Consultas IRIS simultáneas en consultar_por_ventanas (nunca más que el pool)
+IRIS_PARALELO = min(int(os.getenv('IRIS_PARALELO', 3)), IRIS_POOL_SIZE)
+
+# Lector columnar del lado Java (z_comun/java). Si el jar no existe se
+# convierte celda a celda con convertir_valor.
+IRIS_LECTOR_JAR = os.getenv(
+    'IRIS_LECTOR_JAR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'java', 'lector_columnar.jar')
+)
+SEPARADOR_COLUMNAR = '\x1f'
+ESCAPE_COLUMNAR = '\x1b'
+
+# Worker: IRIS_WORKER=0 obliga a usar JVM local aunque el worker esté arriba
+IRIS_WORKER = os.getenv('IRIS_WORKER', '1') != '0'
+IRIS_WORKER_HOST = os.getenv('IRIS_WORKER_HOST', '127.0.0.1')
+IRIS_WORKER_PORT = int(os.getenv('IRIS_WORKER_PORT', 6070))
+IRIS_WORKER_AUTHKEY = (os.getenv('IRIS_WORKER_AUTHKEY') or iris_password or '').encode()
+
+
+def direccion_worker():
+    return (IRIS_WORKER_HOST, IRIS_WORKER_PORT)
+
+
+# ============================================================
+# CONVERSIÓN DE VALORES JDBC
+# ============================================================
+def convertir_valor(cell):
+    try:
+        if cell is None:
+            return ""
+        if hasattr(cell, "toString"):
+            return str(cell.toString())
+        if isinstance(cell, (bytes, bytearray)):
+            return cell.decode("utf-8", errors="replace")
+        return str(cell)
+    except Exception as e:
+        logging.warning(f"No se pudo convertir valor '{cell}' ({type(cell)}): {e}")
+        return "[ERROR]"
+
+
+# ============================================================
+# JVM + POOL DE CONEXIONES
+# ============================================================
+_lock_jvm = threading.Lock()
+
+
+def iniciar_jvm():
+    with _lock_jvm:
+        if not jpype.isJVMStarted():
+            if not jdbc_driver_name or not jdbc_driver_loc:
+                raise ValueError("JDBC_DRIVER_NAME o JDBC_DRIVER_PATH no configurados.")
+            classpath = jdbc_driver_loc
+            if os.path.exists(IRIS_LECTOR_JAR):
+                classpath += os.pathsep + IRIS_LECTOR_JAR
+            jpype.startJVM(jpype.getDefaultJVMPath(), "-Djava.class.path=" + classpath)
+
+
+def conectar_iris():
+    if not iris_connection_string or not iris_user or not iris_password:
+        raise ValueError("Variables IRIS no configuradas correctamente.")
+    iniciar_jvm()
+    return jaydebeapi.connect(
+        jdbc_driver_name,
+        iris_connection_string,
+        {'user': iris_user, 'password': iris_password},
+        jdbc_driver_loc
+    )
+
+
+class PoolIris:
+    """
+    Pool acotado de conexiones IRIS. Las conexiones se abren a demanda
+    hasta 'tamano' y se reutilizan entre consultas.
+    """
+
+    def __init__(self, tamano=IRIS_POOL_SIZE):
+        self.tamano = tamano
+        self._libres = queue.LifoQueue()
+        self._abiertas = 0
+        self._lock = threading.Lock()
+
+    def _obtener(self):
+        while True:
+            try:
+                return self._libres.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                crear = self._abiertas < self.tamano
+                if crear:
+                    self._abiertas += 1
+
+            if crear:
+                try:
+                    return conectar_iris()
+                except Exception:
+                    with self._lock:
+                        self._abiertas -= 1
+                    raise
+
+            # Pool lleno: esperar una conexión libre (o un cupo si se descartó alguna)
+            try:
+                return self._libres.get(timeout=1)
+            except queue.Empty:
+                continue
+
+    def _descartar(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._abiertas -= 1
+
+    @contextmanager
+    def conexion(self):
+        conn = self._obtener()
+        try:
+            yield conn
+        except BaseException:
+            # Conexión posiblemente inválida (o lectura abandonada a medias):
+            # se descarta y se abrirá otra
+            self._descartar(conn)
+            raise
+        else:
+            self._libres.put(conn)
+
+    def cerrar(self):
+        while True:
+            try:
+                conn = self._libres.get_nowait()
+            except queue.Empty:
+                break
+            self._descartar(conn)
+
+
+def _fijar_fetch_size(cursor, tamano):
+    # jaydebeapi no expone el fetch size; se fija en el ResultSet JDBC
+    rs = getattr(cursor, '_rs', None)
+    if rs is None:
+        return
+    try:
+        rs.setFetchSize(tamano)
+    except Exception as e:
+        logging.warning(f"No se pudo fijar fetch size {tamano}: {e}")
+
+
+_lector = None
+
+
+def _lector_columnar():
+    """Clase etl.LectorColumnar si está en el classpath; False si no."""
+    global _lector
+    if _lector is None:
+        try:
+            _lector = jpype.JClass('etl.LectorColumnar')
+        except Exception:
+            logging.info(f"Lector columnar no disponible ({IRIS_LECTOR_JAR}), se convierte por celda")
+            _lector = False
+    return _lector
+
+
+def _separar_columna(columna, filas, escapada):
+    valores = columna.split(SEPARADOR_COLUMNAR)
+    if escapada:
+        valores = [
+            v.replace(ESCAPE_COLUMNAR + '1', SEPARADOR_COLUMNAR).replace(ESCAPE_COLUMNAR + '0', ESCAPE_COLUMNAR)
+            for v in valores
+        ]
+    if len(valores) != filas:
+        # No debería pasar con el escape del lado Java; mejor fallar que desplazar filas
+        raise RuntimeError(f"Lector columnar: {len(valores)} valores para {filas} filas")
+    return valores
+
+
+def _lotes_columnares(cursor, tamano_lote):
+    """
+    Genera cada lote como lista de columnas (listas de str). Con el lector
+    Java cada columna cruza el puente JPype como una sola cadena.
+    """
+    lector = _lector_columnar()
+    rs = getattr(cursor, '_rs', None)
+    if lector and rs is not None:
+        while True:
+            salida = lector.leerLote(rs, tamano_lote)
+            filas = int(str(salida[0]))
+            if filas == 0:
+                return
+            if len(salida) == len(cursor.description) + 1:
+                # Jar compilado antes de las marcas de escape: sin marcas
+                columnas, marcas = salida[1:], '0' * len(cursor.description)
+            else:
+                columnas, marcas = salida[2:], str(salida[1])
+            yield [
+                _separar_columna(str(col), filas, marca == '1')
+                for col, marca in zip(columnas, marcas)
+            ]
+    else:
+        while True:
+            rows = cursor.fetchmany(tamano_lote)
+            if not rows:
+                return
+            yield [list(col) for col in zip(*([convertir_valor(v) for v in row] for row in rows))]
+
+
+def _a_filas(datos):
+    return [list(fila) for fila in zip(*datos)]
+
+
+def ejecutar_en_conexion(conn, query):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query)
+        _fijar_fetch_size(cursor, IRIS_FETCH_SIZE)
+        columnas = [str(desc[0]) for desc in cursor.description]
+        filas = []
+        for datos in _lotes_columnares(cursor, IRIS_FETCH_SIZE):
+            filas.extend(_a_filas(datos))
+        return columnas, filas
+    finally:
+        cursor.close()
+
+
+def columnas_en_conexion(conn, query, tamano_lote=IRIS_FETCH_SIZE):
+    """Genera (columnas, datos) con datos = una lista de str por columna."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query)
+        _fijar_fetch_size(cursor, tamano_lote)
+        columnas = [str(desc[0]) for desc in cursor.description]
+        for datos in _lotes_columnares(cursor, tamano_lote):
+            yield columnas, datos
+    finally:
+        cursor.close()
+
+
+# ============================================================
+# API PARA LOS SCRIPTS
+# ============================================================
+_pool_local = None
+_lock_pool = threading.Lock()
+
+
+def _pool():
+    global _pool_local
+    with _lock_pool:
+        if _pool_local is None:
+            _pool_local = PoolIris()
+    return _pool_local
+
+
+def _conectar_worker():
+    if not IRIS_WORKER:
+        return None
+    try:
+        return Client(direccion_worker(), authkey=IRIS_WORKER_AUTHKEY)
+    except (ConnectionRefusedError, FileNotFoundError, OSError):
+        return None
+
+
+def _consultar_worker(query):
+    """Devuelve (columnas, filas) o None si no hay worker disponible."""
+    conn = _conectar_worker()
+    if conn is None:
+        return None
+    try:
+        conn.send(('consultar', query))
+        respuesta = conn.recv()
+    except (EOFError, OSError) as e:
+        # El worker se cerró a mitad de la consulta: se repite con la JVM local
+        logging.warning(f"Worker IRIS no respondió ({e!r}), se consulta en local")
+        return None
+    finally:
+        conn.close()
+    if respuesta[0] == 'error':
+        raise RuntimeError(f"Worker IRIS: {respuesta[1]}")
+    return respuesta[1], respuesta[2]
+
+
+def _columnas_worker(conn, query, tamano_lote):
+    try:
+        conn.send(('consultar_columnas', query, tamano_lote))
+        while True:
+            respuesta = conn.recv()
+            if respuesta[0] == 'lote':
+                yield respuesta[1], respuesta[2]
+            elif respuesta[0] == 'fin':
+                return
+            else:
+                raise RuntimeError(f"Worker IRIS: {respuesta[1]}")
+    finally:
+        conn.close()
+
+
+def _columnas_local(query, tamano_lote):
+    with _pool().conexion() as conn:
+        yield from columnas_en_conexion(conn, query, tamano_lote)
+
+
+def consultar(query):
+    """
+    Ejecuta la consulta en IRIS y devuelve (columnas, filas) con todos los
+    valores convertidos a str ('' para NULL). Usa el worker si está arriba;
+    si no, una JVM y un pool locales al proceso.
+    """
+    inicio = time.perf_counter()
+    resultado = _consultar_worker(query)
+    if resultado is not None:
+        logging.info(
+            f"IRIS (worker): {len(resultado[1])} filas en "
+            f"{time.perf_counter() - inicio:.2f}s"
+        )
+        return resultado
+
+    with _pool().conexion() as conn:
+        logging.info(f"IRIS (local): JVM + conexión listas en {time.perf_counter() - inicio:.2f}s")
+        columnas, filas = ejecutar_en_conexion(conn, query)
+    logging.info(f"IRIS (local): {len(filas)} filas en {time.perf_counter() - inicio:.2f}s")
+    return columnas, filas
+
+
+def _consultar_columnas(query, tamano_lote):
+    inicio = time.perf_counter()
+    conn_worker = _conectar_worker()
+    if conn_worker is not None:
+        origen = "worker"
+        lotes = _columnas_worker(conn_worker, query, tamano_lote)
+    else:
+        origen = "local"
+        lotes = _columnas_local(query, tamano_lote)
+
+    total = 0
+    for columnas, datos in lotes:
+        if total == 0:
+            logging.info(f"IRIS ({origen}): primer lote en {time.perf_counter() - inicio:.2f}s")
+        total += len(datos[0]) if datos else 0
+        yield columnas, datos
+    logging.info(
+        f"IRIS ({origen}): {total} filas en lotes de {tamano_lote} en "
+        f"{time.perf_counter() - inicio:.2f}s"
+    )
+
+
+def consultar_por_lotes(query, tamano_lote=IRIS_FETCH_SIZE):
+    """
+    Igual que consultar() pero sin materializar el resultado: genera
+    (columnas, filas) de a 'tamano_lote' filas a medida que IRIS las entrega,
+    para cargar cada lote mientras se sigue leyendo el siguiente.
+    """
+    for columnas, datos in _consultar_columnas(query, tamano_lote):
+        yield columnas, _a_filas(datos)
+
+
+def consultar_columnar(query, tamano_lote=IRIS_FETCH_SIZE, formato='numpy'):
+    """
+    Genera cada lote en forma columnar:
+      formato='numpy' -> dict {columna: np.ndarray de str}
+      formato='arrow' -> pyarrow.RecordBatch con columnas string
+    """
+    if formato == 'arrow':
+        import pyarrow as pa
+    else:
+        import numpy as np
+
+    for columnas, datos in _consultar_columnas(query, tamano_lote):
+        if formato == 'arrow':
+            yield pa.RecordBatch.from_arrays(
+                [pa.array(col, type=pa.string()) for col in datos], names=columnas
+            )
+        else:
+            yield {nombre: np.array(col, dtype=object) for nombre, col in zip(columnas, datos)}
+
+
+def _sumar_meses(fecha, meses):
+    mes = fecha.month - 1 + meses
+    anio = fecha.year + mes // 12
+    mes = mes % 12 + 1
+    return date(anio, mes, min(fecha.day, calendar.monthrange(anio, mes)[1]))
+
+
+def hace_meses(meses, desde=None):
+    """Fecha de hace 'meses' meses (equivale a DATEADD(MONTH, -meses, CURRENT_DATE))."""
+    return _sumar_meses(desde or date.today(), -meses)
+
+
+def ventanas_fechas(desde, hasta=None, meses=1):
+    """
+    Parte [desde, hasta) en ventanas de 'meses' meses. 'hasta' por defecto es
+    mañana, para incluir el día de hoy completo. Acepta date o 'YYYY-MM-DD'.
+    """
+    if isinstance(desde, str):
+        desde = date.fromisoformat(desde)
+    if hasta is None:
+        hasta = date.today() + timedelta(days=1)
+    elif isinstance(hasta, str):
+        hasta = date.fromisoformat(hasta)
+
+    ventanas = []
+    inicio = desde
+    k = 1
+    while inicio < hasta:
+        fin = min(_sumar_meses(desde, k * meses), hasta)
+        ventanas.append((inicio, fin))
+        inicio = fin
+        k += 1
+    return ventanas
+
+
+def consultar_por_ventanas(plantilla, desde, hasta=None, meses=1, paralelo=IRIS_PARALELO):
+    """
+    Ejecuta 'plantilla' una vez por ventana de fechas, con {desde} y {hasta}
+    (formato YYYY-MM-DD) reemplazados en el predicado de fecha, p. ej.:
+        WHERE PAADM_ADMDATE >= '{desde}' AND PAADM_ADMDATE < '{hasta}'
+    Hasta 'paralelo' ventanas corren a la vez (cada una en su conexión del
+    pool o del worker) y se genera (columnas, filas) por ventana en orden
+    cronológico, sin adelantar más de 'paralelo' ventanas en memoria.
+    Sin 'hasta' la última ventana queda abierta (fechas futuras incluidas).
+    """
+    ventanas = ventanas_fechas(desde, hasta, meses)
+    if hasta is None and ventanas:
+        ventanas[-1] = (ventanas[-1][0], date.max)
+    paralelo = max(1, min(paralelo, IRIS_POOL_SIZE))
+    inicio = time.perf_counter()
+    logging.info(f"IRIS: {len(ventanas)} ventanas de {meses} mes(es), {paralelo} en paralelo")
+
+    def consultar_ventana(ventana):
+        return consultar(plantilla.format(desde=ventana[0].isoformat(), hasta=ventana[1].isoformat()))
+
+    total = 0
+    with ThreadPoolExecutor(max_workers=paralelo, thread_name_prefix="iris") as executor:
+        pendientes = deque()
+        siguientes = iter(ventanas)
+        for ventana in siguientes:
+            pendientes.append((ventana, executor.submit(consultar_ventana, ventana)))
+            if len(pendientes) >= paralelo:
+                break
+        try:
+            while pendientes:
+                ventana, futuro = pendientes.popleft()
+                columnas, filas = futuro.result()
+                siguiente = next(siguientes, None)
+                if siguiente is not None:
+                    pendientes.append((siguiente, executor.submit(consultar_ventana, siguiente)))
+                logging.info(f"Ventana {ventana[0]} a {ventana[1]}: {len(filas)} filas")
+                total += len(filas)
+                yield columnas, filas
+        finally:
+            for _, futuro in pendientes:
+                futuro.cancel()
+
+    logging.info(f"IRIS: {total} filas en {len(ventanas)} ventanas en {time.perf_counter() - inicio:.2f}s")
+
+
+def cerrar_iris():
+    """Cierra el pool local y apaga la JVM si este proceso la levantó."""
+    global _pool_local
+    if _pool_local is not None:
+        _pool_local.cerrar()
+        _pool_local = None
+    if jpype.isJVMStarted():
+        jpype.shutdownJVM()
@@ -0,0 +1,333 @@
+"""
+Worker de extracción IRIS de larga duración.
+
+Mantiene una JVM caliente y un pool de conexiones autenticadas, y atiende
+consultas de los scripts (z_comun.iris.consultar) por un socket local.
+
+Uso permanente (por ejemplo @reboot en crontab), desde la raíz del proyecto:
+    python -m z_comun.iris_worker
+
+Los z0_main / 0_main lo levantan por la duración de la corrida con
+worker_iris() si no hay uno ya corriendo. Un worker así (--transitorio) es
+compartido: cada corrida se registra como dueña y el worker se detiene
+cuando sale la última (o muere su proceso), después de terminar las
+consultas en curso. Un worker permanente no se detiene al quedar sin dueños.
+"""
+import os
+import sys
+import time
+import uuid
+import logging
+import threading
+import subprocess
+from contextlib import contextmanager
+from multiprocessing.connection import Listener, Client
+
+from z_comun.iris import (
+    PoolIris,
+    IRIS_POOL_SIZE,
+    IRIS_WORKER,
+    IRIS_WORKER_AUTHKEY,
+    direccion_worker,
+    ejecutar_en_conexion,
+    columnas_en_conexion,
+    iniciar_jvm,
+    cerrar_iris,
+)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cada cuánto el worker revisa si los procesos dueños siguen vivos
+REVISION_DUENOS_SEGUNDOS = 30
+
+
+# ============================================================
+# SERVIDOR
+# ============================================================
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Duenos:
+    """
+    Corridas que usan un worker transitorio ({token: pid}). El worker se
+    detiene cuando se va la última; uno permanente nunca se detiene por esto.
+    """
+
+    def __init__(self, detener, transitorio):
+        self.detener = detener
+        self.transitorio = transitorio
+        self._duenos = {}
+        self._lock = threading.Lock()
+
+    def tomar(self, token, pid):
+        with self._lock:
+            # Si ya se está deteniendo, el cliente debe levantar otro worker
+            if self.detener.is_set():
+                return False
+            self._duenos[token] = pid
+            logging.info(f"Dueño registrado (pid {pid}), {len(self._duenos)} activo(s)")
+            return True
+
+    def soltar(self, token):
+        with self._lock:
+            pid = self._duenos.pop(token, None)
+            if pid is not None:
+                logging.info(f"Dueño liberado (pid {pid}), {len(self._duenos)} activo(s)")
+            return self._revisar()
+
+    def depurar(self):
+        """Libera a los dueños cuyo proceso murió sin soltar el worker."""
+        with self._lock:
+            for token, pid in list(self._duenos.items()):
+                if not _proceso_vivo(pid):
+                    logging.warning(f"Dueño pid {pid} terminó sin liberar el worker")
+                    del self._duenos[token]
+            return self._revisar()
+
+    def _revisar(self):
+        if self.transitorio and not self._duenos and not self.detener.is_set():
+            logging.info("Sin dueños: el worker se detiene")
+            self.detener.set()
+            return True
+        return False
+
+
+
+
+def _despertar():
+    # Un ping para que accept() retorne y el servidor vea la orden
+    try:
+        _enviar(('ping',))
+    except (ConnectionRefusedError, OSError, EOFError):
+        pass
+
+
+def _atender(conn, pool, detener, duenos):
+    try:
+        mensaje = conn.recv()
+        accion = mensaje[0]
+
+        if accion == 'ping':
+            conn.send(('ok',))
+        elif accion == 'tomar':
+            conn.send(('ok',) if duenos.tomar(mensaje[1], mensaje[2]) else ('deteniendo',))
+        elif accion == 'soltar':
+            conn.send(('ok',))
+            if duenos.soltar(mensaje[1]):
+                _despertar()
+        elif accion == 'detener':
+            detener.set()
+            conn.send(('ok',))
+        elif accion == 'consultar':
+            try:
+                with pool.conexion() as conn_iris:
+                    columnas, filas = ejecutar_en_conexion(conn_iris, mensaje[1])
+                conn.send(('ok', columnas, filas))
+            except Exception as e:
+                logging.error(f"Error en consulta: {e}")
+                conn.send(('error', str(e)))
+        elif accion == 'consultar_columnas':
+            # El envío bloquea si el cliente aún está cargando el lote
+            # anterior, así el worker no acumula el resultado completo
+            try:
+                with pool.conexion() as conn_iris:
+                    for columnas, datos in columnas_en_conexion(conn_iris, mensaje[1], mensaje[2]):
+                        conn.send(('lote', columnas, datos))
+                conn.send(('fin',))
+            except (EOFError, OSError):
+                # Cliente dejó de leer: la conexión IRIS ya se descartó
+                raise
+            except Exception as e:
+                logging.error(f"Error en consulta por lotes: {e}")
+                conn.send(('error', str(e)))
+        else:
+            conn.send(('error', f"Acción desconocida: {accion}"))
+    except (EOFError, OSError) as e:
+        logging.warning(f"Cliente desconectado: {e}")
+    finally:
+        conn.close()
+
+
+def _vigilar_duenos(duenos, detener):
+    while not detener.wait(REVISION_DUENOS_SEGUNDOS):
+        if duenos.depurar():
+            _despertar()
+
+
+def servir(tamano_pool=IRIS_POOL_SIZE, transitorio=False):
+    inicio = time.perf_counter()
+    iniciar_jvm()
+    pool = PoolIris(tamano_pool)
+    # Primera conexión autenticada antes de aceptar clientes
+    with pool.conexion():
+        pass
+    logging.info(f"JVM + pool IRIS listos en {time.perf_counter() - inicio:.2f}s (pool={tamano_pool})")
+
+    detener = threading.Event()
+    duenos = Duenos(detener, transitorio)
+    try:
+        listener = Listener(direccion_worker(), authkey=IRIS_WORKER_AUTHKEY)
+    except OSError as e:
+        # Otra corrida levantó un worker a la vez: se usa ese
+        logging.warning(f"No se pudo escuchar en {direccion_worker()}: {e}")
+        pool.cerrar()
+        cerrar_iris()
+        sys.exit(1)
+    logging.info(f"Worker IRIS escuchando en {direccion_worker()}"
+                 + (" (transitorio)" if transitorio else ""))
+    if transitorio:
+        threading.Thread(target=_vigilar_duenos, args=(duenos, detener), daemon=True).start()
+
+    hilos = []
+    try:
+        while not detener.is_set():
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # Autenticación fallida u otro error de un cliente puntual
+                logging.warning(f"Conexión rechazada: {e}")
+                continue
+            hilo = threading.Thread(target=_atender, args=(conn, pool, detener, duenos), daemon=True)
+            hilo.start()
+            hilos = [h for h in hilos if h.is_alive()] + [hilo]
+            if detener.wait(0.05):
+                break
+    finally:
+        listener.close()
+        # Las consultas en curso (de cualquier cliente) terminan antes de
+        # cerrar el pool y apagar la JVM
+        en_curso = [h for h in hilos if h.is_alive()]
+        if en_curso:
+            logging.info(f"Esperando {len(en_curso)} consulta(s) en curso")
+        for hilo in en_curso:
+            hilo.join()
+        pool.cerrar()
+        cerrar_iris()
+        logging.info("Worker IRIS detenido")
+
+
+# ============================================================
+# CLIENTE (USADO POR LOS ORQUESTADORES)
+# ============================================================
+def _enviar(mensaje):
+    conn = Client(direccion_worker(), authkey=IRIS_WORKER_AUTHKEY)
+    try:
+        conn.send(mensaje)
+        return conn.recv()
+    finally:
+        conn.close()
+
+
+def worker_disponible():
+    try:
+        return _enviar(('ping',))[0] == 'ok'
+    except (ConnectionRefusedError, OSError, EOFError):
+        return False
+
+
+def detener_worker():
+    """Detiene el worker aunque tenga dueños (uso manual)."""
+    try:
+        _enviar(('detener',))
+        # Despierta el accept() para que el servidor vea la orden y cierre
+        _enviar(('ping',))
+    except (ConnectionRefusedError, OSError, EOFError):
+        pass
+
+
+def _tomar_worker(token):
+    """True si el worker registró a esta corrida como dueña."""
+    try:
+        return _enviar(('tomar', token, os.getpid()))[0] == 'ok'
+    except (ConnectionRefusedError, OSError, EOFError):
+        return False
+
+
+def _soltar_worker(token):
+    try:
+        _enviar(('soltar', token))
+    except (ConnectionRefusedError, OSError, EOFError):
+        pass
+
+
+def _esperar_worker(proceso, timeout):
+    inicio = time.perf_counter()
+    while not worker_disponible():
+        if proceso.poll() is not None:
+            logging.warning(f"El worker IRIS terminó al iniciar (exit code {proceso.returncode})")
+            return False
+        if time.perf_counter() - inicio > timeout:
+            logging.warning("Timeout esperando al worker IRIS")
+            return False
+        time.sleep(0.5)
+    return True
+
+
+def _levantar_worker(timeout):
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "z_comun.iris_worker", "--transitorio"], cwd=PROJECT_ROOT
+    )
+    # Si otra corrida levantó uno a la vez, este no logra abrir el puerto
+    # y termina; el ping lo responde el de la otra corrida, que se comparte
+    if _esperar_worker(proceso, timeout):
+        logging.info(f"Worker IRIS disponible en {time.perf_counter() - inicio:.2f}s")
+        return True
+    proceso.kill()
+    return False
+
+
+@contextmanager
+def worker_iris(timeout=120):
+    """
+    Asegura un worker IRIS durante el bloque. Si ya hay uno corriendo se
+    reutiliza; si no, se levanta uno transitorio. La corrida se registra
+    como dueña y lo suelta al salir: el worker transitorio se detiene
+    cuando lo suelta la última. Si no logra iniciar, los pasos siguen
+    funcionando con su propia JVM. Con IRIS_WORKER=0 no se usa ni se
+    levanta (cada paso con su JVM, como antes del worker).
+    """
+    if not IRIS_WORKER:
+        logging.info("IRIS_WORKER=0: cada paso levantará su propia JVM")
+        yield
+        return
+
+    token = uuid.uuid4().hex
+    dueno = False
+    # Dos intentos: el worker encontrado puede estar deteniéndose
+    for _ in range(2):
+        if worker_disponible():
+            logging.info("Usando worker IRIS existente")
+        elif not _levantar_worker(timeout):
+            break
+        dueno = _tomar_worker(token)
+        if dueno:
+            break
+        # Se está deteniendo: esperar a que libere el puerto
+        inicio = time.perf_counter()
+        while worker_disponible() and time.perf_counter() - inicio < timeout:
+            time.sleep(0.5)
+
+    if not dueno:
+        logging.warning("Se continúa sin worker: cada paso levantará su propia JVM")
+
+    try:
+        yield
+    finally:
+        if dueno:
+            _soltar_worker(token)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(threadName)s - %(levelname)s - %(message)s'
+    )
+    servir(transitorio="--transitorio" in sys.argv[1:])
@@ -0,0 +1,159 @@
+/*
+ * Lectura columnar de un java.sql.ResultSet para z_comun/iris.py.
+ *
+ * En vez de cruzar el puente JPype una vez por celda, lee hasta 'maxFilas'
+ * filas del lado Java y devuelve una sola cadena por columna con los valores
+ * separados por SEPARADOR (NULL -> ""). Python la separa con str.split.
+ * Los valores se formatean igual que str() sobre lo que entrega jaydebeapi
+ * (fechas, timestamps sin ".0", decimales como float con el repr de Python,
+ * booleanos True/False).
+ *
+ * Un valor que contiene SEPARADOR o ESCAPE se escapa (ESCAPE + '1' y
+ * ESCAPE + '0') y su columna queda marcada, para que Python deshaga el
+ * escape solo en las columnas que lo necesitan.
+ *
+ * Compilar (desde la raíz del proyecto):
+ *     javac -d z_comun/java/build z_comun/java/etl/LectorColumnar.java
+ *     jar cf z_comun/java/lector_columnar.jar -C z_comun/java/build .
+ */
+package etl;
+
+import java.math.BigDecimal;
+import java.sql.ResultSet;
+import java.sql.ResultSetMetaData;
+import java.sql.SQLException;
+import java.sql.Timestamp;
+import java.sql.Types;
+
+public final class LectorColumnar {
+
+    public static final char SEPARADOR = '\u001F';
+    public static final char ESCAPE = '\u001B';
+
+    private LectorColumnar() {
+    }
+
+    /**
+     * Devuelve [filasLeidas, escapadas, columna1, columna2, ...].
+     * filasLeidas = "0" indica que el ResultSet se agotó; escapadas tiene un
+     * carácter por columna ('1' si hubo que escapar algún valor, '0' si no).
+     */
+    public static String[] leerLote(ResultSet rs, int maxFilas) throws SQLException {
+        ResultSetMetaData meta = rs.getMetaData();
+        int n = meta.getColumnCount();
+        int[] tipos = new int[n];
+        StringBuilder[] columnas = new StringBuilder[n];
+        boolean[] escapadas = new boolean[n];
+        for (int c = 0; c < n; c++) {
+            tipos[c] = meta.getColumnType(c + 1);
+            columnas[c] = new StringBuilder();
+        }
+
+        int filas = 0;
+        while (filas < maxFilas && rs.next()) {
+            for (int c = 0; c < n; c++) {
+                if (filas > 0) {
+                    columnas[c].append(SEPARADOR);
+                }
+                String valor = leerValor(rs, c + 1, tipos[c]);
+                if (valor != null) {
+                    if (valor.indexOf(SEPARADOR) >= 0 || valor.indexOf(ESCAPE) >= 0) {
+                        escapadas[c] = true;
+                        escapar(columnas[c], valor);
+                    } else {
+                        columnas[c].append(valor);
+                    }
+                }
+            }
+            filas++;
+        }
+
+        String[] salida = new String[n + 2];
+        salida[0] = Integer.toString(filas);
+        StringBuilder marcas = new StringBuilder(n);
+        for (int c = 0; c < n; c++) {
+            marcas.append(escapadas[c] ? '1' : '0');
+            salida[c + 2] = columnas[c].toString();
+        }
+        salida[1] = marcas.toString();
+        return salida;
+    }
+
+    private static void escapar(StringBuilder destino, String valor) {
+        for (int k = 0; k < valor.length(); k++) {
+            char ch = valor.charAt(k);
+            if (ch == ESCAPE) {
+                destino.append(ESCAPE).append('0');
+            } else if (ch == SEPARADOR) {
+                destino.append(ESCAPE).append('1');
+            } else {
+                destino.append(ch);
+            }
+        }
+    }
+
+    private static String leerValor(ResultSet rs, int i, int tipo) throws SQLException {
+        switch (tipo) {
+            case Types.DECIMAL:
+            case Types.NUMERIC:
+            case Types.DOUBLE:
+            case Types.FLOAT:
+            case Types.REAL: {
+                double d = rs.getDouble(i);
+                if (rs.wasNull()) {
+                    return null;
+                }
+                return formatearDouble(d);
+            }
+            case Types.TIMESTAMP: {
+                Timestamp t = rs.getTimestamp(i);
+                if (t == null) {
+                    return null;
+                }
+                String base = t.toString().substring(0, 19);
+                int nanos = t.getNanos();
+                return nanos == 0 ? base : String.format("%s.%06d", base, nanos / 1000);
+            }
+            case Types.BIT:
+            case Types.BOOLEAN: {
+                boolean b = rs.getBoolean(i);
+                if (rs.wasNull()) {
+                    return null;
+                }
+                return b ? "True" : "False";
+            }
+            default:
+                return rs.getString(i);
+        }
+    }
+
+    /**
+     * Igual que repr(float) de Python (jaydebeapi convierte DECIMAL/NUMERIC
+     * a float): dígitos más cortos, notación posicional si el exponente
+     * decimal está en [-4, 16) y si no "1.5e-05" / "1e+16".
+     */
+    static String formatearDouble(double d) {
+        if (Double.isNaN(d)) {
+            return "nan";
+        }
+        if (Double.isInfinite(d)) {
+            return d > 0 ? "inf" : "-inf";
+        }
+        if (d == 0) {
+            return 1 / d < 0 ? "-0.0" : "0.0";
+        }
+        String signo = d < 0 ? "-" : "";
+        BigDecimal valor = new BigDecimal(Double.toString(Math.abs(d))).stripTrailingZeros();
+        String digitos = valor.unscaledValue().toString();
+        // valor = 0.<digitos> x 10^punto
+        int punto = digitos.length() - valor.scale();
+        if (punto > -4 && punto <= 16) {
+            String plano = valor.toPlainString();
+            return signo + (plano.indexOf('.') < 0 ? plano + ".0" : plano);
+        }
+        int exponente = punto - 1;
+        String mantisa = digitos.length() == 1 ? digitos : digitos.charAt(0) + "." + digitos.substring(1);
+        return signo + mantisa + (exponente < 0 ? "e-" : "e+")
+                + (Math.abs(exponente) < 10 ? "0" : "") + Math.abs(exponente);
+    }
+}
@@ -0,0 +1,167 @@
+"""
+Orquestación de pasos como grafo de dependencias (DAG).
+
+Cada paso declara los archivos que lee (entradas) y los que escribe
+(salidas). Un paso se lanza apenas terminan los pasos que producen sus
+entradas; los independientes corren en paralelo. Los pasos que consultan
+IRIS comparten un límite propio de concurrencia para no agotar el pool del
+worker (z_comun/iris_worker.py).
+
+Al terminar se puede reportar la ruta crítica: la cadena de dependencias
+con mayor duración acumulada, que es lo que fija el tiempo total.
+"""
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Pasos simultáneos en total y, de ellos, cuántos pueden estar en IRIS
+PIPELINE_PARALELO = int(os.getenv('PIPELINE_PARALELO', 4))
+PIPELINE_IRIS_PARALELO = int(os.getenv('PIPELINE_IRIS_PARALELO', 3))
+
+
+class Paso:
+    def __init__(self, script, entradas=(), salidas=(), iris=False):
+        self.script = script
+        self.nombre = os.path.basename(script)
+        self.entradas = list(entradas)
+        self.salidas = list(salidas)
+        self.iris = iris
+
+    def __repr__(self):
+        return f"Paso({self.nombre})"
+
+
+# ============================================================
+# GRAFO
+# ============================================================
+def dependencias(pasos):
+    """
+    {nombre: [nombres de los pasos de los que depende]}, a partir de qué
+    paso produce cada entrada. Las entradas que ningún paso produce (por
+    ejemplo archivos fijos) no generan dependencia.
+    """
+    productor = {}
+    for paso in pasos:
+        for salida in paso.salidas:
+            if salida in productor:
+                raise ValueError(f"{salida} es salida de {productor[salida]} y de {paso.nombre}")
+            productor[salida] = paso.nombre
+
+    deps = {}
+    for paso in pasos:
+        deps[paso.nombre] = sorted(
+            {productor[e] for e in paso.entradas if e in productor} - {paso.nombre}
+        )
+
+    # Orden topológico solo para detectar ciclos antes de lanzar nada
+    pendientes = dict(deps)
+    while pendientes:
+        listos = [n for n, d in pendientes.items() if not any(x in pendientes for x in d)]
+        if not listos:
+            raise ValueError(f"Dependencias circulares entre: {', '.join(pendientes)}")
+        for n in listos:
+            del pendientes[n]
+    return deps
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+def ejecutar_dag(pasos, ejecutar, paralelo=PIPELINE_PARALELO, iris_paralelo=PIPELINE_IRIS_PARALELO):
+    """
+    Corre 'ejecutar(paso) -> bool' para cada paso respetando dependencias.
+    Ante el primer fallo no se lanzan pasos nuevos; los que ya corren
+    terminan. Devuelve (tiempos, fallidos, omitidos) con tiempos
+    {nombre: (inicio, fin)} en segundos desde el comienzo.
+    """
+    deps = dependencias(pasos)
+    por_nombre = {p.nombre: p for p in pasos}
+    pendientes = [p.nombre for p in pasos]
+    terminados, fallidos, tiempos = set(), [], {}
+    en_curso = {}
+    inicio_dag = time.perf_counter()
+
+    def correr(paso):
+        inicio = time.perf_counter() - inicio_dag
+        try:
+            ok = ejecutar(paso)
+        except Exception as e:
+            logging.error(f"{paso.nombre}: {e}")
+            ok = False
+        return ok, inicio, time.perf_counter() - inicio_dag
+
+    with ThreadPoolExecutor(max_workers=paralelo) as executor:
+        while True:
+            if not fallidos:
+                iris_en_curso = sum(1 for n in en_curso.values() if por_nombre[n].iris)
+                # En orden de declaración: los primeros pasos tienen prioridad
+                for nombre in list(pendientes):
+                    if len(en_curso) >= paralelo:
+                        break
+                    paso = por_nombre[nombre]
+                    if not all(d in terminados for d in deps[nombre]):
+                        continue
+                    if paso.iris and iris_en_curso >= iris_paralelo:
+                        continue
+                    iris_en_curso += paso.iris
+                    pendientes.remove(nombre)
+                    en_curso[executor.submit(correr, paso)] = nombre
+
+            if not en_curso:
+                break
+
+            hechos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                nombre = en_curso.pop(futuro)
+                ok, inicio, fin = futuro.result()
+                tiempos[nombre] = (inicio, fin)
+                if ok:
+                    terminados.add(nombre)
+                else:
+                    fallidos.append(nombre)
+
+    return tiempos, fallidos, pendientes
+
+
+def ruta_critica(pasos, tiempos):
+    """
+    Cadena de dependencias con mayor duración acumulada entre los pasos
+    ejecutados. Devuelve ([(nombre, duración)], total).
+    """
+    deps = dependencias(pasos)
+    mejor = {}
+
+    def acumulado(nombre):
+        if nombre not in mejor:
+            inicio, fin = tiempos[nombre]
+            previos = [(acumulado(d), d) for d in deps[nombre] if d in tiempos]
+            base, previo = max(previos, default=(0, None))
+            mejor[nombre] = (base + fin - inicio, previo)
+        return mejor[nombre][0]
+
+    if not tiempos:
+        return [], 0
+    final = max(tiempos, key=acumulado)
+
+    ruta, nombre = [], final
+    while nombre:
+        inicio, fin = tiempos[nombre]
+        ruta.append((nombre, fin - inicio))
+        nombre = mejor[nombre][1]
+    ruta.reverse()
+    return ruta, mejor[final][0]
+
+
+def reporte_ruta_critica(pasos, tiempos, total, presupuesto=None):
+    """Líneas de texto con la ruta crítica, para log y consola."""
+    ruta, duracion = ruta_critica(pasos, tiempos)
+    lineas = [f"RUTA CRÍTICA ({duracion:.2f}s de {total:.2f}s totales):"]
+    lineas += [f"  {nombre} ({segundos:.2f}s)" for nombre, segundos in ruta]
+    if presupuesto and total > presupuesto:
+        lineas.append(f"  ATENCIÓN: supera el presupuesto de {presupuesto}s")
+    return lineas
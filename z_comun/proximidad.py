@@ -0,0 +1,55 @@
+"""
+Cruce por fecha más cercana entre dos extractos.
+
+Reemplaza las subconsultas por fila del tipo
+
+    EXISTS (... AND b.fecha BETWEEN a.fecha - 3 AND a.fecha + 3)
+    SELECT TOP 1 ... ORDER BY ABS(DATEDIFF(DAY, b.fecha, a.fecha))
+
+por una sola extracción de los eventos y un merge_asof (direction='nearest')
+sobre ambos lados ordenados por fecha: el evento encontrado sirve a la vez
+de indicador (hay o no) y de fecha/datos más cercanos.
+"""
+import numpy as np
+import pandas as pd
+
+
+def mas_cercano(base, eventos, por, fecha_base, fecha_eventos, columnas, dias=3):
+    """
+    Para cada fila de 'base', el evento con los mismos valores en 'por' y
+    la fecha más cercana a 'fecha_base', a lo más 'dias' días antes o
+    después (inclusive, como BETWEEN).
+
+    Devuelve un DataFrame con el índice de 'base', las 'columnas' del
+    evento y 'fecha_evento' (NaT/NaN si no hay evento dentro del margen).
+    Las claves vacías o nulas no cruzan, igual que '=' en SQL.
+    """
+    por = list(por)
+    izquierda = base[por].copy()
+    izquierda["_fecha"] = pd.to_datetime(base[fecha_base], errors="coerce")
+    izquierda["_fila"] = np.arange(len(base))
+    izquierda = izquierda[_claves_validas(izquierda, por) & izquierda["_fecha"].notna()]
+
+    derecha = eventos[por + list(columnas)].copy()
+    derecha["_fecha"] = pd.to_datetime(eventos[fecha_eventos], errors="coerce")
+    derecha = derecha[_claves_validas(derecha, por) & derecha["_fecha"].notna()]
+    derecha["fecha_evento"] = derecha["_fecha"]
+
+    unido = pd.merge_asof(
+        izquierda.sort_values("_fecha", kind="stable"),
+        derecha.sort_values("_fecha", kind="stable"),
+        on="_fecha",
+        by=por,
+        direction="nearest",
+        tolerance=pd.Timedelta(days=dias),
+    )
+    resultado = unido.set_index("_fila")[list(columnas) + ["fecha_evento"]].reindex(range(len(base)))
+    resultado.index = base.index
+    return resultado
+
+
+def _claves_validas(df, por):
+    validas = pd.Series(True, index=df.index)
+    for columna in por:
+        validas &= df[columna].notna() & (df[columna].astype(str) != "")
+    return validas
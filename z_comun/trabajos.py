@@ -0,0 +1,179 @@
+"""
+Cargas IRIS -> MySQL declaradas como trabajos.
+
+La mayoría de los scripts de carga repiten lo mismo: consultar IRIS, pasar
+los valores a texto, agregar fechaActualizacion, crear la tabla si no existe
+y reemplazar su contenido. Solo cambian la consulta, el DDL y la tabla.
+Un Trabajo declara esas partes y ejecutar_trabajos() corre cualquier
+conjunto de ellos en un solo proceso:
+
+    - una JVM y un pool IRIS (o el worker, ver z_comun/iris.py) para todos,
+    - una conexión MySQL para todos,
+    - las consultas de los trabajos siguientes se adelantan en paralelo
+      (hasta IRIS_PARALELO) mientras se carga el actual.
+
+Modos de carga:
+    'completa'     staging + RENAME TABLE (carga_publicada)
+    'fusion'       upsert por clave natural con hash de fila (FusionMySQL)
+    'incremental'  watermark + ventanas de fechas (z_comun/incremental.py);
+                   la consulta lleva {desde} y {hasta}, como en
+                   consultar_por_ventanas
+"""
+import time
+import logging
+from datetime import date, datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from z_comun.iris import consultar, consultar_por_ventanas, cerrar_iris, IRIS_PARALELO
+from z_comun.carga_mysql import conectar_mysql, carga_publicada, FusionMySQL
+from z_comun.incremental import inicio_extraccion, carga_incremental, guardar_watermark
+
+MODOS = ('completa', 'fusion', 'incremental')
+
+
+class Trabajo:
+    def __init__(self, tabla, query, ddl, columnas=None, modo='completa', clave=None,
+                 expresion_fecha=None, desde_historico=None, meses=1,
+                 transformar=None, fecha_actualizacion=True, nombre=None):
+        if modo not in MODOS:
+            raise ValueError(f"{tabla}: modo '{modo}' no válido ({', '.join(MODOS)})")
+        if modo == 'fusion' and not clave:
+            raise ValueError(f"{tabla}: el modo fusion requiere clave")
+        if modo == 'incremental' and (not expresion_fecha or not desde_historico):
+            raise ValueError(f"{tabla}: el modo incremental requiere expresion_fecha y desde_historico")
+
+        self.tabla = tabla
+        self.query = query
+        self.ddl = ddl
+        # Columnas de destino en el orden de la consulta (+ fechaActualizacion);
+        # sin columnas se usa el orden de la tabla
+        self.columnas = list(columnas) if columnas else None
+        self.modo = modo
+        self.clave = clave
+        self.expresion_fecha = expresion_fecha
+        self.desde_historico = desde_historico
+        self.meses = meses
+        # transformar(filas) -> filas, antes de agregar fechaActualizacion
+        self.transformar = transformar
+        self.fecha_actualizacion = fecha_actualizacion
+        self.nombre = nombre or tabla
+
+    def __repr__(self):
+        return f"Trabajo({self.nombre}, {self.modo})"
+
+    @property
+    def adelantable(self):
+        # La incremental necesita el watermark de MySQL antes de consultar
+        return self.modo != 'incremental'
+
+    def preparar(self, filas):
+        if self.transformar:
+            filas = self.transformar(filas)
+        if self.fecha_actualizacion:
+            ahora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            filas = [list(fila) + [ahora] for fila in filas]
+        return filas
+
+
+# ============================================================
+# CARGA DE UN TRABAJO
+# ============================================================
+def _crear_tabla(conn, trabajo):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(trabajo.ddl)
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def _cargar(conn, trabajo, filas):
+    """Carga completa o fusión de filas ya extraídas. Devuelve el total."""
+    filas = trabajo.preparar(filas)
+    if trabajo.modo == 'fusion':
+        with FusionMySQL(conn, trabajo.tabla, trabajo.clave, trabajo.columnas) as fusion:
+            fusion.agregar(filas)
+        return fusion.total
+
+    with carga_publicada(conn, trabajo.tabla, trabajo.columnas) as carga:
+        carga.agregar(filas)
+    return carga.total
+
+
+def _cargar_incremental(conn, trabajo):
+    cursor = conn.cursor()
+    try:
+        hoy = date.today()
+        desde, completa = inicio_extraccion(cursor, trabajo.tabla, trabajo.desde_historico)
+        with carga_incremental(conn, trabajo.tabla, trabajo.expresion_fecha, desde, completa,
+                               trabajo.columnas, trabajo.clave) as carga:
+            for _, filas in consultar_por_ventanas(trabajo.query, desde, meses=trabajo.meses):
+                carga.agregar(trabajo.preparar(filas))
+        guardar_watermark(cursor, trabajo.tabla, hoy)
+        conn.commit()
+        return carga.total
+    finally:
+        cursor.close()
+
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
+def ejecutar_trabajos(trabajos, paralelo=IRIS_PARALELO):
+    """
+    Corre los trabajos en orden sobre una sola conexión MySQL. Un trabajo
+    fallido se registra y no detiene a los demás. Devuelve la lista de
+    nombres fallidos (vacía si todo terminó bien).
+    """
+    nombres = [t.nombre for t in trabajos]
+    repetidos = {n for n in nombres if nombres.count(n) > 1}
+    if repetidos:
+        raise ValueError(f"Trabajos repetidos: {', '.join(sorted(repetidos))}")
+
+    inicio_total = time.perf_counter()
+    fallidos = []
+    conn = None
+    try:
+        conn = conectar_mysql()
+        with ThreadPoolExecutor(max_workers=max(1, paralelo), thread_name_prefix="iris") as executor:
+            # Consultas adelantadas: a lo más 'paralelo' resultados en memoria
+            adelantados = {}
+            siguientes = deque(t for t in trabajos if t.adelantable)
+
+            def adelantar():
+                while siguientes and len(adelantados) < paralelo:
+                    t = siguientes.popleft()
+                    adelantados[t.nombre] = executor.submit(consultar, t.query)
+
+            for trabajo in trabajos:
+                adelantar()
+                inicio = time.perf_counter()
+                logging.info(f"=== {trabajo.nombre} ({trabajo.modo}) ===")
+                try:
+                    _crear_tabla(conn, trabajo)
+                    if trabajo.adelantable:
+                        _, filas = adelantados.pop(trabajo.nombre).result()
+                        total = _cargar(conn, trabajo, filas)
+                    else:
+                        total = _cargar_incremental(conn, trabajo)
+                    logging.info(f"{trabajo.nombre}: OK, {total} filas en {time.perf_counter() - inicio:.2f}s")
+                except Exception as e:
+                    adelantados.pop(trabajo.nombre, None)
+                    logging.error(f"{trabajo.nombre}: {e}", exc_info=True)
+                    fallidos.append(trabajo.nombre)
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        pass
+    finally:
+        if conn:
+            conn.close()
+        cerrar_iris()
+
+    logging.info(
+        f"{len(trabajos) - len(fallidos)}/{len(trabajos)} trabajos OK en "
+        f"{time.perf_counter() - inicio_total:.2f}s"
+        + (f"; fallidos: {', '.join(fallidos)}" if fallidos else "")
+    )
+    return fallidos
@@ -0,0 +1,223 @@
+"""
+Último traslado por episodio (PA_AdmTransaction).
+
+Los reportes buscaban la unidad actual o la fecha del último traslado con
+subconsultas correlacionadas por fila (MAX(TRANS_RowID) + PAC_Ward en el
+cuestionario NRS2002, MAX(TRANS_StartDate) en el reporte GES). Aquí se
+calcula una vez por ciclo, con dos consultas agrupadas, para los episodios
+hospitalizados vigentes o egresados en los últimos TRASLADOS_DIAS_ALTA días,
+y se guarda en Parquet:
+
+    <TRASLADOS_DIR>/ultimo_traslado.parquet
+
+    id_episodio            PAADM_RowID
+    nro_episodio           PAADM_ADMNo
+    ultima_sala            WARD_Desc del último movimiento (MAX(TRANS_RowID))
+    fecha_ultimo_traslado  MAX(TRANS_StartDate) de los traslados con cama/unidad
+
+Como la base quirúrgica, la tabla se considera vigente por
+TRASLADOS_VIGENCIA_HORAS y la actualiza el primer proceso que la pide.
+Los episodios que no están en la tabla se consultan directamente y el
+resultado (también si no tienen movimientos) queda por el mismo tiempo en
+
+    <TRASLADOS_DIR>/episodios_consultados.parquet
+
+para que las corridas siguientes no los vuelvan a consultar.
+
+Uso en cron (desde la raíz del proyecto):
+    python -m z_comun.traslados
+"""
+import os
+import json
+import time
+import logging
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from z_comun.iris import consultar, cerrar_iris
+from z_comun.intermedios import guardar_tabla, leer_tabla, existe_tabla, bloqueo
+
+load_dotenv()
+
+# ============================================================
+# CONFIGURACIÓN
+# ============================================================
+TRASLADOS_DIR = os.getenv('TRASLADOS_DIR', 'cache/traslados')
+TRASLADOS_DIAS_ALTA = int(os.getenv('TRASLADOS_DIAS_ALTA', 60))
+TRASLADOS_VIGENCIA_HORAS = float(os.getenv('TRASLADOS_VIGENCIA_HORAS', 6))
+
+ARCHIVO_TABLA = 'ultimo_traslado.parquet'
+ARCHIVO_ESTADO = 'estado.json'
+ARCHIVO_CONSULTADOS = 'episodios_consultados.parquet'
+
+EPISODIOS_POR_CONSULTA = 500
+
+COLUMNAS = ["id_episodio", "nro_episodio", "ultima_sala", "fecha_ultimo_traslado"]
+# id_episodio vacío: el episodio se consultó y no tiene movimientos
+COLUMNAS_CONSULTADOS = COLUMNAS + ["consultado"]
+
+# Episodios de la tabla: hospitalizados sin alta o con alta reciente
+FILTRO_VIGENTES = """
+    T2.TRANS_ParRef->PAADM_Type = 'I'
+    AND (T2.TRANS_ParRef->PAADM_DischgDate IS NULL
+         OR T2.TRANS_ParRef->PAADM_DischgDate >= '{desde}')
+"""
+
+FILTRO_EPISODIOS = "T2.TRANS_ParRef->PAADM_ADMNo IN ({episodios})"
+
+QUERY_ULTIMA_SALA = """
+    SELECT %nolock
+        T.TRANS_ParRef AS id_episodio,
+        T.TRANS_ParRef->PAADM_ADMNo AS nro_episodio,
+        T.TRANS_Ward_DR->WARD_Desc AS ultima_sala
+    FROM PA_AdmTransaction T
+    WHERE T.TRANS_RowID IN (
+        SELECT MAX(T2.TRANS_RowID)
+        FROM PA_AdmTransaction T2
+        WHERE {filtro}
+        GROUP BY T2.TRANS_ParRef
+    )
+"""
+
+QUERY_FECHA_TRASLADO = """
+    SELECT %nolock
+        T2.TRANS_ParRef AS id_episodio,
+        MAX(T2.TRANS_StartDate) AS fecha_ultimo_traslado
+    FROM PA_AdmTransaction T2
+    WHERE {filtro}
+        AND T2.TRANS_Status_DR = 5
+        AND T2.TRANS_Ward_DR IS NOT NULL  -- solo movimientos con cama/unidad asignada
+    GROUP BY T2.TRANS_ParRef
+"""
+
+
+# ============================================================
+# CONSULTA
+# ============================================================
+def _consultar_traslados(filtro):
+    _, salas = consultar(QUERY_ULTIMA_SALA.format(filtro=filtro))
+    _, fechas = consultar(QUERY_FECHA_TRASLADO.format(filtro=filtro))
+    salas = pd.DataFrame(salas, columns=COLUMNAS[:3])
+    fechas = pd.DataFrame(fechas, columns=["id_episodio", "fecha_ultimo_traslado"])
+    tabla = salas.merge(fechas, on="id_episodio", how="left").fillna("")
+    return tabla.drop_duplicates("id_episodio")[COLUMNAS]
+
+
+def _consultar_episodios(episodios):
+    partes = []
+    for i in range(0, len(episodios), EPISODIOS_POR_CONSULTA):
+        lista = ", ".join(f"'{e}'" for e in episodios[i:i + EPISODIOS_POR_CONSULTA])
+        partes.append(_consultar_traslados(FILTRO_EPISODIOS.format(episodios=lista)))
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUMNAS)
+
+
+# ============================================================
+# TABLA LOCAL
+# ============================================================
+def _ruta(nombre):
+    return os.path.join(TRASLADOS_DIR, nombre)
+
+
+def vigente(horas=TRASLADOS_VIGENCIA_HORAS):
+    try:
+        with open(_ruta(ARCHIVO_ESTADO), encoding='utf-8') as f:
+            estado = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return False
+    if not existe_tabla(_ruta(ARCHIVO_TABLA)):
+        return False
+    actualizada = datetime.fromisoformat(estado['actualizada'])
+    return datetime.now() - actualizada < timedelta(hours=horas)
+
+
+def actualizar_traslados(hoy=None):
+    hoy = hoy or date.today()
+    desde = hoy - timedelta(days=TRASLADOS_DIAS_ALTA)
+    inicio = time.perf_counter()
+
+    tabla = _consultar_traslados(FILTRO_VIGENTES.format(desde=desde.isoformat()))
+    guardar_tabla(tabla, _ruta(ARCHIVO_TABLA))
+    with open(_ruta(ARCHIVO_ESTADO), 'w', encoding='utf-8') as f:
+        json.dump({
+            'actualizada': datetime.now().isoformat(timespec='seconds'),
+            'desde': desde.isoformat(),
+            'episodios': len(tabla),
+        }, f, indent=2)
+    logging.info(f"Traslados: {len(tabla)} episodios en {time.perf_counter() - inicio:.2f}s")
+
+
+def asegurar_traslados(horas=TRASLADOS_VIGENCIA_HORAS):
+    """Actualiza la tabla si no está vigente (una sola vez aunque la pidan varios procesos)."""
+    if vigente(horas):
+        return
+    with bloqueo(TRASLADOS_DIR):
+        if not vigente(horas):
+            actualizar_traslados()
+
+
+def leer_traslados(por="nro_episodio", horas=TRASLADOS_VIGENCIA_HORAS):
+    """Tabla vigente indexada por 'por' (nro_episodio o id_episodio)."""
+    asegurar_traslados(horas)
+    tabla = leer_tabla(_ruta(ARCHIVO_TABLA), COLUMNAS).fillna("").astype(str)
+    return tabla.drop_duplicates(por).set_index(por)
+
+
+def _leer_consultados(horas):
+    """Episodios consultados fuera de la tabla hace menos de 'horas'."""
+    ruta = _ruta(ARCHIVO_CONSULTADOS)
+    if not existe_tabla(ruta):
+        return pd.DataFrame(columns=COLUMNAS_CONSULTADOS)
+    consultados = leer_tabla(ruta, COLUMNAS_CONSULTADOS).fillna("").astype(str)
+    limite = (datetime.now() - timedelta(hours=horas)).isoformat(timespec='seconds')
+    return consultados[consultados["consultado"] >= limite]
+
+
+def _guardar_consultados(nuevos, horas):
+    """Agrega 'nuevos' a los consultados y descarta los vencidos."""
+    with bloqueo(TRASLADOS_DIR):
+        consultados = pd.concat([_leer_consultados(horas), nuevos], ignore_index=True)
+        consultados = consultados.drop_duplicates("nro_episodio", keep="last")
+        guardar_tabla(consultados[COLUMNAS_CONSULTADOS], _ruta(ARCHIVO_CONSULTADOS))
+
+
+def ultimo_traslado(episodios, horas=TRASLADOS_VIGENCIA_HORAS):
+    """
+    ultima_sala y fecha_ultimo_traslado de los episodios (PAADM_ADMNo),
+    indexado por nro_episodio. Los que no están en la tabla local (p. ej.
+    con alta anterior a TRASLADOS_DIAS_ALTA) se consultan directamente y se
+    guardan por 'horas'; los que no tienen movimientos no aparecen.
+    """
+    episodios = sorted(set(episodios) - {""})
+    tabla = leer_traslados("nro_episodio", horas)
+    encontrados = tabla.reindex(tabla.index.intersection(episodios))
+
+    faltantes = [e for e in episodios if e not in tabla.index]
+    if faltantes:
+        consultados = _leer_consultados(horas).drop_duplicates("nro_episodio", keep="last")
+        consultados = consultados[consultados["nro_episodio"].isin(faltantes)]
+        pendientes = sorted(set(faltantes) - set(consultados["nro_episodio"]))
+        if pendientes:
+            logging.info(f"Traslados: {len(pendientes)} episodios fuera de la tabla, se consultan")
+            extra = _consultar_episodios(pendientes).drop_duplicates("nro_episodio").astype(str)
+            sin_movimientos = pd.DataFrame({"nro_episodio": sorted(set(pendientes) - set(extra["nro_episodio"]))})
+            nuevos = pd.concat([extra, sin_movimientos], ignore_index=True).reindex(columns=COLUMNAS).fillna("")
+            nuevos["consultado"] = datetime.now().isoformat(timespec='seconds')
+            _guardar_consultados(nuevos, horas)
+            consultados = pd.concat([consultados, nuevos], ignore_index=True)
+        extra = consultados[consultados["id_episodio"] != ""].set_index("nro_episodio")[COLUMNAS[:1] + COLUMNAS[2:]]
+        encontrados = pd.concat([encontrados, extra])
+    return encontrados.drop(columns="id_episodio")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(threadName)s - %(levelname)s - %(message)s'
+    )
+    try:
+        with bloqueo(TRASLADOS_DIR):
+            actualizar_traslados()
+    finally:
+        cerrar_iris()
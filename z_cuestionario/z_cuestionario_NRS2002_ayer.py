@@ -1,9 +1,8 @@
-import jaydebeapi
-import jpype
 import openpyxl
 from openpyxl import Workbook
 from dotenv import load_dotenv
 import os
+import sys
 import logging
 import smtplib
 from email.mime.text import MIMEText
@@ -14,6 +13,10 @@ from datetime import datetime, timedelta
 import time
 import textwrap
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from z_comun.iris import consultar, cerrar_iris
+from z_comun.traslados import ultimo_traslado
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO, 
                     format='%(asctime)s - %(threadName)s - %(processName)s %(levelname)s - %(message)s',
@@ -23,13 +26,6 @@ logging.basicConfig(level=logging.INFO,
 # Cargar variables de entorno
 load_dotenv(override=True)
 
-# Variables de entorno
-jdbc_driver_name = os.getenv('JDBC_DRIVER_NAME')
-jdbc_driver_loc = os.getenv('JDBC_DRIVER_PATH')
-iris_connection_string = os.getenv('CONEXION_STRING')
-iris_user = os.getenv('DB_USER')
-iris_password = os.getenv('DB_PASSWORD')
-
 # Configuración de correo
 smtp_host = os.getenv('SMTP_HOST')
 smtp_port = os.getenv('SMTP_PORT')
@@ -94,24 +90,6 @@ def enviar_correo(archivo, fecha_menos_1, fecha_hoy, intentos=5, espera=10):
                 logging.error("Todos los intentos de envío fallaron.")
 
 try:
-    # Validar variables de entorno
-    if not jdbc_driver_name or not jdbc_driver_loc:
-        raise ValueError("El nombre o la ruta del controlador JDBC no están configurados correctamente.")
-    if not iris_connection_string or not iris_user or not iris_password:
-        raise ValueError("Las variables de entorno de InterSystems IRIS no están configuradas correctamente.")
-
-    # Iniciar JVM si no está ya iniciada
-    if not jpype.isJVMStarted():
-        jpype.startJVM(jpype.getDefaultJVMPath(), "-Djava.class.path=" + jdbc_driver_loc)
-
-    # Crear conexión con InterSystems IRIS
-    conn_iris = jaydebeapi.connect(
-        jdbc_driver_name,
-        iris_connection_string,
-        {'user': iris_user, 'password': iris_password},
-        jdbc_driver_loc
-    )
-
     # Consulta SQL
     query = f''' 
         SELECT
@@ -134,21 +112,9 @@ try:
             QUESCreateTime AS "Hora creación",
             QUESScore AS "Puntaje NRS2002",
             b.SSUSR_Name AS "Usuario que realiza NRS2002",
-            COALESCE(
-                (
-                    SELECT W.WARD_Desc
-                    FROM PA_AdmTransaction T
-                    LEFT JOIN PAC_Ward W
-                        ON T.TRANS_Ward_DR = W.WARD_RowID
-                    WHERE T.TRANS_ParRef = c.PAADM_RowID
-                    AND T.TRANS_RowID = (
-                            SELECT MAX(T2.TRANS_RowID)
-                            FROM PA_AdmTransaction T2
-                            WHERE T2.TRANS_ParRef = c.PAADM_RowID
-                    )
-                ),
-                c.PAADM_DepCode_DR->CTLOC_Desc
-            ) AS "Servicio",
+            -- Unidad del último movimiento: se completa en Python (z_comun/traslados.py);
+            -- sin movimiento con unidad queda la unidad responsable, como el COALESCE
+            c.PAADM_DepCode_DR->CTLOC_Desc AS "Servicio",
             PAADM_CurrentRoom_DR->Room_Desc AS "Sala",
             PAADM_CurrentBed_DR->Bed_Code AS "Cama",
             c.PAADM_DepCode_DR->CTLOC_Desc AS "Unidad responsable"
@@ -161,9 +127,14 @@ try:
     '''
 
     # Ejecutar consulta
-    cursor_iris = conn_iris.cursor()
-    cursor_iris.execute(query)
-    rows = cursor_iris.fetchall()
+    columnas, rows = consultar(query)
+
+    # Servicio = unidad del último movimiento del episodio
+    traslados = ultimo_traslado(row[0] for row in rows)
+    salas = traslados["ultima_sala"][traslados["ultima_sala"] != ""].to_dict()
+    i_servicio = columnas.index("Servicio")
+    for row in rows:
+        row[i_servicio] = salas.get(row[0], row[i_servicio])
 
     # Crear archivo Excel
     archivo_excel = "z_cuestionario/reportes/reporte_cuestionario_ayer.xlsx"
@@ -181,7 +152,7 @@ try:
 
     # Escribir datos
     for row in rows:
-        ws.append([str(cell) if cell is not None else "" for cell in row])
+        ws.append(row)
 
     # Guardar archivo
     wb.save(archivo_excel)
@@ -190,14 +161,7 @@ try:
     # Enviar archivo por correo con reintentos
     enviar_correo(archivo_excel, fecha_menos_1, fecha_hoy)
 
-except jaydebeapi.DatabaseError as e:
-    logging.error(f"Error en InterSystems IRIS: {e}")
 except Exception as e:
     logging.error(f"Error: {e}")
 finally:
-    if 'cursor_iris' in locals():
-        cursor_iris.close()
-    if 'conn_iris' in locals():
-        conn_iris.close()
-    if jpype.isJVMStarted():
-        jpype.shutdownJVM()
\ No newline at end of file
+    cerrar_iris()
\ No newline at end of file
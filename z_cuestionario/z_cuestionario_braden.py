@@ -3,9 +3,13 @@ import jpype
 import mysql.connector
 from dotenv import load_dotenv
 import os
+import sys
 import logging
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from z_comun.carga_mysql import FusionMySQL
+
 # =========================
 # Cargar variables de entorno
 # =========================
@@ -176,7 +180,8 @@ try:
         port=mysql_port,
         user=mysql_user,
         password=mysql_password,
-        database=mysql_database
+        database=mysql_database,
+        allow_local_infile=True
     )
     cursor_mysql = conn_mysql.cursor()
 
@@ -185,30 +190,12 @@ try:
     conn_mysql.commit()
     logging.info("Tabla z_cuestionario_braden verificada/creada.")
 
-    # Truncar tabla
-    cursor_mysql.execute("TRUNCATE TABLE z_cuestionario_braden")
-    conn_mysql.commit()
-    logging.info("Tabla truncada.")
-
     # =========================
     # Insertar datos
     # =========================
-    insert_query = """
-        INSERT INTO z_cuestionario_braden VALUES (
-            %s, %s, %s, %s, %s, %s, %s, %s,
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-        )
-    """
-
-    chunk_size = 1000
-    for i in range(0, len(formatted_rows), chunk_size):
-        cursor_mysql.executemany(
-            insert_query,
-            formatted_rows[i:i + chunk_size]
-        )
-        conn_mysql.commit()
+    # Fusión por ID de cuestionario: solo se escriben los nuevos o modificados
+    with FusionMySQL(conn_mysql, "z_cuestionario_braden", "ID") as fusion:
+        fusion.agregar(formatted_rows)
 
     logging.info("Carga finalizada correctamente.")
 
@@ -3,10 +3,14 @@ import jpype
 import mysql.connector
 from dotenv import load_dotenv
 import os
+import sys
 import logging
 from datetime import datetime
 from cryptography.fernet import Fernet
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from z_comun.carga_mysql import carga_publicada
+
 load_dotenv(override=True)
 
 # =========================
@@ -47,10 +51,9 @@ def encrypt_parity_check(message):
     fernet = Fernet(key)
     return fernet.encrypt(message.encode())
 
-def recreate_table_mysql(cursor_mysql):
-    cursor_mysql.execute("DROP TABLE IF EXISTS z_mesa_de_servicio_usuarios_activos")
+def crear_tabla_mysql(cursor_mysql):
     cursor_mysql.execute("""
-        CREATE TABLE z_mesa_de_servicio_usuarios_activos (
+        CREATE TABLE IF NOT EXISTS z_mesa_de_servicio_usuarios_activos (
             RUT                     VARCHAR(12),
             descripcion             VARCHAR(42),
             nombre                  VARCHAR(28),
@@ -163,26 +166,25 @@ try:
         port=mysql_port,
         user=mysql_user,
         password=mysql_password,
-        database=mysql_database
+        database=mysql_database,
+        allow_local_infile=True
     )
     cursor_mysql = conn_mysql.cursor()
 
-    recreate_table_mysql(cursor_mysql)
+    crear_tabla_mysql(cursor_mysql)
     conn_mysql.commit()
 
-    insert_sql = """
-        INSERT INTO z_mesa_de_servicio_usuarios_activos (
-            RUT, descripcion, nombre, apellido, Local, Establecimiento,
-            Grupo, Perfil, FechaInicio,
-            SSUSR_DateLastLogin, SSUSR_Initials, SSUSR_DateTo,
-            fechaActualizacion
-        ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-    """
+    columnas = [
+        "RUT", "descripcion", "nombre", "apellido", "Local", "Establecimiento",
+        "Grupo", "Perfil", "FechaInicio",
+        "SSUSR_DateLastLogin", "SSUSR_Initials", "SSUSR_DateTo",
+        "fechaActualizacion"
+    ]
 
-    chunk_size = 1000
-    for i in range(0, len(formatted_rows), chunk_size):
-        cursor_mysql.executemany(insert_sql, formatted_rows[i:i + chunk_size])
-        conn_mysql.commit()
+    # Staging + RENAME TABLE en vez de DROP + CREATE: la tabla publicada
+    # nunca desaparece ni queda a medio cargar
+    with carga_publicada(conn_mysql, "z_mesa_de_servicio_usuarios_activos", columnas) as carga:
+        carga.agregar(formatted_rows)
 
     logging.info("Carga z_mesa_de_servicio_usuarios_activos finalizada correctamente")
 
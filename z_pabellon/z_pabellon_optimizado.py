@@ -1,10 +1,16 @@
-import jaydebeapi
-import jpype
 import mysql.connector
 from dotenv import load_dotenv
 import os
+import sys
 import logging
-from datetime import datetime
+from datetime import datetime, date
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from z_comun.iris import cerrar_iris
+from z_comun.base_quirurgica import leer_base, fecha_dmy
+from z_comun.incremental import inicio_extraccion, carga_incremental, guardar_watermark
 
 load_dotenv(override=True)
 
@@ -17,20 +23,18 @@ logging.basicConfig(
     ]
 )
 
-jdbc_driver_name = os.getenv('JDBC_DRIVER_NAME')
-jdbc_driver_loc  = os.getenv('JDBC_DRIVER_PATH')
-iris_conn_str    = os.getenv('CONEXION_STRING')
-iris_user        = os.getenv('DB_USER')
-iris_password    = os.getenv('DB_PASSWORD')
-
 mysql_cfg = {
     "host": os.getenv('DB_MYSQL_HOST'),
     "port": int(os.getenv('DB_MYSQL_PORT')),
     "user": os.getenv('DB_MYSQL_USER'),
     "password": os.getenv('DB_MYSQL_PASSWORD'),
-    "database": os.getenv('DB_MYSQL_DATABASE')
+    "database": os.getenv('DB_MYSQL_DATABASE'),
+    "allow_local_infile": True
 }
 
+TABLA = "z_pabellon_optimizado"
+FECHA_HISTORICA = '2025-01-01'
+
 def crear_tabla(cursor):
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS z_pabellon_optimizado (
@@ -77,81 +81,65 @@ def crear_tabla(cursor):
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
     """)
 
-conn_iris = conn_mysql = None
-cursor_iris = cursor_mysql = None
+# ============================================================
+# PROYECCIÓN SOBRE LA BASE QUIRÚRGICA
+# ============================================================
+# Columna de la tabla -> (columna de la base, CONVERT 105 a 'DD-MM-AAAA')
+COLUMNAS = [
+    ("ambulatoria", "RBOP_DaySurgery", False),
+    ("tipo_de_agendamiento_de_la_cirugia", "RBOP_BookingType", False),
+    ("tiempo_programado_minutos", "RBOP_EstimatedTime", False),
+    ("estado_agendamiento", "RBOP_Status", False),
+    ("diagnostico_prequirurgico_lista_de_espera", "PreopDiagn_Desc", False),
+    ("ANAOP_Notes", "ANAOP_Notes", False),
+    ("estado_protocolo_operatorio", "ANAOP_Status", False),
+    ("categoria_cirugia", "ANAOP_OperType", False),
+    ("codigo_cirugia_principal_del_protocolo_pperatorio", "ANAOP_Oper_Code", False),
+    ("descripcion_cirugia_principal_del_protocolo_operatorio", "ANAOP_Oper_Desc", False),
+    ("codigo_equipo_quirurgico", "Equipo_Code", False),
+    ("descripcion_equipo_quirurgico", "Equipo_Desc", False),
+    ("fecha_inicio_cirugia_en_protocolo_anestesico", "ANA_CustomDate1", True),
+    ("hora_inicio_cirugia_protAnest", "ANA_CustomTime1", False),
+    ("fecha_termino_cirugia_en_protocolo_anestesico", "ANA_CustomDate2", True),
+    ("hora_termino_cirugia_en_protocolo_anestesico", "ANA_CustomTime2", False),
+    ("fecha_inicio_cirugia_en_protocolo_operatorio", "ANAOP_OpStartDate", True),
+    ("hora_inicio_cirugia_en_protocolo_operatorio", "ANAOP_OpStartTime", False),
+    ("fecha_termino_cirugia_en_protocolo_operatorio", "ANAOP_OpEndDate", True),
+    ("hora_termino_cirugia_en_protocolo_operatorio", "ANAOP_OpEndTime", False),
+    ("sitio_operacion_principal", "Sitio_Desc", False),
+    ("RUT_cirujano_principal", "Cirujano_Code", False),
+    ("RUT_Cirujano_2", "Cirujano2_Code", False),
+    ("tipo_anestesia", "Anestesia_Desc", False),
+    ("fecha_agendamiento", "RBOP_DateOper", True),
+    ("tipo_episodio", "PAADM_Type", False),
+    ("cirujano_principal", "Cirujano_Desc", False),
+    ("episodio", "PAADM_ADMNo", False),
+    ("fecha_ingreso_quirofano", "ANA_TheatreInDate", False),
+    ("hora_ingreso_quirofano", "ANA_TheatreInTime", False),
+    ("fecha_egreso_quirofano", "ANA_TheatreOutDate", False),
+    ("hora_egreso_quirofano", "ANA_TheatreOutTime", False),
+    ("motivo_suspension", "Suspension_Desc", False),
+    ("codigos_cirugia_secundaria", "SECPR_Oper_Code", False),
+    ("descripcion_cirugia_secundaria", "SECPR_Oper_Desc", False),
+    ("tiempo_uso_quirofano_minutos", "ANA_Anest_Duration", False),
+    ("paciente_condicional", "RBOP_PreopTestDone", False),
+    ("RBOP_TimeOper", "RBOP_TimeOper", False),
+    ("RBOP_RowId", "RBOP_RowId", False),
+]
+
+
+def proyectar(base, desde):
+    """Filas de la tabla: cirugías con ingreso a quirófano desde 'desde'."""
+    base = base[base["ANA_TheatreInDate"].fillna("") >= desde.isoformat()]
+    datos = {
+        destino: fecha_dmy(base[origen]) if dmy else base[origen].fillna("")
+        for destino, origen, dmy in COLUMNAS
+    }
+    return pd.DataFrame(datos).values.tolist()
+
+conn_mysql = cursor_mysql = None
 
 try:
-    # JVM
-    if not jpype.isJVMStarted():
-        jpype.startJVM(jpype.getDefaultJVMPath(), f"-Djava.class.path={jdbc_driver_loc}")
-
-    # IRIS
-    conn_iris = jaydebeapi.connect(
-        jdbc_driver_name,
-        iris_conn_str,
-        {'user': iris_user, 'password': iris_password},
-        jdbc_driver_loc
-    )
-    cursor_iris = conn_iris.cursor()
-
-    query = """
-    SELECT %nolock
-        RBOP_DaySurgery,
-        RBOP_BookingType,
-        RBOP_EstimatedTime,
-        RBOP_Status,
-        RBOP_PreopDiagn_DR->MRCID_DESC,
-        OR_Anaest_Operation.ANAOP_Notes,
-        ANAOP_Status,
-        ANAOP_OperType,
-        ANAOP_Type_DR->OPER_Code,
-        ANAOP_Type_DR->OPER_Desc,
-        ANAOP_Depar_Oper_DR->CTLOC_Code,
-        ANAOP_Depar_Oper_DR->CTLOC_Desc,
-        convert(varchar,ANA_CustomDate1,105),
-        convert(varchar,ANA_CustomTime1,108),
-        convert(varchar,ANA_CustomDate2,105),
-        convert(varchar,ANA_CustomTime2,108),
-        convert(varchar,ANAOP_OpStartDate,105),
-        convert(varchar,ANAOP_OpStartTime,108),
-        convert(varchar,ANAOP_OpEndDate,105),
-        convert(varchar,ANAOP_OpEndTime,108),
-        ANAOP_BodySite_DR->BODS_Desc,
-        ANAOP_Surgeon_DR->CTPCP_Code,
-        ANAOP_SecondSurgeon_DR->CTPCP_Code,
-        ANAOP_Par_Ref->ANA_Method->ANMET_Desc,
-        convert(varchar,RBOP_DateOper,105),
-        RBOP_PAADM_DR->PAADM_TYPE,
-        ANAOP_Surgeon_DR->CTPCP_Desc,
-        RBOP_PAADM_DR->PAADM_ADMNO,
-        ANA_TheatreInDate,
-        ANA_TheatreInTime,
-        ANA_TheatreOutDate,
-        ANA_TheatreOutTime,
-        RBOP_ReasonSuspend_DR->SUSP_Desc,
-        SECPR_Operation_DR->OPER_Code,
-        SECPR_Operation_DR->OPER_Desc,
-        ANA_Anest_Duration,
-        RBOP_PreopTestDone,
-        RBOP_TimeOper,
-        RBOP_RowId
-    FROM RB_OperatingRoom
-    LEFT JOIN OR_Anaesthesia ON RBOP_PAADM_DR = ANA_PAADM_ParRef
-    LEFT JOIN OR_Anaest_Operation ON ANA_RowId = ANAOP_Par_Ref
-    LEFT JOIN OR_An_Oper_SecondaryProc ON ANAOP_RowId = SECPR_ParRef
-    WHERE ANA_TheatreInDate >= '2025-01-01'
-      AND RBOP_PAADM_DR->PAADM_DepCode_DR->CTLOC_Hospital_DR = 10448
-    """
-
-    cursor_iris.execute(query)
-    rows = cursor_iris.fetchall()
-
-    formatted_rows = [
-        tuple('' if v is None else str(v) for v in r) +
-        (datetime.now().strftime('%Y-%m-%d %H:%M:%S'),)
-        for r in rows
-    ]
-
     # MySQL
     conn_mysql = mysql.connector.connect(**mysql_cfg)
     cursor_mysql = conn_mysql.cursor()
@@ -160,35 +148,35 @@ try:
     conn_mysql.commit()
     logging.info("Tabla z_pabellon_optimizado verificada/creada.")
 
-    cursor_mysql.execute("TRUNCATE TABLE z_pabellon_optimizado")
-    conn_mysql.commit()
+    # Incremental: solo desde el watermark menos la ventana de datos mutables
+    hoy = date.today()
+    desde, completa = inicio_extraccion(cursor_mysql, TABLA, FECHA_HISTORICA)
+
+    # Base quirúrgica del ciclo (se extrae de IRIS solo si no está vigente)
+    base = leer_base([origen for _, origen, _ in COLUMNAS], desde=desde)
+    filas = proyectar(base, desde)
 
-    insert_sql = """
-    INSERT INTO z_pabellon_optimizado VALUES (
-        %s,%s,%s,%s,%s,%s,%s,%s,%s,%s,
-        %s,%s,%s,%s,%s,%s,%s,%s,%s,%s,
-        %s,%s,%s,%s,%s,%s,%s,%s,%s,%s,
-        %s,%s,%s,%s,%s,%s,%s,%s,%s,%s
-    )
-    """
+    fecha_actualizacion = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with carga_incremental(conn_mysql, TABLA, "fecha_ingreso_quirofano", desde, completa) as carga:
+        carga.agregar([fila + [fecha_actualizacion] for fila in filas])
 
-    cursor_mysql.executemany(insert_sql, formatted_rows)
+    guardar_watermark(cursor_mysql, TABLA, hoy)
     conn_mysql.commit()
 
+    logging.info(f"Filas insertadas: {carga.total}")
     logging.info("Carga finalizada correctamente.")
 
 except Exception as e:
     logging.error(f"Error: {e}")
 
 finally:
-    for obj in [cursor_iris, conn_iris, cursor_mysql, conn_mysql]:
+    for obj in [cursor_mysql, conn_mysql]:
         try:
             if obj:
                 obj.close()
         except Exception:
             pass
     try:
-        if jpype.isJVMStarted():
-            jpype.shutdownJVM()
+        cerrar_iris()
     except Exception:
         pass
@@ -1,10 +1,16 @@
-import jaydebeapi
-import jpype
 import mysql.connector
 from dotenv import load_dotenv
 import os
+import sys
 import logging
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from z_comun.iris import consultar, consultar_por_ventanas, hace_meses, cerrar_iris
+from z_comun.carga_mysql import carga_publicada
 
 # ============================================================
 # CONFIGURACIÓN
@@ -25,12 +31,6 @@ logging.basicConfig(
 # VARIABLES DE ENTORNO
 # ============================================================
 
-jdbc_driver_name = os.getenv("JDBC_DRIVER_NAME")
-jdbc_driver_loc = os.getenv("JDBC_DRIVER_PATH")
-iris_connection_string = os.getenv("CONEXION_STRING")
-iris_user = os.getenv("DB_USER")
-iris_password = os.getenv("DB_PASSWORD")
-
 mysql_host = os.getenv("DB_MYSQL_HOST")
 mysql_port = int(os.getenv("DB_MYSQL_PORT", 3306))
 mysql_user = os.getenv("DB_MYSQL_USER")
@@ -136,24 +136,104 @@ def crear_tabla(cursor):
     """)
 
 # ============================================================
-# EJECUCIÓN
+# PERSONAL ADICIONAL (CIRUJANOS 3, 4 Y 5)
 # ============================================================
+# Antes eran seis subconsultas correlacionadas por fila de la consulta
+# principal; ahora se trae todo el personal adicional de las operaciones del
+# período en una consulta, se pivotea por rol y se cruza por id_operacion.
 
-conn_iris = conn_mysql = cursor_iris = cursor_mysql = None
+ROLES_ADICIONALES = ["Tercer Cirujano", "Cuarto Cirujano", "Quinto Cirujano"]
 
-try:
-    if not jpype.isJVMStarted():
-        jpype.startJVM(jpype.getDefaultJVMPath(), "-Djava.class.path=" + jdbc_driver_loc)
+COLUMNAS_ADICIONALES = [
+    "rut_cirujano_3", "cirujano_3",
+    "rut_cirujano_4", "cirujano_4",
+    "rut_cirujano_5", "cirujano_5",
+]
 
-    conn_iris = jaydebeapi.connect(
-        jdbc_driver_name,
-        iris_connection_string,
-        {"user": iris_user, "password": iris_password},
-        jdbc_driver_loc
-    )
-    cursor_iris = conn_iris.cursor()
+# Mismo filtro de admisión y hospital que la consulta principal
+QUERY_PERSONAL = """
+SELECT %nolock
+    OPAS_ParRef AS id_operacion,
+    OPAS_OperatingStaffRole_DR->OPSTFRL_Desc AS rol,
+    OPAS_CareProv_DR->CTPCP_Code AS rut,
+    OPAS_CareProv_DR->CTPCP_Desc AS nombre
+FROM OR_An_Oper_Additional_Staff
+WHERE OPAS_OperatingStaffRole_DR->OPSTFRL_Desc IN ({roles})
+    AND OPAS_ParRef->ANAOP_Par_Ref->ANA_PAADM_ParRef->PAADM_AdmDate >= '{desde}'
+    AND OPAS_ParRef->ANAOP_Par_Ref->ANA_PAADM_ParRef->PAADM_DepCode_DR->CTLOC_Hospital_DR = 10448
+"""
+
+
+def personal_adicional(desde):
+    """{id_operacion: [rut_cirujano_3, cirujano_3, ..., cirujano_5]}"""
+    roles = ", ".join(f"'{rol}'" for rol in ROLES_ADICIONALES)
+    _, filas = consultar(QUERY_PERSONAL.format(roles=roles, desde=desde.isoformat()))
+    personal = pd.DataFrame(filas, columns=["id_operacion", "rol", "rut", "nombre"])
+    # Como el subselect escalar: un profesional por rol y operación
+    personal = personal.drop_duplicates(["id_operacion", "rol"])
+    ancho = personal.pivot(index="id_operacion", columns="rol", values=["rut", "nombre"])
+    ancho = ancho.reindex(
+        columns=[(campo, rol) for rol in ROLES_ADICIONALES for campo in ("rut", "nombre")]
+    ).fillna("")
+    logging.info(f"Personal adicional: {len(personal)} registros, {len(ancho)} operaciones")
+    return dict(zip(ancho.index, ancho.values.tolist()))
+
+
+# ============================================================
+# STAFF DE ANESTESIA (codigo_staff_anestesistas)
+# ============================================================
+# Era un list() sin GROUP BY en la consulta principal: IRIS lo agregaba
+# sobre todo el resultado, y al partir la consulta en ventanas mensuales
+# pasó a agregar cada ventana. Ahora se agrega por protocolo anestésico:
+# "código rol" de su personal adicional, separados por coma como list().
+
+QUERY_STAFF_ANESTESIA = """
+SELECT %nolock
+    ANAAS_ParRef AS id_anestesia,
+    ANAAS_CareProv_DR->CTPCP_Code || ' ' || ANAAS_OperatingStaffRole_DR->OPSTFRL_Desc AS staff
+FROM OR_AnaestAdditionalStaff
+WHERE ANAAS_ParRef->ANA_PAADM_ParRef->PAADM_AdmDate >= '{desde}'
+    AND ANAAS_ParRef->ANA_PAADM_ParRef->PAADM_DepCode_DR->CTLOC_Hospital_DR = 10448
+ORDER BY ANAAS_ParRef, ANAAS_RowId
+"""
+
+
+def staff_anestesia(desde):
+    """{id_anestesia: 'código rol,código rol,...'}"""
+    _, filas = consultar(QUERY_STAFF_ANESTESIA.format(desde=desde.isoformat()))
+    staff = pd.DataFrame(filas, columns=["id_anestesia", "staff"]).dropna()
+    listas = staff.groupby("id_anestesia", sort=False)["staff"].agg(",".join)
+    logging.info(f"Staff de anestesia: {len(staff)} registros, {len(listas)} protocolos")
+    return listas.to_dict()
+
+
+def agregar_personal(columnas, lote, personal, staff):
+    """
+    Reemplaza id_operacion e id_anestesia (últimas columnas) por el staff
+    de anestesia (al final) y los cirujanos adicionales, en su posición de
+    la tabla (tras cirujano_2).
+    """
+    posicion = [c.lower() for c in columnas].index("cirujano_2") + 1
+    sin_personal = [""] * len(COLUMNAS_ADICIONALES)
+    filas = []
+    for row in lote:
+        id_anestesia = row.pop()
+        id_operacion = row.pop()
+        row.append(staff.get(id_anestesia))
+        row[posicion:posicion] = personal.get(id_operacion, sin_personal)
+        filas.append(row)
+    # El DISTINCT de IRIS ahora incluye id_operacion en vez de los cirujanos;
+    # se vuelve a deduplicar sobre las columnas de la tabla
+    return [list(row) for row in dict.fromkeys(map(tuple, filas))]
+
+# ============================================================
+# EJECUCIÓN
+# ============================================================
 
-    # 🔴 QUERY ORIGINAL – NO MODIFICADA
+conn_mysql = cursor_mysql = None
+
+try:
+    # 🔴 QUERY ORIGINAL – SOLO EL RANGO DE FECHAS SE PARTE EN VENTANAS MENSUALES
     query = """
     SELECT %nolock DISTINCT
     RBOP_PAADM_DR->PAADM_ADMNO AS numero_episodio,
@@ -265,43 +345,7 @@ try:
     ANAOP_Surgeon_DR->CTPCP_Desc AS cirujano_principal,
     ANAOP_SecondSurgeon_DR->CTPCP_Code AS rut_cirujano_2,
     ANAOP_SecondSurgeon_DR->CTPCP_Desc AS cirujano_2,
-        (
-        SELECT OPAS_CareProv_DR->CTPCP_Code
-        FROM OR_An_Oper_Additional_Staff
-        WHERE OPAS_ParRef = OR_Anaest_Operation.%id 
-          AND OPAS_OperatingStaffRole_DR->OPSTFRL_Desc = 'Tercer Cirujano'
-    ) AS rut_cirujano_3,
-    (
-        SELECT OPAS_CareProv_DR->CTPCP_Desc
-        FROM OR_An_Oper_Additional_Staff
-        WHERE OPAS_ParRef = OR_Anaest_Operation.%id 
-          AND OPAS_OperatingStaffRole_DR->OPSTFRL_Desc = 'Tercer Cirujano'
-    ) AS cirujano_3,
-    (
-        SELECT OPAS_CareProv_DR->CTPCP_Code
-        FROM OR_An_Oper_Additional_Staff
-        WHERE OPAS_ParRef = OR_Anaest_Operation.%id 
-          AND OPAS_OperatingStaffRole_DR->OPSTFRL_Desc = 'Cuarto Cirujano'
-    ) AS rut_cirujano_4,
-    (
-        SELECT OPAS_CareProv_DR->CTPCP_Desc
-        FROM OR_An_Oper_Additional_Staff
-        WHERE OPAS_ParRef = OR_Anaest_Operation.%id 
-          AND OPAS_OperatingStaffRole_DR->OPSTFRL_Desc = 'Cuarto Cirujano'
-    ) AS cirujano_4,
-    (
-        SELECT OPAS_CareProv_DR->CTPCP_Code
-        FROM OR_An_Oper_Additional_Staff
-        WHERE OPAS_ParRef = OR_Anaest_Operation.%id 
-          AND OPAS_OperatingStaffRole_DR->OPSTFRL_Desc = 'Quinto Cirujano'
-    ) AS rut_cirujano_5,
-    (
-        SELECT OPAS_CareProv_DR->CTPCP_Desc
-        FROM OR_An_Oper_Additional_Staff
-        WHERE OPAS_ParRef = OR_Anaest_Operation.%id 
-          AND OPAS_OperatingStaffRole_DR->OPSTFRL_Desc = 'Quinto Cirujano'
-    ) AS cirujano_5,
-        ANAOP_ItemsCountedBy_DR->CTPCP_Code AS rut_arsenalera,
+    ANAOP_ItemsCountedBy_DR->CTPCP_Code AS rut_arsenalera,
     ANAOP_ItemsCountedBy_DR->CTPCP_Desc AS arsenalera,
     ANAOP_ItemsReCountedBy_DR->CTPCP_Code AS rut_pabellonera,
     ANAOP_ItemsReCountedBy_DR->CTPCP_Desc AS pabellonera,
@@ -310,10 +354,8 @@ try:
     ANAOP_Par_Ref->ANA_ASA_DR->ORASA_Desc AS riesgo_anestesico,
     ANAOP_Par_Ref->ANA_Method->ANMET_Desc AS tipo_anestesia,
     ANAOP_Par_Ref->ANA_BypassRec AS bypass_recuperacion_s_n,
-    list(
-        OR_AnaestAdditionalStaff->ANAAS_CareProv_DR->CTPCP_Code || ' ' || 
-        OR_AnaestAdditionalStaff->ANAAS_OperatingStaffRole_DR->OPSTFRL_Desc
-    ) AS codigo_staff_anestesistas
+    OR_Anaest_Operation.%ID AS id_operacion,
+    ANAOP_Par_Ref AS id_anestesia
 FROM
     RB_OperatingRoom
 LEFT JOIN OR_Anaesthesia 
@@ -327,52 +369,53 @@ LEFT JOIN questionnaire.QTCELCPI
 LEFT JOIN OR_An_Oper_SecondaryProc 
     ON OR_Anaest_Operation.ANAOP_RowId = OR_An_Oper_SecondaryProc.SECPR_ParRef
 WHERE 
-    PAADM_AdmDate >= DATEADD(MONTH, -12, CURRENT_DATE)
+    PAADM_AdmDate >= '{desde}' AND PAADM_AdmDate < '{hasta}'
     AND RBOP_TimeOper > 0
     AND RBOP_RowId > 0
     AND RBOP_PAADM_DR->PAADM_DepCode_DR->CTLOC_Hospital_DR = 10448 
     """
-    cursor_iris.execute(query)
-    rows = cursor_iris.fetchall()
-
-    formatted_rows = []
-    for r in rows:
-        formatted_rows.append(tuple(str(v) if v is not None else '' for v in r) +
-                              (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),))
-
     conn_mysql = mysql.connector.connect(
         host=mysql_host,
         port=mysql_port,
         user=mysql_user,
         password=mysql_password,
-        database=mysql_database
+        database=mysql_database,
+        allow_local_infile=True
     )
     cursor_mysql = conn_mysql.cursor()
 
     crear_tabla(cursor_mysql)
     conn_mysql.commit()
 
-    cursor_mysql.execute("TRUNCATE TABLE z_pabellon_prueba_concepto")
-    conn_mysql.commit()
-
-    placeholders = ",".join(["%s"] * len(formatted_rows[0]))
-    insert_sql = f"INSERT INTO z_pabellon_prueba_concepto VALUES ({placeholders})"
-
-    cursor_mysql.executemany(insert_sql, formatted_rows)
-    conn_mysql.commit()
+    # IRIS -> MySQL por ventanas mensuales (últimos 12 meses) en paralelo acotado
+    # (IRIS_PARALELO); cada ventana se inserta en orden apenas está lista.
+    # El personal adicional y el staff de anestesia del período se consultan
+    # a la vez, en otra conexión.
+    desde = hace_meses(12)
+    fecha_actualizacion = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="iris_personal") as executor:
+        futuro_personal = executor.submit(personal_adicional, desde)
+        futuro_staff = executor.submit(staff_anestesia, desde)
+        # Se carga en z_pabellon_prueba_concepto__staging y se publica con RENAME TABLE
+        with carga_publicada(conn_mysql, "z_pabellon_prueba_concepto") as carga:
+            for columnas, lote in consultar_por_ventanas(query, desde):
+                lote = agregar_personal(columnas, lote, futuro_personal.result(), futuro_staff.result())
+                for row in lote:
+                    row.append(fecha_actualizacion)
+                carga.agregar(lote)
 
+    logging.info(f"Filas insertadas: {carga.total}")
     logging.info("ETL z_pabellon_prueba_concepto finalizado correctamente.")
 
 except Exception as e:
     logging.error(f"Error: {e}")
 
 finally:
-    for obj in [cursor_iris, conn_iris, cursor_mysql, conn_mysql]:
+    for obj in [cursor_mysql, conn_mysql]:
         try:
             if obj:
                 obj.close()
         except Exception:
             pass
 
-    if jpype.isJVMStarted():
-        jpype.shutdownJVM()
+    cerrar_iris()
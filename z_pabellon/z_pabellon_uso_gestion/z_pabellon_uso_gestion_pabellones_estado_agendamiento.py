@@ -1,12 +1,18 @@
-import jaydebeapi
-import jpype
 import mysql.connector
 from dotenv import load_dotenv
 import os
+import sys
 import logging
-from datetime import datetime
+from datetime import datetime, date
 from cryptography.fernet import Fernet
 
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from z_comun.iris import cerrar_iris
+from z_comun.base_quirurgica import leer_base, leer_feriados, fecha_dmy, mapear
+from z_comun.incremental import inicio_extraccion, carga_incremental, guardar_watermark
+
 # ============================================================
 # CARGA DE ENTORNO Y LOGS
 # ============================================================
@@ -27,18 +33,15 @@ logging.basicConfig(
 # VARIABLES DE ENTORNO
 # ============================================================
 
-jdbc_driver_name = os.getenv('JDBC_DRIVER_NAME')
-jdbc_driver_loc = os.getenv('JDBC_DRIVER_PATH')
-iris_connection_string = os.getenv('CONEXION_STRING')
-iris_user = os.getenv('DB_USER')
-iris_password = os.getenv('DB_PASSWORD')
-
 mysql_host = os.getenv('DB_MYSQL_HOST')
 mysql_port = int(os.getenv('DB_MYSQL_PORT', 3306))
 mysql_user = os.getenv('DB_MYSQL_USER')
 mysql_password = os.getenv('DB_MYSQL_PASSWORD')
 mysql_database = os.getenv('DB_MYSQL_DATABASE')
 
+TABLA = "z_pabellon_uso_gestion_pabellones_estado_agendamiento"
+FECHA_HISTORICA = '2025-01-01'
+
 # ============================================================
 # FUNCIÓN: CREAR TABLA SI NO EXISTE
 # ============================================================
@@ -88,150 +91,134 @@ def crear_tabla_si_no_existe(cursor):
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
     """)
 
+# ============================================================
+# PROYECCIÓN SOBRE LA BASE QUIRÚRGICA
+# ============================================================
+
+ESTADOS_CIRUGIA = {
+    'B': 'AGENDADO', 'CL': 'CERRADO', 'C': 'CONFIRMADO', 'SF': 'ENVIADO POR',
+    'SK': 'ENVIADO POR RECONOCIDO', 'N': 'NO LISTO', 'P': 'POSTERGADO',
+    'D': 'REALIZADO', 'A': 'RECEPCIONADO', 'DP': 'SALIDA', 'R': 'SOLICITADO',
+    'X': 'SUSPENDIDO',
+}
+
+TIPOS_CIRUGIA = {
+    'EL': 'Cirugía Electiva Programada',
+    'ENP': 'Cirugía Electiva No Programada',
+    'EM': 'Cirugía Urgencia',
+}
+
+def _numero_id(serie):
+    """
+    Valor numérico de un RowId de IRIS para compararlo: '1234' -> 1234 y,
+    en tablas hijas, '1234||12' -> 12 (el padre es el mismo dentro del
+    grupo). NaN si viene vacío.
+    """
+    return pd.to_numeric(serie.astype(str).str.rsplit("||", n=1).str[-1], errors="coerce")
+
+
+def _ultimo(base, columna):
+    """Filas con el mayor valor numérico de 'columna' en su cirugía; sin valores, todas."""
+    valor = _numero_id(base[columna])
+    maximo = valor.groupby(base["RBOP_RowId"]).transform("max")
+    return base[(valor == maximo) | maximo.isna()]
+
+
+COLUMNAS_BASE = [
+    "RBOP_RowId", "PAADM_ADMNo", "PAPMI_ID", "RBOP_DateOper", "RBOP_TimeOper",
+    "RBOP_Status", "RBOP_BookingType", "RBOP_Resource_DR", "Recurso_Desc",
+    "Suspension_Desc", "ANA_RowId",
+    "ANA_TheatreInDate", "ANA_TheatreInTime", "ANA_TheatreOutDate", "ANA_TheatreOutTime",
+    "ANA_CustomDate1", "ANA_CustomTime1", "ANA_CustomDate2", "ANA_CustomTime2",
+    "ANA_PACU_StartDate", "ANA_PACU_StartTime", "ANA_PACU_FinishDate", "ANA_PACU_FinishTime",
+    "ANA_AreaInDate", "ANA_AreaInTime", "ANAOP_RowId", "ANAOP_No", "Equipo_Desc",
+    "ANAOP_OpStartDate", "ANAOP_OpStartTime", "ANAOP_OpEndDate", "ANAOP_OpEndTime",
+    "ANAOP_Oper_Code", "ANAOP_Oper_Desc",
+]
+
+
+def proyectar(base, feriados, desde, hoy):
+    """
+    Una fila por cirugía agendada entre 'desde' y hoy, con el último
+    protocolo anestésico del episodio (MAX(ANA_RowId)) y su última
+    operación (MAX(ANAOP_No)), como los subselect de la consulta original.
+    'feriados' es leer_feriados(): marca las cirugías en día festivo.
+    """
+    base = base.fillna("")
+    base = base[
+        (base["RBOP_DateOper"] >= desde.isoformat())
+        & (base["RBOP_DateOper"] <= hoy.isoformat())
+        & (pd.to_numeric(base["RBOP_RowId"], errors="coerce") > 0)
+        & (base["RBOP_Resource_DR"] != "")
+    ]
+    # Como números: en texto '99' quedaría sobre '100'
+    base = _ultimo(base, "ANA_RowId")
+    base = _ultimo(base, "ANAOP_No")
+    # Las cirugías secundarias no son parte de esta tabla
+    base = base.drop_duplicates(["RBOP_RowId", "ANA_RowId", "ANAOP_RowId"])
+    base = base.merge(
+        feriados.drop_duplicates("CTHOL_Code"),
+        how="left", left_on="RBOP_DateOper", right_on="CTHOL_Code",
+    ).fillna("")
+
+    suspendida = base["RBOP_Status"] == "X"
+    iniciada = (base["ANA_TheatreInDate"] != "") | (base["ANA_CustomDate1"] != "")
+    momento = pd.Series("", index=base.index)
+    momento[suspendida & ~iniciada] = "Suspendida ANTES de iniciar"
+    momento[suspendida & iniciada] = "Suspendida DESPUÉS de iniciar"
+
+    return pd.DataFrame({
+        "episodio": base["PAADM_ADMNo"],
+        "fecha_cirugia": fecha_dmy(base["RBOP_DateOper"]),
+        "estado_cirugia": mapear(base["RBOP_Status"], ESTADOS_CIRUGIA, 'OTRO'),
+        "tipo_cirugia": mapear(base["RBOP_BookingType"], TIPOS_CIRUGIA, 'Otro'),
+        "momento_suspension": momento,
+        "area_qx": base["Equipo_Desc"],
+        "pabellon": base["Recurso_Desc"],
+        "id_cirugia": base["RBOP_RowId"],
+        "motivo_suspencion": base["Suspension_Desc"],
+        "es_festivo": (base["CTHOL_Code"] != "").map({True: 'Sí', False: 'No'}),
+        "nombre_festivo": base["CTHOL_Desc"],
+        "fecha_ingreso_quirofano": base["ANA_TheatreInDate"],
+        "hora_ingreso_quirofano": base["ANA_TheatreInTime"],
+        "fecha_egreso_quirofano": base["ANA_TheatreOutDate"],
+        "hora_egreso_quirofano": base["ANA_TheatreOutTime"],
+        "fecha_inicio_cirugia_en_protocolo_anestesico": base["ANA_CustomDate1"],
+        "hora_inicio_cirugia_protAnest": base["ANA_CustomTime1"],
+        "fecha_termino_cirugia_en_protocolo_anestesico": base["ANA_CustomDate2"],
+        "hora_termino_cirugia_en_protocolo_anestesico": base["ANA_CustomTime2"],
+        "fecha_inicio_cirugia_en_protocolo_operatorio": base["ANAOP_OpStartDate"],
+        "hora_inicio_cirugia_en_protocolo_operatorio": base["ANAOP_OpStartTime"],
+        "fecha_termino_cirugia_en_protocolo_operatorio": base["ANAOP_OpEndDate"],
+        "hora_termino_cirugia_en_protocolo_operatorio": base["ANAOP_OpEndTime"],
+        "codigo_cirugia_principal_del_protocolo_pperatorio": base["ANAOP_Oper_Code"],
+        "descripcion_cirugia_principal_del_protocolo_operatorio": base["ANAOP_Oper_Desc"],
+        "RUT_Paciente": base["PAPMI_ID"],
+        "numero_cirugia": base["ANAOP_No"],
+        "fecha_ingreso_recuperacion": base["ANA_PACU_StartDate"],
+        "hora_ingreso_recuperacion": base["ANA_PACU_StartTime"],
+        "fecha_egreso_recuperacion": base["ANA_PACU_FinishDate"],
+        "hora_egreso_recuperacion": base["ANA_PACU_FinishTime"],
+        "fecha_cirugia_agendada": base["RBOP_DateOper"],
+        "hora_cirugia_agendada": base["RBOP_TimeOper"],
+        "fecha_ingreso_area_quirurgica": base["ANA_AreaInDate"],
+        "hora_ingreso_area_quirurgica": base["ANA_AreaInTime"],
+    })
+
 # ============================================================
 # MAIN
 # ============================================================
 
 conn_mysql = None
-conn_iris = None
-cursor_iris = None
 cursor_mysql = None
 
 try:
     # --------------------------------------------------------
     # VALIDACIONES
     # --------------------------------------------------------
-    if not jdbc_driver_name or not jdbc_driver_loc:
-        raise ValueError("JDBC no configurado")
-    if not iris_connection_string or not iris_user or not iris_password:
-        raise ValueError("IRIS no configurado")
     if not mysql_host or not mysql_user or not mysql_password or not mysql_database:
         raise ValueError("MySQL no configurado")
 
-    # --------------------------------------------------------
-    # INICIAR JVM
-    # --------------------------------------------------------
-    if not jpype.isJVMStarted():
-        jpype.startJVM(
-            jpype.getDefaultJVMPath(),
-            "-Djava.class.path=" + jdbc_driver_loc
-        )
-
-    # --------------------------------------------------------
-    # CONEXIÓN IRIS
-    # --------------------------------------------------------
-    conn_iris = jaydebeapi.connect(
-        jdbc_driver_name,
-        iris_connection_string,
-        {'user': iris_user, 'password': iris_password},
-        jdbc_driver_loc
-    )
-    cursor_iris = conn_iris.cursor()
-
-    # --------------------------------------------------------
-    # QUERY IRIS
-    # --------------------------------------------------------
-    query = '''
-    SELECT %NOLOCK 
-        RBOP.RBOP_PAADM_DR->PAADM_ADMNO AS episodio,
-        TO_CHAR(RBOP.RBOP_DateOper, 'DD-MM-YYYY') AS fecha_cirugia,
-        CASE RBOP.RBOP_Status
-            WHEN 'B'  THEN 'AGENDADO'
-            WHEN 'CL' THEN 'CERRADO'
-            WHEN 'C'  THEN 'CONFIRMADO'
-            WHEN 'SF' THEN 'ENVIADO POR'
-            WHEN 'SK' THEN 'ENVIADO POR RECONOCIDO'
-            WHEN 'N'  THEN 'NO LISTO'
-            WHEN 'P'  THEN 'POSTERGADO'
-            WHEN 'D'  THEN 'REALIZADO'
-            WHEN 'A'  THEN 'RECEPCIONADO'
-            WHEN 'DP' THEN 'SALIDA'
-            WHEN 'R'  THEN 'SOLICITADO'
-            WHEN 'X'  THEN 'SUSPENDIDO'
-            ELSE 'OTRO'
-        END AS estado_cirugia,
-        CASE RBOP.RBOP_BookingType
-            WHEN 'EL'  THEN 'Cirugía Electiva Programada'
-            WHEN 'ENP' THEN 'Cirugía Electiva No Programada'
-            WHEN 'EM'  THEN 'Cirugía Urgencia'
-            ELSE 'Otro'
-        END AS tipo_cirugia,
-        CASE 
-            WHEN RBOP.RBOP_Status = 'X'
-             AND (ANA.ANA_TheatreInDate IS NULL AND ANA.ANA_CustomDate1 IS NULL)
-            THEN 'Suspendida ANTES de iniciar'
-            WHEN RBOP.RBOP_Status = 'X'
-             AND (ANA.ANA_TheatreInDate IS NOT NULL OR ANA.ANA_CustomDate1 IS NOT NULL)
-            THEN 'Suspendida DESPUÉS de iniciar'
-            ELSE NULL
-        END AS momento_suspension,
-        ANAOP.ANAOP_Depar_Oper_DR->CTLOC_Desc AS area_qx,
-        RBOP.RBOP_Resource_DR->RES_Desc AS pabellon,
-        RBOP.RBOP_RowId AS id_cirugia,
-        RBOP.RBOP_ReasonSuspend_DR->SUSP_Desc AS motivo_suspencion,
-        CASE WHEN HOL.CTHOL_Code IS NOT NULL THEN 'Sí' ELSE 'No' END AS es_festivo,
-        HOL.CTHOL_Desc AS nombre_festivo,
-        ANA.ANA_TheatreInDate  AS fecha_ingreso_quirofano,
-        ANA.ANA_TheatreInTime  AS hora_ingreso_quirofano,
-        ANA.ANA_TheatreOutDate AS fecha_egreso_quirofano,
-        ANA.ANA_TheatreOutTime AS hora_egreso_quirofano,
-        ANA.ANA_CustomDate1 AS fecha_inicio_cirugia_en_protocolo_anestesico,
-        ANA.ANA_CustomTime1 AS hora_inicio_cirugia_protAnest,
-        ANA.ANA_CustomDate2 AS fecha_termino_cirugia_en_protocolo_anestesico,
-        ANA.ANA_CustomTime2 AS hora_termino_cirugia_en_protocolo_anestesico,
-        ANAOP.ANAOP_OpStartDate AS fecha_inicio_cirugia_en_protocolo_operatorio,
-        ANAOP.ANAOP_OpStartTime AS hora_inicio_cirugia_en_protocolo_operatorio,
-        ANAOP.ANAOP_OpEndDate   AS fecha_termino_cirugia_en_protocolo_operatorio,
-        ANAOP.ANAOP_OpEndTime   AS hora_termino_cirugia_en_protocolo_operatorio,
-        ANAOP.ANAOP_Type_DR->OPER_Code AS codigo_cirugia_principal_del_protocolo_pperatorio,
-        ANAOP.ANAOP_Type_DR->OPER_Desc AS descripcion_cirugia_principal_del_protocolo_operatorio,
-        RBOP.RBOP_PAADM_DR->PAADM_PAPMI_DR->PAPMI_ID AS RUT_Paciente,
-        ANAOP.ANAOP_No AS numero_cirugia,
-        ANA.ANA_PACU_StartDate  AS fecha_ingreso_recuperacion,
-		ANA.ANA_PACU_StartTime  AS hora_ingreso_recuperacion,
-		ANA.ANA_PACU_FinishDate AS fecha_egreso_recuperacion,
-		ANA.ANA_PACU_FinishTime AS hora_egreso_recuperacion,
-		RBOP.RBOP_DateOper AS fecha_cirugia_agendada,
-		RBOP.RBOP_TimeOper AS hora_cirugia_agendada,
-        ANA.ANA_AreaInDate as fecha_ingreso_area_quirurgica,
-		ANA.ANA_AreaInTime as hora_ingreso_area_quirurgica
-    FROM RB_OperatingRoom RBOP
-    LEFT JOIN OR_Anaesthesia ANA
-      ON RBOP.RBOP_PAADM_DR = ANA.ANA_PAADM_ParRef
-     AND ANA.ANA_RowId = (
-        SELECT MAX(A2.ANA_RowId)
-        FROM OR_Anaesthesia A2
-        WHERE A2.ANA_PAADM_ParRef = RBOP.RBOP_PAADM_DR
-     )
-    LEFT JOIN OR_Anaest_Operation ANAOP
-      ON ANA.ANA_RowId = ANAOP.ANAOP_Par_Ref
-     AND ANAOP.ANAOP_No = (
-        SELECT MAX(O2.ANAOP_No)
-        FROM OR_Anaest_Operation O2
-        WHERE O2.ANAOP_Par_Ref = ANA.ANA_RowId
-     )
-    LEFT JOIN CT_PubHol HOL
-      ON RBOP.RBOP_DateOper = HOL.CTHOL_Code
-    WHERE RBOP.RBOP_DateOper >= '2025-01-01'
-      AND RBOP.RBOP_DateOper <= CURRENT_DATE
-      AND RBOP.RBOP_RowId > 0
-      AND RBOP.RBOP_Resource_DR IS NOT NULL
-      AND RBOP.RBOP_PAADM_DR->PAADM_DepCode_DR->CTLOC_Hospital_DR = 10448
-    ORDER BY fecha_cirugia, pabellon, estado_cirugia;
-    '''
-
-    cursor_iris.execute(query)
-    rows = cursor_iris.fetchall()
-
-    # --------------------------------------------------------
-    # FORMATEO
-    # --------------------------------------------------------
-    formatted_rows = []
-    for row in rows:
-        valores = [str(col) if col is not None else '' for col in row]
-        fechaActualizacion = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        formatted_rows.append(tuple(valores + [fechaActualizacion]))
-
     # --------------------------------------------------------
     # MYSQL
     # --------------------------------------------------------
@@ -240,43 +227,55 @@ try:
         port=mysql_port,
         user=mysql_user,
         password=mysql_password,
-        database=mysql_database
+        database=mysql_database,
+        allow_local_infile=True
     )
     cursor_mysql = conn_mysql.cursor()
 
     crear_tabla_si_no_existe(cursor_mysql)
     conn_mysql.commit()
 
-    cursor_mysql.execute(
-        "TRUNCATE TABLE z_pabellon_uso_gestion_pabellones_estado_agendamiento"
-    )
-    conn_mysql.commit()
+    # Incremental: solo desde el watermark menos la ventana de datos mutables
+    hoy = date.today()
+    desde, completa = inicio_extraccion(cursor_mysql, TABLA, FECHA_HISTORICA)
 
-    insert_query = """
-    INSERT INTO z_pabellon_uso_gestion_pabellones_estado_agendamiento (
-        episodio, fecha_cirugia, estado_cirugia, tipo_cirugia, momento_suspension,
-        area_qx, pabellon, id_cirugia, motivo_suspencion, es_festivo, nombre_festivo,
-        fecha_ingreso_quirofano, hora_ingreso_quirofano, fecha_egreso_quirofano, hora_egreso_quirofano,
-        fecha_inicio_cirugia_en_protocolo_anestesico, hora_inicio_cirugia_protAnest,
-        fecha_termino_cirugia_en_protocolo_anestesico, hora_termino_cirugia_en_protocolo_anestesico,
-        fecha_inicio_cirugia_en_protocolo_operatorio, hora_inicio_cirugia_en_protocolo_operatorio,
-        fecha_termino_cirugia_en_protocolo_operatorio, hora_termino_cirugia_en_protocolo_operatorio,
-        codigo_cirugia_principal_del_protocolo_pperatorio,
-        descripcion_cirugia_principal_del_protocolo_operatorio,
-        RUT_Paciente, numero_cirugia, fecha_ingreso_recuperacion,
-        hora_ingreso_recuperacion,fecha_egreso_recuperacion,hora_egreso_recuperacion,
-        fecha_cirugia_agendada,hora_cirugia_agendada,fecha_ingreso_area_quirurgica,
-        hora_ingreso_area_quirurgica,fechaActualizacion
-    ) VALUES (
-        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-        %s, %s, %s, %s, %s, %s
-    )
-    """
+    columnas = [
+        "episodio", "fecha_cirugia", "estado_cirugia", "tipo_cirugia",
+        "momento_suspension", "area_qx", "pabellon", "id_cirugia", "motivo_suspencion",
+        "es_festivo", "nombre_festivo", "fecha_ingreso_quirofano",
+        "hora_ingreso_quirofano", "fecha_egreso_quirofano", "hora_egreso_quirofano",
+        "fecha_inicio_cirugia_en_protocolo_anestesico", "hora_inicio_cirugia_protAnest",
+        "fecha_termino_cirugia_en_protocolo_anestesico",
+        "hora_termino_cirugia_en_protocolo_anestesico",
+        "fecha_inicio_cirugia_en_protocolo_operatorio",
+        "hora_inicio_cirugia_en_protocolo_operatorio",
+        "fecha_termino_cirugia_en_protocolo_operatorio",
+        "hora_termino_cirugia_en_protocolo_operatorio",
+        "codigo_cirugia_principal_del_protocolo_pperatorio",
+        "descripcion_cirugia_principal_del_protocolo_operatorio", "RUT_Paciente",
+        "numero_cirugia", "fecha_ingreso_recuperacion", "hora_ingreso_recuperacion",
+        "fecha_egreso_recuperacion", "hora_egreso_recuperacion", "fecha_cirugia_agendada",
+        "hora_cirugia_agendada", "fecha_ingreso_area_quirurgica",
+        "hora_ingreso_area_quirurgica", "fechaActualizacion"
+    ]
+
+    # --------------------------------------------------------
+    # BASE QUIRÚRGICA -> PROYECCIÓN -> MYSQL
+    # --------------------------------------------------------
+    # La base se extrae de IRIS solo si no está vigente en este ciclo
+    base = leer_base(COLUMNAS_BASE, desde=desde)
+    filas = proyectar(base, leer_feriados(), desde, hoy)[columnas[:-1]].values.tolist()
+
+    # Fusión por id_cirugia: solo se escriben cirugías nuevas o que cambiaron
+    fechaActualizacion = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with carga_incremental(conn_mysql, TABLA, "fecha_cirugia_agendada", desde, completa,
+                           columnas, clave="id_cirugia") as carga:
+        carga.agregar([valores + [fechaActualizacion] for valores in filas])
+
+    guardar_watermark(cursor_mysql, TABLA, hoy)
+    conn_mysql.commit()
 
-    for i in range(0, len(formatted_rows), 1000):
-        cursor_mysql.executemany(insert_query, formatted_rows[i:i + 1000])
-        conn_mysql.commit()
+    logging.info(f"Filas transferidas: {carga.total}")
 
     logging.info("Datos transferidos exitosamente.")
 
@@ -284,13 +283,8 @@ except Exception as e:
     logging.error(f"Error: {e}")
 
 finally:
-    if cursor_iris:
-        cursor_iris.close()
-    if conn_iris:
-        conn_iris.close()
     if cursor_mysql:
         cursor_mysql.close()
     if conn_mysql:
         conn_mysql.close()
-    if jpype.isJVMStarted():
-        jpype.shutdownJVM()
+    cerrar_iris()
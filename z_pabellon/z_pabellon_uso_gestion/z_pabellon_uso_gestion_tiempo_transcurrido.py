@@ -33,6 +33,7 @@ def crear_tabla_z_pabellon_uso_gestion_tiempo_transcurrido(cursor):
         hora_egreso_quirofano VARCHAR(8),
         pabellon VARCHAR(15),
         hora_ingreso_siguiente VARCHAR(8),
+        minutos_recambio INT,
         es_ultima_cirugia_del_dia VARCHAR(20),
         tipo_cirugia VARCHAR(30),
         estado_cirugia VARCHAR(12),
@@ -44,6 +45,76 @@ def crear_tabla_z_pabellon_uso_gestion_tiempo_transcurrido(cursor):
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
     """)
 
+    # Tablas creadas antes de minutos_recambio
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = 'z_pabellon_uso_gestion_tiempo_transcurrido'
+          AND COLUMN_NAME = 'minutos_recambio'
+    """)
+    if not cursor.fetchone()[0]:
+        cursor.execute("""
+            ALTER TABLE z_pabellon_uso_gestion_tiempo_transcurrido
+            ADD COLUMN minutos_recambio INT AFTER hora_ingreso_siguiente
+        """)
+
+# ============================================================
+# FUNCIÓN: hora de ingreso de la cirugía siguiente
+# ============================================================
+def calcular_hora_siguiente(df):
+    """
+    Para cada cirugía, la hora de ingreso de la siguiente en el mismo
+    pabellón y fecha_cirugia (la menor hora estrictamente posterior).
+    Se ordena una vez y se desplaza dentro de cada (fecha, pabellón).
+
+    Se informa solo si la siguiente entra después del egreso de esta (o si
+    no hay egreso). minutos_recambio = ingreso siguiente - egreso.
+    """
+    df = df.copy()
+    hora_dt = pd.to_datetime(df['hora_ingreso_quirofano'], format='%H:%M:%S', errors='coerce')
+    df['_hora_dt'] = hora_dt
+    claves = ['fecha_cirugia', 'pabellon']
+
+    # Una fila por (fecha, pabellón, hora): si dos cirugías entran a la misma
+    # hora, la siguiente de ambas es la próxima hora distinta
+    validas = df['_hora_dt'].notna() & df['fecha_cirugia'].notna() & df['pabellon'].notna()
+    horas = (
+        df.loc[validas, claves + ['_hora_dt', 'hora_ingreso_quirofano']]
+          .sort_values(claves + ['_hora_dt'], kind='stable')
+          .drop_duplicates(claves + ['_hora_dt'])
+    )
+    siguiente = horas.groupby(claves, sort=False)[['_hora_dt', 'hora_ingreso_quirofano']].shift(-1)
+    horas['_siguiente_dt'] = siguiente['_hora_dt']
+    horas['_siguiente'] = siguiente['hora_ingreso_quirofano']
+
+    df = df.merge(
+        horas[claves + ['_hora_dt', '_siguiente_dt', '_siguiente']],
+        on=claves + ['_hora_dt'], how='left'
+    )
+
+    # Validación egreso vs ingreso siguiente
+    egreso_dt = pd.to_datetime(df['hora_egreso_quirofano'], format='%H:%M:%S', errors='coerce')
+    hay_siguiente = df['_siguiente'].notna()
+    sin_egreso = df['hora_egreso_quirofano'].isna()
+    egreso_invalido = hay_siguiente & ~sin_egreso & egreso_dt.isna()
+    if egreso_invalido.any():
+        logging.warning(
+            f"Hora de egreso inválida en {egreso_invalido.sum()} cirugías, sin hora siguiente "
+            f"(episodios: {', '.join(df.loc[egreso_invalido, 'episodio'].astype(str).head(10))})"
+        )
+
+    informar = hay_siguiente & (sin_egreso | (df['_siguiente_dt'] > egreso_dt))
+    df['hora_ingreso_siguiente'] = df['_siguiente'].where(informar, None)
+
+    recambio = (df['_siguiente_dt'] - egreso_dt).dt.total_seconds() // 60
+    # Enteros o None (no NaN) para el INSERT
+    df['minutos_recambio'] = pd.Series(
+        [int(m) if pd.notna(m) else None for m in recambio.where(informar & egreso_dt.notna())],
+        index=df.index, dtype=object
+    )
+
+    return df.drop(columns=['_hora_dt', '_siguiente_dt', '_siguiente'])
+
 # ============================================================
 # Conectar a MySQL
 # ============================================================
@@ -99,44 +170,12 @@ df['fecha_cirugia'] = pd.to_datetime(df['fecha_cirugia'], dayfirst=True, errors=
 for col in ['fecha_ingreso_quirofano', 'fecha_egreso_quirofano']:
     df[col] = pd.to_datetime(df[col], errors='coerce').dt.date
 
-df['hora_ingreso_quirofano_dt'] = pd.to_datetime(
-    df['hora_ingreso_quirofano'], format='%H:%M:%S', errors='coerce'
-)
-
-df['hora_ingreso_siguiente'] = None
-
-for i, row in df.iterrows():
-    if pd.isna(row['hora_ingreso_quirofano_dt']) or pd.isna(row['fecha_cirugia']):
-        continue
-
-    posteriores = df[
-        (df['fecha_cirugia'] == row['fecha_cirugia']) &
-        (df['pabellon'] == row['pabellon']) &
-        (df['hora_ingreso_quirofano_dt'] > row['hora_ingreso_quirofano_dt'])
-    ]
-
-    if not posteriores.empty:
-        siguiente = posteriores.sort_values(by='hora_ingreso_quirofano_dt').iloc[0]
-        hora_siguiente = siguiente['hora_ingreso_quirofano']
-        hora_egreso = row['hora_egreso_quirofano']
-
-        if pd.notnull(hora_egreso) and pd.notnull(hora_siguiente):
-            try:
-                egreso_dt = datetime.strptime(hora_egreso, "%H:%M:%S")
-                ingreso_sig_dt = datetime.strptime(hora_siguiente, "%H:%M:%S")
-                if ingreso_sig_dt > egreso_dt:
-                    df.at[i, 'hora_ingreso_siguiente'] = hora_siguiente
-            except Exception as e:
-                logging.warning(f"Error al validar hora siguiente en episodio {row['episodio']}: {e}")
-        else:
-            df.at[i, 'hora_ingreso_siguiente'] = hora_siguiente
-
-df.drop(columns=['hora_ingreso_quirofano_dt'], inplace=True)
+df = calcular_hora_siguiente(df)
 
 fecha_actualizacion = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 df['fechaActualizacion'] = fecha_actualizacion
 
-columnas_finales = columnas_objetivo + ['hora_ingreso_siguiente', 'fechaActualizacion']
+columnas_finales = columnas_objetivo + ['hora_ingreso_siguiente', 'minutos_recambio', 'fechaActualizacion']
 df = df[columnas_finales]
 
 df = df.where(pd.notnull(df), None)
@@ -157,8 +196,8 @@ insert_query = """
     INSERT INTO z_pabellon_uso_gestion_tiempo_transcurrido
     (episodio, fecha_cirugia, fecha_ingreso_quirofano, hora_ingreso_quirofano,
      fecha_egreso_quirofano, hora_egreso_quirofano, pabellon,
-     tipo_cirugia, estado_cirugia, hora_ingreso_siguiente, fechaActualizacion)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+     tipo_cirugia, estado_cirugia, hora_ingreso_siguiente, minutos_recambio, fechaActualizacion)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
 """
 
 cursor.executemany(insert_query, df.values.tolist())
@@ -8,7 +8,9 @@ from dotenv import load_dotenv
 import os
 import logging
 from datetime import datetime
-import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from z_comun.google_sheets import PublicadorSheets
 
 # === CONFIGURACIÓN DE CONSOLA UTF-8 ===
 sys.stdout.reconfigure(encoding='utf-8')
@@ -32,6 +34,9 @@ iris_password = os.getenv('DB_PASSWORD')
 service_account_path = os.getenv('GSHEET_CREDENTIALS')
 sheet_name = os.getenv('GSHEET_NAME', 'Listado de Operaciones - Hospital del Salvador')
 
+# Hash por fila de lo último publicado (solo se reenvían las filas que cambian)
+SNAPSHOTS_SHEETS = 'z_reportes_google_sheet/.sheets_snapshots'
+
 # === QUERY IRIS ===
 query = """
 SELECT 
@@ -135,105 +140,35 @@ try:
 
     fecha_actual = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+    keep = ["Cirugías por Hospital", "Cirugías agrupadas por Código"]
+
+    # === HOJA 1: DETALLE / HOJA 2: AGRUPADA ===
+    # Fila 1: fecha de actualización; fila 2: encabezados; luego los datos.
+    # Solo se envían las filas que cambiaron desde la última publicación
+    publicador = PublicadorSheets(sh, snapshots=SNAPSHOTS_SHEETS)
+    titulo = [[f"Última actualización: {fecha_actual}"]]
+    publicador.agregar("Cirugías por Hospital", titulo + data_to_upload,
+                       fila_encabezado=1, ancho_columnas=180)
+    publicador.agregar("Cirugías agrupadas por Código", titulo + data_group,
+                       fila_encabezado=1, ancho_columnas=180)
+    publicador.publicar()
+    logging.info("Hojas 'Cirugías por Hospital' y 'Cirugías agrupadas por Código' actualizadas correctamente.")
+
     # === ASEGURAR ESTRUCTURA DE HOJAS ===
+    # Después de publicar: las oficiales ya existen (el publicador crea las
+    # que falten), así que se elimina toda hoja que no esté en 'keep'
     existing_sheets = [ws.title for ws in sh.worksheets()]
     logging.info(f"Hojas existentes antes de limpieza: {existing_sheets}")
 
-    keep = ["Cirugías por Hospital", "Cirugías agrupadas por Código"]
-    ws = None
-    ws_group = None
-
-    # Crear las hojas oficiales si no existen
-    try:
-        ws = sh.worksheet("Cirugías por Hospital")
-    except gspread.WorksheetNotFound:
-        ws = sh.add_worksheet(title="Cirugías por Hospital", rows="100", cols="20")
-
-    try:
-        ws_group = sh.worksheet("Cirugías agrupadas por Código")
-    except gspread.WorksheetNotFound:
-        ws_group = sh.add_worksheet(title="Cirugías agrupadas por Código", rows="100", cols="20")
-
-    # Eliminar hojas no deseadas (dejando las dos principales)
-    for ws_existente in sh.worksheets():
-        if ws_existente.title not in keep:
-            if len(sh.worksheets()) > 2:
+    if all(nombre in existing_sheets for nombre in keep):
+        for ws_existente in sh.worksheets():
+            if ws_existente.title not in keep:
                 sh.del_worksheet(ws_existente)
                 logging.info(f"Hoja eliminada: {ws_existente.title}")
-
-    logging.info("Estructura de hojas asegurada correctamente.")
-
-    # === HOJA 1: DETALLE ===
-    ws.clear()
-    ws.update(values=[[f"Última actualización: {fecha_actual}"]], range_name="A1")
-    ws.update(values=data_to_upload, range_name="A2")
-    logging.info("Hoja 'Cirugías por Hospital' actualizada correctamente.")
-
-    # === HOJA 2: AGRUPADA ===
-    ws_group.clear()
-    ws_group.update(values=[[f"Última actualización: {fecha_actual}"]], range_name="A1")
-    ws_group.update(values=data_group, range_name="A2")
-    logging.info("Hoja 'Cirugías agrupadas por Código' actualizada correctamente.")
-
-    # === AJUSTAR ANCHO DE COLUMNAS (MEJORADO) ===
-    time.sleep(2)  # Espera para que Sheets procese la carga
-
-    try:
-        sh.batch_update({
-            "requests": [
-                # Autoajuste hoja 1
-                {
-                    "autoResizeDimensions": {
-                        "dimensions": {
-                            "sheetId": ws.id,
-                            "dimension": "COLUMNS",
-                            "startIndex": 0,
-                            "endIndex": len(df.columns) + 1
-                        }
-                    }
-                },
-                # Autoajuste hoja 2
-                {
-                    "autoResizeDimensions": {
-                        "dimensions": {
-                            "sheetId": ws_group.id,
-                            "dimension": "COLUMNS",
-                            "startIndex": 0,
-                            "endIndex": len(df_grouped.columns) + 1
-                        }
-                    }
-                },
-                # Ancho mínimo hoja 1 (backup)
-                {
-                    "updateDimensionProperties": {
-                        "range": {
-                            "sheetId": ws.id,
-                            "dimension": "COLUMNS",
-                            "startIndex": 0,
-                            "endIndex": len(df.columns) + 1
-                        },
-                        "properties": {"pixelSize": 180},
-                        "fields": "pixelSize"
-                    }
-                },
-                # Ancho mínimo hoja 2 (backup)
-                {
-                    "updateDimensionProperties": {
-                        "range": {
-                            "sheetId": ws_group.id,
-                            "dimension": "COLUMNS",
-                            "startIndex": 0,
-                            "endIndex": len(df_grouped.columns) + 1
-                        },
-                        "properties": {"pixelSize": 180},
-                        "fields": "pixelSize"
-                    }
-                }
-            ]
-        })
-        logging.info("Ancho de columnas ajustado correctamente en ambas hojas.")
-    except Exception as e:
-        logging.warning(f"No se pudo ajustar el ancho de columnas: {e}")
+        logging.info("Estructura de hojas asegurada correctamente.")
+    else:
+        # Nunca se deja el spreadsheet sin las hojas oficiales
+        logging.warning(f"Faltan hojas oficiales {keep}; se omite la limpieza")
 
 except gspread.SpreadsheetNotFound:
     logging.error(f"No se encontró la hoja '{sheet_name}'. "
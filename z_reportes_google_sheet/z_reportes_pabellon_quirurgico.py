@@ -8,7 +8,9 @@ from dotenv import load_dotenv
 import os
 import logging
 from datetime import datetime
-import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from z_comun.google_sheets import PublicadorSheets
 
 # ======================================================
 # CONFIGURACIÓN UTF-8
@@ -45,6 +47,9 @@ sheet_name = os.getenv(
     "Pabellón Quirúrgico - Hospital del Salvador"
 )
 
+# Hash por fila de lo último publicado (solo se reenvían las filas que cambian)
+SNAPSHOTS_SHEETS = 'z_reportes_google_sheet/.sheets_snapshots'
+
 # Fecha dinámica (por defecto hoy)
 fecha_reporte = os.getenv(
     "FECHA_REPORTE",
@@ -195,52 +200,19 @@ try:
 
     fecha_actual = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    try:
-        ws = sh.worksheet("Detalle Pabellón")
-    except gspread.WorksheetNotFound:
-        ws = sh.add_worksheet(
-            title="Detalle Pabellón",
-            rows="1000",
-            cols="40"
-        )
-
-    ws.clear()
-    ws.update(values=[[f"Última actualización: {fecha_actual}"]], range_name="A1")
-    ws.update(values=[list(df.columns)] + df.values.tolist(), range_name="A2")
+    # Fila 1: fecha de actualización; fila 2: encabezados; luego los datos.
+    # Solo se envían las filas que cambiaron desde la última publicación
+    publicador = PublicadorSheets(sh, snapshots=SNAPSHOTS_SHEETS)
+    publicador.agregar(
+        "Detalle Pabellón",
+        [[f"Última actualización: {fecha_actual}"], list(df.columns)] + df.values.tolist(),
+        fila_encabezado=1,
+        ancho_columnas=180
+    )
+    publicador.publicar()
 
     logging.info("Hoja 'Detalle Pabellón' actualizada correctamente.")
 
-    time.sleep(2)
-
-    sh.batch_update({
-        "requests": [
-            {
-                "autoResizeDimensions": {
-                    "dimensions": {
-                        "sheetId": ws.id,
-                        "dimension": "COLUMNS",
-                        "startIndex": 0,
-                        "endIndex": len(df.columns) + 1
-                    }
-                }
-            },
-            {
-                "updateDimensionProperties": {
-                    "range": {
-                        "sheetId": ws.id,
-                        "dimension": "COLUMNS",
-                        "startIndex": 0,
-                        "endIndex": len(df.columns) + 1
-                    },
-                    "properties": {"pixelSize": 180},
-                    "fields": "pixelSize"
-                }
-            }
-        ]
-    })
-
-    logging.info("Ancho de columnas ajustado correctamente.")
-
 except gspread.SpreadsheetNotFound:
     logging.error(
         f"No se encontró la hoja '{sheet_name}'. "
@@ -5,11 +5,17 @@ import os
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import logging
 from dotenv import load_dotenv
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from z_comun.iris_worker import worker_iris
+
 load_dotenv()
 
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
 EMAIL_USER = os.getenv("SMTP_USER")
 EMAIL_PASS = os.getenv("SMTP_PASSWORD")
 EMAIL_TO = os.getenv("RECIPIENT_EMAILS_TEAMCODER")
@@ -111,11 +117,13 @@ print("======================================")
 with open(LOG_FILE, "a", encoding="utf-8") as log:
     log.write(f"\n\n=== EJECUCIÓN {FECHA_EJECUCION} ===\n")
 
-for script in scripts:
-    exito = ejecutar_script(script)
-    if not exito:
-        print(f"Pipeline detenido por fallo en {script}")
-        break
-    time.sleep(2) 
+# Una sola JVM + pool IRIS para todos los pasos (ver z_comun/iris_worker.py)
+with worker_iris():
+    for script in scripts:
+        exito = ejecutar_script(script)
+        if not exito:
+            print(f"Pipeline detenido por fallo en {script}")
+            break
+        time.sleep(2) 
 
 print("\n Pipeline finalizado.")
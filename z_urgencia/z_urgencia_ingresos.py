@@ -1,12 +1,15 @@
-import jaydebeapi
-import jpype
 import mysql.connector
 from dotenv import load_dotenv
 import os
+import sys
 import logging
-from datetime import datetime
+from datetime import datetime, date
 from cryptography.fernet import Fernet
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from z_comun.iris import consultar_por_ventanas, cerrar_iris
+from z_comun.incremental import inicio_extraccion, carga_incremental, guardar_watermark
+
 load_dotenv(override=True)
 
 # =========================
@@ -24,12 +27,6 @@ logging.basicConfig(
 # =========================
 # VARIABLES ENTORNO
 # =========================
-jdbc_driver_name = os.getenv('JDBC_DRIVER_NAME')
-jdbc_driver_loc = os.getenv('JDBC_DRIVER_PATH')
-iris_connection_string = os.getenv('CONEXION_STRING')
-iris_user = os.getenv('DB_USER')
-iris_password = os.getenv('DB_PASSWORD')
-
 mysql_host = os.getenv('DB_MYSQL_HOST')
 mysql_port = int(os.getenv('DB_MYSQL_PORT', 3306))
 mysql_user = os.getenv('DB_MYSQL_USER')
@@ -59,12 +56,15 @@ def codificar_episodio(episodio, semilla=7919, offset=123):
     return base36encode(combinado * semilla + offset)
 
 # -----------------------------
-# MYSQL: RECREAR TABLA
+# MYSQL: CREAR TABLA
 # -----------------------------
-def recreate_table_mysql(cursor_mysql):
-    cursor_mysql.execute("DROP TABLE IF EXISTS z_urgencia_ingresos_resumen")
+TABLA = "z_urgencia_ingresos_resumen"
+FECHA_HISTORICA = '2025-01-01'
+
+
+def crear_tabla_mysql(cursor_mysql):
     cursor_mysql.execute("""
-        CREATE TABLE z_urgencia_ingresos_resumen (
+        CREATE TABLE IF NOT EXISTS z_urgencia_ingresos_resumen (
             nroEpisodio                     VARCHAR(11),
             fechaEpisodio                   VARCHAR(10),
             horaEpisodio                    VARCHAR(8),
@@ -101,45 +101,39 @@ def recreate_table_mysql(cursor_mysql):
 # CONEXIONES
 # -----------------------------
 conn_mysql = None
-conn_iris = None
-cursor_iris = None
 cursor_mysql = None
 
 try:
     # =========================
     # VALIDACIONES
     # =========================
-    if not jdbc_driver_name or not jdbc_driver_loc:
-        raise ValueError("JDBC no configurado")
-    if not iris_connection_string or not iris_user or not iris_password:
-        raise ValueError("Credenciales IRIS incompletas")
     if not mysql_host or not mysql_user or not mysql_password or not mysql_database:
         raise ValueError("Credenciales MySQL incompletas")
 
     # =========================
-    # JVM
-    # =========================
-    if not jpype.isJVMStarted():
-        jpype.startJVM(
-            jpype.getDefaultJVMPath(),
-            "-Djava.class.path=" + jdbc_driver_loc
-        )
-
-    # =========================
-    # CONEXIÓN IRIS
+    # MYSQL
     # =========================
-    conn_iris = jaydebeapi.connect(
-        jdbc_driver_name,
-        iris_connection_string,
-        {'user': iris_user, 'password': iris_password},
-        jdbc_driver_loc
+    conn_mysql = mysql.connector.connect(
+        host=mysql_host,
+        port=mysql_port,
+        user=mysql_user,
+        password=mysql_password,
+        database=mysql_database,
+        allow_local_infile=True
     )
-    cursor_iris = conn_iris.cursor()
+    cursor_mysql = conn_mysql.cursor()
+
+    crear_tabla_mysql(cursor_mysql)
+    conn_mysql.commit()
+
+    # Incremental: solo desde el watermark menos la ventana de datos mutables
+    hoy = date.today()
+    desde, completa = inicio_extraccion(cursor_mysql, TABLA, FECHA_HISTORICA)
 
     # =========================
-    # QUERY IRIS (SIN CAMBIOS)
+    # QUERY IRIS (RANGO DE FECHAS POR VENTANA)
     # =========================
-    cursor_iris.execute(""" 
+    query = """
         SELECT
             PAADM_ADMNO,
             CONVERT(VARCHAR, PAADM_ADMDATE, 105),
@@ -176,52 +170,29 @@ try:
                 ELSE ''
             END
         FROM PA_ADM
-        WHERE PAADM_ADMDATE >= '2025-01-01'
+        WHERE PAADM_ADMDATE >= '{desde}' AND PAADM_ADMDATE < '{hasta}'
           AND PAADM_TYPE = 'E'
           AND PAADM_DepCode_DR->CTLOC_Hospital_DR = 10448
-    """)
-
-    rows = cursor_iris.fetchall()
-    logging.info(f"Filas IRIS obtenidas: {len(rows)}")
-
-    # =========================
-    # FORMATEO
-    # =========================
-    formatted_rows = []
-    for r in rows:
-        valores = [str(c) if c is not None else '' for c in r]
-        episodio_cifrado = codificar_episodio(valores[0])
-        formatted_rows.append(tuple(
-            valores + [''] + [episodio_cifrado, datetime.now()]
-        ))
+    """
 
     # =========================
-    # MYSQL
+    # IRIS (VENTANAS MENSUALES EN PARALELO) -> FORMATEO -> MYSQL
     # =========================
-    conn_mysql = mysql.connector.connect(
-        host=mysql_host,
-        port=mysql_port,
-        user=mysql_user,
-        password=mysql_password,
-        database=mysql_database
-    )
-    cursor_mysql = conn_mysql.cursor()
-
-    recreate_table_mysql(cursor_mysql)
+    expresion_fecha = "STR_TO_DATE(fechaEpisodio, '%d-%m-%Y')"
+    with carga_incremental(conn_mysql, TABLA, expresion_fecha, desde, completa) as carga:
+        for _, lote in consultar_por_ventanas(query, desde):
+            formatted_rows = []
+            for valores in lote:
+                episodio_cifrado = codificar_episodio(valores[0])
+                formatted_rows.append(
+                    valores + [''] + [episodio_cifrado, datetime.now()]
+                )
+            carga.agregar(formatted_rows)
+
+    guardar_watermark(cursor_mysql, TABLA, hoy)
     conn_mysql.commit()
 
-    insert_sql = """
-        INSERT INTO z_urgencia_ingresos_resumen VALUES (
-            %s,%s,%s,%s,%s,%s,%s,%s,%s,%s,
-            %s,%s,%s,%s,%s,%s,%s,%s,%s,%s,
-            %s,%s,%s,%s,%s,%s,%s,%s,%s
-        )
-    """
-
-    chunk_size = 1000
-    for i in range(0, len(formatted_rows), chunk_size):
-        cursor_mysql.executemany(insert_sql, formatted_rows[i:i+chunk_size])
-        conn_mysql.commit()
+    logging.info(f"Filas IRIS cargadas: {carga.total}")
 
     logging.info("Carga z_urgencia_ingresos_resumen finalizada correctamente")
 
@@ -229,13 +200,8 @@ except Exception as e:
     logging.error(f"Error general: {e}", exc_info=True)
 
 finally:
-    if cursor_iris:
-        cursor_iris.close()
-    if conn_iris:
-        conn_iris.close()
     if cursor_mysql:
         cursor_mysql.close()
     if conn_mysql:
         conn_mysql.close()
-    if jpype.isJVMStarted():
-        jpype.shutdownJVM()
+    cerrar_iris()
@@ -1,15 +1,23 @@
 import subprocess
 import sys
-import time
 import os
+import threading
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import logging
 from dotenv import load_dotenv
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from z_comun.iris_worker import worker_iris
+from z_comun.pipeline import Paso, ejecutar_dag, reporte_ruta_critica
+from z_comun.intermedios import ruta_intermedio
+
 load_dotenv()
 
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
 EMAIL_USER = os.getenv("SMTP_USER")
 EMAIL_PASS = os.getenv("SMTP_PASSWORD")
 EMAIL_TO = os.getenv("RECIPIENT_EMAILS_5SALIDAENVIVO")
@@ -19,25 +27,87 @@ EMAIL_PORT = int(os.getenv("SMTP_PORT"))
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__)) 
 
-scripts = [
-    os.path.join(BASE_DIR, "1_profesionales.py"),
-    os.path.join(BASE_DIR, "2_ingreso_medico.py"),
-    os.path.join(BASE_DIR, "3_diagnosticos.py"),
-    os.path.join(BASE_DIR, "4_altas_medicas.py"),
-    os.path.join(BASE_DIR, "5_epicrisis.py"),
-    os.path.join(BASE_DIR, "6_evoluciones.py"),
-    os.path.join(BASE_DIR, "7_pacientes_hospitalizados.py"),
-    os.path.join(BASE_DIR, "8_cuestionario_QTCERIESGO.py"),
-    os.path.join(BASE_DIR, "9_main.py"),
-    os.path.join(BASE_DIR, "98_limpiar_antes_de_subir.py"),
-    os.path.join(BASE_DIR, "90_crear_resumen.py"),
-    os.path.join(BASE_DIR, "10_indicadores_cumplimiento_paso1.py"),
-    os.path.join(BASE_DIR, "10_indicadores_cumplimiento_paso2.py"),
-    os.path.join(BASE_DIR, "99_subir_a_google_sheets.py"),
-    os.path.join(BASE_DIR, "100_subir_a_sql.py",
+ENTRADA = "z_usabilidad_5_salida_en_vivo/1_entrada"
+PROCESO = "z_usabilidad_5_salida_en_vivo/2_proceso"
+RESULTADOS = "z_usabilidad_5_salida_en_vivo/3_resultados"
+
+EXTRACCIONES = [
+    "1_profesionales",
+    "2_ingreso_medico",
+    "3_diagnosticos",
+    "4_altas_medicas",
+    "5_epicrisis",
+    "6_evoluciones",
+    "7_pacientes_hospitalizados",
+    "8_cuestionario_QTCERIESGO",
+]
+
+
+def paso(script, entradas=(), salidas=(), iris=False):
+    return Paso(
+        os.path.join(BASE_DIR, script),
+        [ruta_intermedio(e) for e in entradas],
+        [ruta_intermedio(s) for s in salidas],
+        iris
+    )
+
+
+# ============================================================
+# PASOS (DAG): cada paso corre cuando existen sus entradas
+# (intermedios Parquet, ver z_comun/intermedios.py)
+# ============================================================
+# Las extracciones IRIS 1-8 y 9_main son independientes entre sí y corren
+# en paralelo (máximo PIPELINE_IRIS_PARALELO a la vez sobre IRIS). 9_main va
+# primero: encabeza la cadena más larga (hospitalizados -> indicadores -> Sheets).
+pasos = [
+    paso(
+        "9_main.py",
+        salidas=[f"{RESULTADOS}/9_hospitalizados_dias_paso2_reglas_clinicas"],
+        iris=True
+    ),
+    *[
+        paso(f"{nombre}.py", salidas=[f"{ENTRADA}/{nombre}"], iris=True)
+        for nombre in EXTRACCIONES
+    ],
+    paso(
+        "90_crear_resumen.py",
+        entradas=[f"{ENTRADA}/{nombre}" for nombre in EXTRACCIONES[:6]],
+        salidas=[f"{PROCESO}/df_clinico_FILTRADO_eventos"]
+    ),
+    paso(
+        "98_limpiar_antes_de_subir.py",
+        entradas=[f"{ENTRADA}/{nombre}" for nombre in EXTRACCIONES]
+                 + [f"{PROCESO}/df_clinico_FILTRADO_eventos"],
+        salidas=[f"{RESULTADOS}/{nombre}_pro" for nombre in EXTRACCIONES]
+                + [f"{RESULTADOS}/9_df_clinico_FILTRADO_eventos_pro"]
+    ),
+    paso(
+        "10_indicadores_cumplimiento_paso1.py",
+        entradas=[f"{RESULTADOS}/9_hospitalizados_dias_paso2_reglas_clinicas"],
+        salidas=[f"{RESULTADOS}/10_indicadores_cumplimiento_paso1"]
+    ),
+    paso(
+        "10_indicadores_cumplimiento_paso2.py",
+        entradas=[f"{RESULTADOS}/10_indicadores_cumplimiento_paso1",
+                  f"{RESULTADOS}/6_evoluciones_pro"],
+        salidas=[f"{RESULTADOS}/10_indicadores_cumplimiento_paso2"]
+    ),
+    paso(
+        "99_subir_a_google_sheets.py",
+        entradas=[f"{RESULTADOS}/{nombre}_pro" for nombre in EXTRACCIONES]
+                 + [f"{RESULTADOS}/10_indicadores_cumplimiento_paso2",
+                    f"{RESULTADOS}/9_df_clinico_FILTRADO_eventos_pro"]
+    ),
+    paso(
+        "100_subir_a_sql.py",
+        entradas=[f"{RESULTADOS}/{nombre}_pro" for nombre in EXTRACCIONES]
+                 + [f"{RESULTADOS}/9_df_clinico_FILTRADO_eventos_pro"]
     ),
 ]
 
+# El cron corre cada 20 minutos: la ejecución completa debe caber en ese tiempo
+PRESUPUESTO_SEGUNDOS = int(os.getenv("PIPELINE_5SALIDA_PRESUPUESTO", 20 * 60))
+
 FECHA_EJECUCION = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 LOG_FILE = "z_usabilidad_5_salida_en_vivo/logs/pipeline.log"
 
@@ -78,8 +148,14 @@ def enviar_alerta(script_fallido, error_mensaje):
     except Exception as e:
         print(f"No se pudo enviar correo de alerta: {e}")
 
-def ejecutar_script(nombre_script):
-    print(f"\nEjecutando: {nombre_script}")
+# Los pasos corren en hilos: consola y log se escriben de a uno
+salida_lock = threading.Lock()
+
+
+def ejecutar_script(paso):
+    nombre_script = paso.script
+    with salida_lock:
+        print(f"\nEjecutando: {nombre_script}")
     inicio = datetime.now()
 
     try:
@@ -90,30 +166,31 @@ def ejecutar_script(nombre_script):
             capture_output=True
         )
         duracion = (datetime.now() - inicio).total_seconds()
-        print(f" {nombre_script} finalizado en {duracion:.2f} segundos.")
-        print(f" Salida:\n{resultado.stdout}")
+        with salida_lock:
+            print(f" {nombre_script} finalizado en {duracion:.2f} segundos.")
+            print(f" Salida:\n{resultado.stdout}")
 
-        # Escribir log
-        with open(LOG_FILE, "a", encoding="utf-8") as log:
-            log.write(f"\n[{FECHA_EJECUCION}] {nombre_script} OK ({duracion:.2f}s)\n")
+            # Escribir log
+            with open(LOG_FILE, "a", encoding="utf-8") as log:
+                log.write(f"\n[{FECHA_EJECUCION}] {nombre_script} OK ({duracion:.2f}s)\n")
         return True
 
     except subprocess.CalledProcessError as e:
         error_msg = f"Error en {nombre_script}:\n{e.stderr}"
-        print(f" {error_msg} ")
+        with salida_lock:
+            print(f" {error_msg} ")
+            with open(LOG_FILE, "a", encoding="utf-8") as log:
+                log.write(f"\n[{FECHA_EJECUCION}] ERROR en {nombre_script}\n{e.stderr}\n")
         enviar_alerta(nombre_script, error_msg)
-
-        with open(LOG_FILE, "a", encoding="utf-8") as log:
-            log.write(f"\n[{FECHA_EJECUCION}] ERROR en {nombre_script}\n{e.stderr}\n")
         return False
 
     except Exception as ex:
         error_msg = f"Error inesperado en {nombre_script}: {ex}"
-        print(f" {error_msg}")
+        with salida_lock:
+            print(f" {error_msg}")
+            with open(LOG_FILE, "a", encoding="utf-8") as log:
+                log.write(f"\n[{FECHA_EJECUCION}] ERROR inesperado en {nombre_script}\n{ex}\n")
         enviar_alerta(nombre_script, error_msg)
-
-        with open(LOG_FILE, "a", encoding="utf-8") as log:
-            log.write(f"\n[{FECHA_EJECUCION}] ERROR inesperado en {nombre_script}\n{ex}\n")
         return False
 
 
@@ -124,11 +201,22 @@ print("======================================")
 with open(LOG_FILE, "a", encoding="utf-8") as log:
     log.write(f"\n\n=== EJECUCIÓN {FECHA_EJECUCION} ===\n")
 
-for script in scripts:
-    exito = ejecutar_script(script)
-    if not exito:
-        print(f"Pipeline detenido por fallo en {script}")
-        break
-    time.sleep(2) 
+inicio_pipeline = datetime.now()
+
+# Una sola JVM + pool IRIS para todos los pasos (ver z_comun/iris_worker.py)
+with worker_iris():
+    tiempos, fallidos, omitidos = ejecutar_dag(pasos, ejecutar_script)
+
+if fallidos:
+    print(f"Pipeline detenido por fallo en {', '.join(fallidos)}")
+    if omitidos:
+        print(f"Pasos no ejecutados: {', '.join(omitidos)}")
+
+duracion_total = (datetime.now() - inicio_pipeline).total_seconds()
+reporte = reporte_ruta_critica(pasos, tiempos, duracion_total, PRESUPUESTO_SEGUNDOS)
+with open(LOG_FILE, "a", encoding="utf-8") as log:
+    log.write(f"\n[{FECHA_EJECUCION}] TOTAL pipeline ({duracion_total:.2f}s)\n")
+    log.write("\n".join(reporte) + "\n")
 
-print("\n Pipeline finalizado.")
+print("\n".join(reporte))
+print(f"\n Pipeline finalizado en {duracion_total:.2f} segundos.")
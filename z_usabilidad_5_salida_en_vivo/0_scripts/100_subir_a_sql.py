@@ -1,11 +1,14 @@
-import pandas as pd
 import logging
 import os
+import sys
 from sqlalchemy import create_engine
 from sqlalchemy.engine import URL
 from datetime import datetime
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from z_comun.intermedios import existe_tabla, leer_tabla
+
 
 load_dotenv(override=True)
 
@@ -113,12 +116,12 @@ def cargar_excel_mysql(alias, archivo, tabla, modo='replace'):
 
     ruta = os.path.join(BASE_RESULTADOS, archivo)
 
-    if not os.path.exists(ruta):
+    if not existe_tabla(ruta):
         logging.warning(f"[{alias}] Archivo no encontrado: {ruta}")
         return
 
     logging.info(f"[{alias}] Leyendo archivo {archivo}")
-    df = pd.read_excel(ruta)
+    df = leer_tabla(ruta)
 
     if df.empty:
         logging.warning(f"[{alias}] DataFrame vacío, se omite carga")
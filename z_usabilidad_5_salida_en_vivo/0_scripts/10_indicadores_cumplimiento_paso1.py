@@ -1,7 +1,10 @@
-import pandas as pd
-import numpy as np
+import os
+import sys
 from pathlib import Path
-from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from z_comun.intermedios import leer_tabla, guardar_tabla
+from estadia import ahora, fecha_hora, minutos, dias_admin
 
 # ======================================================
 # 1. RUTAS
@@ -9,19 +12,19 @@ from datetime import datetime
 BASE_DIR = Path(__file__).resolve().parent.parent
 RESULTADOS_DIR = BASE_DIR / "3_resultados"
 
-RUTA_ENTRADA = RESULTADOS_DIR / "9_hospitalizados_dias_paso2_reglas_clinicas.xlsx"
-RUTA_SALIDA  = RESULTADOS_DIR / "10_indicadores_cumplimiento_paso1.xlsx"
+RUTA_ENTRADA = RESULTADOS_DIR / "9_hospitalizados_dias_paso2_reglas_clinicas"
+RUTA_SALIDA  = RESULTADOS_DIR / "10_indicadores_cumplimiento_paso1"
 
 # ======================================================
 # 2. CARGA
 # ======================================================
-df = pd.read_excel(RUTA_ENTRADA)
+df = leer_tabla(RUTA_ENTRADA)
 df.columns = df.columns.str.lower()
 
 # ======================================================
 # 3. FECHA Y HORA REAL DE EJECUCIÓN
 # ======================================================
-now = datetime.now()
+now = ahora()
 fecha_ejecucion = now.date()
 hora_ejecucion  = now.strftime("%H:%M:%S")
 
@@ -34,17 +37,8 @@ df["hora_termino_servicio"]  = df["hora_termino_servicio"].fillna(hora_ejecucion
 # ======================================================
 # 5. CREAR DATETIME INICIO / TÉRMINO
 # ======================================================
-df["inicio_servicio"] = pd.to_datetime(
-    df["fecha_inicio_servicio"].astype(str) + " " +
-    df["hora_inicio_servicio"].astype(str),
-    errors="coerce"
-)
-
-df["termino_servicio"] = pd.to_datetime(
-    df["fecha_termino_servicio"].astype(str) + " " +
-    df["hora_termino_servicio"].astype(str),
-    errors="coerce"
-)
+df["inicio_servicio"] = fecha_hora(df["fecha_inicio_servicio"], df["hora_inicio_servicio"])
+df["termino_servicio"] = fecha_hora(df["fecha_termino_servicio"], df["hora_termino_servicio"])
 
 # ======================================================
 # 6. ELIMINAR REGISTROS SIN FECHAS/HORAS VÁLIDAS
@@ -60,30 +54,24 @@ df = df[
 df = df[df["inicio_servicio"] != df["termino_servicio"]].copy()
 
 # ======================================================
-# 8. RECÁLCULO ESTADÍA POR SERVICIO
+# 8. RECÁLCULO ESTADÍA POR SERVICIO (mismas reglas que hospitalizados_dias)
 # ======================================================
-df["minutos_estadia_servicio"] = (
-    df["termino_servicio"] - df["inicio_servicio"]
-).dt.total_seconds() / 60
+df["minutos_estadia_servicio"] = minutos(df["inicio_servicio"], df["termino_servicio"])
 
 # Eliminar minutos negativos o cero (errores de registro)
 df = df[df["minutos_estadia_servicio"] > 0].copy()
 
-df["dias_estadia_servicio"] = np.ceil(
-    df["minutos_estadia_servicio"] / 1440
-).astype("Int64")
+df["dias_estadia_servicio"] = dias_admin(df["minutos_estadia_servicio"])
 
 # ======================================================
 # 9. RECÁLCULO ESTADÍA POR EPISODIO
 # ======================================================
 df["minutos_estadia_episodio"] = (
-    df.groupby("episodio")["minutos_estadia_servicio"]
+    df.groupby("episodio", dropna=False)["minutos_estadia_servicio"]
       .transform("sum")
 )
 
-df["dias_estadia_episodio"] = np.ceil(
-    df["minutos_estadia_episodio"] / 1440
-).astype("Int64")
+df["dias_estadia_episodio"] = dias_admin(df["minutos_estadia_episodio"])
 
 # ======================================================
 # 10. LIMPIEZA COLUMNAS AUXILIARES
@@ -93,7 +81,7 @@ df.drop(columns=["inicio_servicio", "termino_servicio"], inplace=True)
 # ======================================================
 # 11. EXPORTAR RESULTADO FINAL
 # ======================================================
-df.to_excel(RUTA_SALIDA, index=False)
+guardar_tabla(df, RUTA_SALIDA)
 
 print("Archivo generado correctamente")
 print(f"Ruta: {RUTA_SALIDA}")
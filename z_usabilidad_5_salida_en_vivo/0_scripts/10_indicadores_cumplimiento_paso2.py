@@ -1,8 +1,14 @@
+import os
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from z_comun.intermedios import leer_tabla, guardar_tabla
+from estadia import eventos_en_intervalos
+
 fecha_actualizacion = datetime.now()
 
 
@@ -12,15 +18,15 @@ fecha_actualizacion = datetime.now()
 BASE_DIR = Path(__file__).resolve().parent.parent
 RESULTADOS_DIR = BASE_DIR / "3_resultados"
 
-RUTA_BASE   = RESULTADOS_DIR / "10_indicadores_cumplimiento_paso1.xlsx"
-RUTA_EVO    = RESULTADOS_DIR / "6_evoluciones_pro.xlsx"
-RUTA_SALIDA = RESULTADOS_DIR / "10_indicadores_cumplimiento_paso2.xlsx"
+RUTA_BASE   = RESULTADOS_DIR / "10_indicadores_cumplimiento_paso1"
+RUTA_EVO    = RESULTADOS_DIR / "6_evoluciones_pro"
+RUTA_SALIDA = RESULTADOS_DIR / "10_indicadores_cumplimiento_paso2"
 
 # ======================================================
 # 2. CARGA
 # ======================================================
-base = pd.read_excel(RUTA_BASE)
-evo  = pd.read_excel(RUTA_EVO)
+base = leer_tabla(RUTA_BASE)
+evo  = leer_tabla(RUTA_EVO)
 
 base.columns = base.columns.str.lower()
 evo.columns  = evo.columns.str.lower()
@@ -58,48 +64,46 @@ base["ward_locationdr"] = base["ward_locationdr"].astype(str)
 evo["ward_locationdr"]  = evo["ward_locationdr"].astype(str)
 
 # ======================================================
-# 6. LEFT JOIN BASE ↔ EVOLUCIONES
+# 6. EVOLUCIONES DENTRO DE CADA ESTADÍA (MISMO EPISODIO Y WARD)
 # ======================================================
-cruce = base.merge(
-    evo,
-    on=["episodio", "ward_locationdr"],
-    how="left",
-    suffixes=("", "_evo")
+# inicio_servicio_dt <= fecha_creacion_dt <= termino_servicio_dt, sin
+# cruzar cada estadía con todas las evoluciones del episodio
+pos_base, pos_evo = eventos_en_intervalos(
+    base[["episodio", "ward_locationdr"]],
+    base["inicio_servicio_dt"],
+    base["termino_servicio_dt"],
+    evo[["episodio", "ward_locationdr"]],
+    evo["fecha_creacion_dt"]
 )
 
-# ======================================================
-# 7. FILTRAR EVOLUCIONES EN RANGO
-# ======================================================
-cruce = cruce[
-    (cruce["fecha_creacion_dt"] >= cruce["inicio_servicio_dt"]) &
-    (cruce["fecha_creacion_dt"] <= cruce["termino_servicio_dt"])
-].copy()
+claves_estadia = [
+    "episodio",
+    "servicio",
+    "fecha_inicio_servicio",
+    "hora_inicio_servicio",
+    "fecha_termino_servicio",
+    "hora_termino_servicio",
+]
+
+cruce = base[claves_estadia].iloc[pos_base].reset_index(drop=True)
+cruce["tipo_profesional"] = evo["tipo_profesional"].to_numpy()[pos_evo]
+cruce["dia_evo"] = evo["fecha_creacion_dt"].dt.normalize().to_numpy()[pos_evo]
 
 # ======================================================
-# 8. AGREGAR EVOLUCIONES
+# 7. AGREGAR EVOLUCIONES
 # ======================================================
 resultado = (
     cruce
-    .groupby(
-        [
-            "episodio",
-            "servicio",
-            "fecha_inicio_servicio",
-            "hora_inicio_servicio",
-            "fecha_termino_servicio",
-            "hora_termino_servicio",
-            "tipo_profesional",
-        ]
-    )
+    .groupby(claves_estadia + ["tipo_profesional"])
     .agg(
-        cantidad_evoluciones=("fecha_creacion_dt", "count"),
-        dias_con_evo=("fecha_creacion_dt", lambda x: x.dt.date.nunique())
+        cantidad_evoluciones=("dia_evo", "size"),
+        dias_con_evo=("dia_evo", "nunique")
     )
     .reset_index()
 )
 
 # ======================================================
-# 8.1 RENOMBRAR COLUMNA
+# 8. RENOMBRAR COLUMNA
 # ======================================================
 resultado = resultado.rename(columns={
     "tipo_profesional": "estamento"
@@ -169,7 +173,7 @@ resultado = resultado[
 # 12. EXPORTAR
 # ======================================================
 
-resultado.to_excel(RUTA_SALIDA, index=False)
+guardar_tabla(resultado, RUTA_SALIDA)
 
 print("PASO 2 + métricas finales generado correctamente")
 print(f"Archivo: {RUTA_SALIDA}")
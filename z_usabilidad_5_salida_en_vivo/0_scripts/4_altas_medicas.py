@@ -1,13 +1,13 @@
-import jaydebeapi
-import jpype
-import openpyxl
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment
+import sys
 from dotenv import load_dotenv
 import os
 import logging
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from z_comun.iris import consultar, cerrar_iris
+from z_comun.intermedios import ruta_intermedio, guardar_filas
+
 # Configuración de logs
 logging.basicConfig(level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -18,49 +18,19 @@ logging.basicConfig(level=logging.INFO,
 
 load_dotenv()
 
-jdbc_driver_name = os.getenv('JDBC_DRIVER_NAME')
-jdbc_driver_loc = os.getenv('JDBC_DRIVER_PATH')
-iris_connection_string = os.getenv('CONEXION_STRING')
-iris_user = os.getenv('DB_USER')
-iris_password = os.getenv('DB_PASSWORD')
-
 fecha_hoy = datetime.now().strftime('%Y-%m-%d')
-archivo_excel = f"z_usabilidad_5_salida_en_vivo/1_entrada/4_altas_medicas.xlsx"
-
-if os.path.exists(archivo_excel):
-    try:
-        os.remove(archivo_excel)
-        print(f"Archivo anterior eliminado: {archivo_excel}")
-        logging.info(f"Archivo anterior eliminado: {archivo_excel}")
-    except Exception as e:
-        print(f"No se pudo eliminar el archivo {archivo_excel}: {e}")
-        logging.warning(f"No se pudo eliminar el archivo {archivo_excel}: {e}")
+archivo_salida = ruta_intermedio("z_usabilidad_5_salida_en_vivo/1_entrada/4_altas_medicas")
 
-def convertir_valor(cell):
+if os.path.exists(archivo_salida):
     try:
-        if cell is None:
-            return ""
-        if hasattr(cell, "toString"): 
-            return str(cell.toString())
-        if isinstance(cell, bytes):
-            return cell.decode("utf-8", errors="replace")
-        return str(cell)
+        os.remove(archivo_salida)
+        print(f"Archivo anterior eliminado: {archivo_salida}")
+        logging.info(f"Archivo anterior eliminado: {archivo_salida}")
     except Exception as e:
-        logging.warning(f"No se pudo convertir valor '{cell}' ({type(cell)}): {e}")
-        return "[ERROR]"
+        print(f"No se pudo eliminar el archivo {archivo_salida}: {e}")
+        logging.warning(f"No se pudo eliminar el archivo {archivo_salida}: {e}")
 
 try:
-    if not jpype.isJVMStarted():
-        jpype.startJVM(jpype.getDefaultJVMPath(), "-Djava.class.path=" + jdbc_driver_loc)
-
-    conn_iris = jaydebeapi.connect(
-        jdbc_driver_name,
-        iris_connection_string,
-        {'user': iris_user, 'password': iris_password},
-        jdbc_driver_loc
-    )
-    cursor = conn_iris.cursor()
-
     query = """
         SELECT DISTINCT
         PAADM_DepCode_DR->CTLOC_Desc                                          AS "Local de atención",
@@ -108,37 +78,12 @@ try:
         );
     """
 
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    columns = [desc[0] for desc in cursor.description]
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "4_altas_medicas"
-
-    ws.append([str(col) for col in columns])
-    for cell in ws[1]:
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal="center")
-
-    for row in rows:
-        safe_row = [convertir_valor(cell) for cell in row]
-        ws.append(safe_row)
-
-    for col in ws.columns:
-        max_len = max(len(str(cell.value)) if cell.value else 0 for cell in col)
-        col_letter = col[0].column_letter
-        ws.column_dimensions[col_letter].width = max_len + 2
+    columns, rows = consultar(query)
 
-    wb.save(archivo_excel)
-    logging.info(f"Archivo Excel generado correctamente: {archivo_excel}")
+    guardar_filas(columns, rows, archivo_salida)
+    logging.info(f"Archivo generado correctamente: {archivo_salida}")
 
 except Exception as e:
     logging.error(f"Error general: {e}")
 finally:
-    if 'cursor' in locals():
-        cursor.close()
-    if 'conn_iris' in locals():
-        conn_iris.close()
-    if jpype.isJVMStarted():
-        jpype.shutdownJVM()
\ No newline at end of file
+    cerrar_iris()
@@ -1,5 +1,4 @@
-import jaydebeapi
-import jpype
+import sys
 import openpyxl
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment
@@ -8,6 +7,9 @@ import os
 import logging
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from z_comun.iris import consultar, cerrar_iris
+
 # Configuración de logs
 logging.basicConfig(level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -18,12 +20,6 @@ logging.basicConfig(level=logging.INFO,
 
 load_dotenv()
 
-jdbc_driver_name = os.getenv('JDBC_DRIVER_NAME')
-jdbc_driver_loc = os.getenv('JDBC_DRIVER_PATH')
-iris_connection_string = os.getenv('CONEXION_STRING')
-iris_user = os.getenv('DB_USER')
-iris_password = os.getenv('DB_PASSWORD')
-
 fecha_hoy = datetime.now().strftime('%Y-%m-%d')
 fecha_ejecucion = datetime.now().strftime('%Y-%m-%d_%H%M%S')
 archivo_excel = f"z_usabilidad_5_salida_en_vivo/99_pacientes_hospitalizados/7_pacientes_hospitalizados_{fecha_ejecucion}.xlsx"
@@ -38,31 +34,7 @@ if os.path.exists(archivo_excel):
         print(f"No se pudo eliminar el archivo {archivo_excel}: {e}")
         logging.warning(f"No se pudo eliminar el archivo {archivo_excel}: {e}")
 
-def convertir_valor(cell):
-    try:
-        if cell is None:
-            return ""
-        if hasattr(cell, "toString"): 
-            return str(cell.toString())
-        if isinstance(cell, bytes):
-            return cell.decode("utf-8", errors="replace")
-        return str(cell)
-    except Exception as e:
-        logging.warning(f"No se pudo convertir valor '{cell}' ({type(cell)}): {e}")
-        return "[ERROR]"
-
 try:
-    if not jpype.isJVMStarted():
-        jpype.startJVM(jpype.getDefaultJVMPath(), "-Djava.class.path=" + jdbc_driver_loc)
-
-    conn_iris = jaydebeapi.connect(
-        jdbc_driver_name,
-        iris_connection_string,
-        {'user': iris_user, 'password': iris_password},
-        jdbc_driver_loc
-    )
-    cursor = conn_iris.cursor()
-
     query = """
         SELECT
             PAADM_ADMNO as "Episodio", 
@@ -84,9 +56,7 @@ try:
         AND PAADM_VISITSTATUS='A' ;
     """
 
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    columns = [desc[0] for desc in cursor.description]
+    columns, rows = consultar(query)
 
     wb = Workbook()
     ws = wb.active
@@ -98,8 +68,7 @@ try:
         cell.alignment = Alignment(horizontal="center")
 
     for row in rows:
-        safe_row = [convertir_valor(cell) for cell in row]
-        ws.append(safe_row)
+        ws.append(row)
 
     for col in ws.columns:
         max_len = max(len(str(cell.value)) if cell.value else 0 for cell in col)
@@ -112,9 +81,4 @@ try:
 except Exception as e:
     logging.error(f"Error general: {e}")
 finally:
-    if 'cursor' in locals():
-        cursor.close()
-    if 'conn_iris' in locals():
-        conn_iris.close()
-    if jpype.isJVMStarted():
-        jpype.shutdownJVM()
\ No newline at end of file
+    cerrar_iris()
@@ -1,6 +1,11 @@
+import os
+import sys
 import pandas as pd
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from z_comun.intermedios import leer_tabla, guardar_tabla
+
 # ======================================================
 # FUNCIÓN ESTÁNDAR: NORMALIZAR RUT
 # ======================================================
@@ -15,8 +20,8 @@ def normalizar_rut(serie):
 # ======================================================
 # 1. Cargar PROFESIONALES (Codigo, Nombre, Tipo)
 # ======================================================
-df_prof = pd.read_excel(
-    'z_usabilidad_5_salida_en_vivo/1_entrada/1_profesionales.xlsx'
+df_prof = leer_tabla(
+    'z_usabilidad_5_salida_en_vivo/1_entrada/1_profesionales'
 )
 
 df_prof = df_prof.iloc[:, 0:3].copy()
@@ -38,36 +43,10 @@ fecha_inicio = pd.to_datetime('2026-01-07')
 fecha_hoy = pd.to_datetime(datetime.now().date())
 
 # ======================================================
-# 3. Generar FECHAS POR CADA CODIGO
-# ======================================================
-bloques = []
-
-for _, row in df_prof.iterrows():
-    df_tmp = pd.DataFrame({
-        'Codigo': row['Codigo'],
-        'NOMBRE': row['NOMBRE'],
-        'Tipo': row['Tipo'],
-        'FECHA': pd.date_range(
-            start=fecha_inicio,
-            end=fecha_hoy,
-            freq='D'
-        )
-    })
-    bloques.append(df_tmp)
-
-df_base = pd.concat(bloques, ignore_index=True)
-
-# ======================================================
-# 4. Replicar por SERVICIO
+# 3. SERVICIOS
 # ======================================================
 servicios = [416, 402, 417, 399, 428, 415]
-df_servicios = pd.DataFrame({'SERVICIO': servicios})
-
-df_final = df_base.merge(df_servicios, how='cross')
 
-# ======================================================
-# 5. Descripción del SERVICIO
-# ======================================================
 mapa_servicios = {
     416: 'Sala UPC Borquez Silva HDS',
     402: 'Sala U.C.I HDS',
@@ -77,25 +56,26 @@ mapa_servicios = {
     415: 'Sala UPC UHI HDS'
 }
 
-df_final['SERVICIO_DESC'] = df_final['SERVICIO'].map(mapa_servicios)
+columnas_eventos = [
+    'INGRESO MÉDICO',
+    'DIAGNÓSTICO',
+    'ALTA MÉDICA',
+    'EPICRISIS',
+    'EVOLUCIÓN'
+]
 
-# Normalización base
-df_final['Codigo'] = normalizar_rut(df_final['Codigo'])
-df_final['FECHA'] = pd.to_datetime(df_final['FECHA']).dt.normalize()
-df_final['SERVICIO'] = df_final['SERVICIO'].astype(int)
+llave = ['Codigo', 'FECHA', 'SERVICIO']
 
 # ======================================================
-# 6. FUNCIÓN GENÉRICA PARA FLAGS CLÍNICOS
+# 4. FUNCIÓN GENÉRICA PARA EVENTOS CLÍNICOS
 # ======================================================
-def aplicar_flag(
-    df_base,
-    df_evento,
-    columnas,
-    nombre_flag,
-    dayfirst=False
-):
+def leer_evento(df_evento, columnas, nombre_flag, dayfirst=False):
+    """
+    (Codigo, FECHA, SERVICIO, EVENTO) de una fuente, solo para las fechas
+    y servicios del resumen.
+    """
     df = df_evento[columnas].copy()
-    df.columns = ['Codigo', 'FECHA', 'SERVICIO']
+    df.columns = llave
 
     # 🔐 Normalización de llave
     df['Codigo'] = normalizar_rut(df['Codigo'])
@@ -105,122 +85,97 @@ def aplicar_flag(
     ).dt.normalize()
 
     df['SERVICIO'] = pd.to_numeric(
-    df['SERVICIO'],
-    errors='coerce'
-).astype('Int64')
-
-    df[nombre_flag] = 'SI'
+        df['SERVICIO'],
+        errors='coerce'
+    ).astype('Int64')
 
-    df = (
-        df[['Codigo', 'FECHA', 'SERVICIO', nombre_flag]]
-        .drop_duplicates()
-    )
-
-    df_base = df_base.merge(
-        df,
-        on=['Codigo', 'FECHA', 'SERVICIO'],
-        how='left'
-    )
-
-    df_base[nombre_flag] = df_base[nombre_flag].fillna('NO')
-    return df_base
+    return df[
+        df['FECHA'].between(fecha_inicio, fecha_hoy) &
+        df['SERVICIO'].isin(servicios)
+    ].assign(EVENTO=nombre_flag)
 
 # ======================================================
-# 7. INGRESO MÉDICO
+# 5. EVENTOS (ingreso, diagnóstico, alta, epicrisis, evolución)
 # ======================================================
-df_final = aplicar_flag(
-    df_final,
-    pd.read_excel(
-        'z_usabilidad_5_salida_en_vivo/1_entrada/2_ingreso_medico.xlsx'
+eventos = pd.concat([
+    leer_evento(
+        leer_tabla('z_usabilidad_5_salida_en_vivo/1_entrada/2_ingreso_medico'),
+        ['SSUSR_Initials', 'QUESDate', 'PAADM_CurrentWard_DR'],
+        'INGRESO MÉDICO'
     ),
-    ['SSUSR_Initials', 'QUESDate', 'PAADM_CurrentWard_DR'],
-    'INGRESO MÉDICO'
-)
-
-# ======================================================
-# 8. DIAGNÓSTICO
-# ======================================================
-df_final = aplicar_flag(
-    df_final,
-    pd.read_excel(
-        'z_usabilidad_5_salida_en_vivo/1_entrada/3_diagnosticos.xlsx'
+    leer_evento(
+        leer_tabla('z_usabilidad_5_salida_en_vivo/1_entrada/3_diagnosticos'),
+        ['run_medico_registra_diagnostico', 'fecha_creacion', 'PAADM_CurrentWard_DR'],
+        'DIAGNÓSTICO'
     ),
-    ['run_medico_registra_diagnostico', 'fecha_creacion', 'PAADM_CurrentWard_DR'],
-    'DIAGNÓSTICO'
-)
-
-# ======================================================
-# 9. ALTA MÉDICA
-# ======================================================
-df_final = aplicar_flag(
-    df_final,
-    pd.read_excel(
-        'z_usabilidad_5_salida_en_vivo/1_entrada/4_altas_medicas.xlsx'
+    leer_evento(
+        leer_tabla('z_usabilidad_5_salida_en_vivo/1_entrada/4_altas_medicas'),
+        ['rut Usuario Registro', 'Fecha Alta', 'PAADM_DepCode_DR'],
+        'ALTA MÉDICA'
     ),
-    ['rut Usuario Registro', 'Fecha Alta', 'PAADM_DepCode_DR'],
-    'ALTA MÉDICA'
-)
-
-# ======================================================
-# 10. EPICRISIS
-# ======================================================
-df_final = aplicar_flag(
-    df_final,
-    pd.read_excel(
-        'z_usabilidad_5_salida_en_vivo/1_entrada/5_epicrisis.xlsx'
+    leer_evento(
+        leer_tabla('z_usabilidad_5_salida_en_vivo/1_entrada/5_epicrisis'),
+        ['rutMedicoContacto', 'DIS_Date', 'PAADM_CurrentWard_DR'],
+        'EPICRISIS'
     ),
-    ['rutMedicoContacto', 'DIS_Date', 'PAADM_CurrentWard_DR'],
-    'EPICRISIS'
-)
-
-# ======================================================
-# 11. EVOLUCIONES (dayfirst OBLIGATORIO)
-# ======================================================
-df_final = aplicar_flag(
-    df_final,
-    pd.read_excel(
-        'z_usabilidad_5_salida_en_vivo/1_entrada/6_evoluciones.xlsx'
+    # Evoluciones: dayfirst OBLIGATORIO
+    leer_evento(
+        leer_tabla('z_usabilidad_5_salida_en_vivo/1_entrada/6_evoluciones'),
+        ['CodeProfesionalEvolucion', 'FechaEvolucion', 'WARD_RowID'],
+        'EVOLUCIÓN',
+        dayfirst=True
     ),
-    ['CodeProfesionalEvolucion', 'FechaEvolucion', 'WARD_RowID'],
-    'EVOLUCIÓN',
-    dayfirst=True
-)
+], ignore_index=True)
+
+eventos['SERVICIO'] = eventos['SERVICIO'].astype(int)
 
 # ======================================================
-# 12. FILTRO FINAL (OPTIMIZA DATASET)
+# 6. FLAGS: una fila por (Codigo, FECHA, SERVICIO) con algún evento
 # ======================================================
-columnas_eventos = [
-    'INGRESO MÉDICO',
-    'DIAGNÓSTICO',
-    'ALTA MÉDICA',
-    'EPICRISIS',
-    'EVOLUCIÓN'
-]
+# Solo se materializan las combinaciones con eventos: la grilla completa
+# profesionales x días x servicios era casi toda 'NO' y se filtraba al final
+flags = (
+    eventos
+    .drop_duplicates()
+    .assign(SI=True)
+    .set_index(llave + ['EVENTO'])['SI']
+    .unstack('EVENTO', fill_value=False)
+    .reindex(columns=columnas_eventos, fill_value=False)
+    .reset_index()
+)
+flags.columns.name = None
 
-df_export = df_final[
-    df_final[columnas_eventos].eq('SI').any(axis=1)
-].copy()
+for col in columnas_eventos:
+    flags[col] = flags[col].map({True: 'SI', False: 'NO'})
 
 # ======================================================
-# 13. EXPORTAR ARCHIVOS
+# 7. ATRIBUTOS DEL PROFESIONAL Y ORDEN
 # ======================================================
+# Solo profesionales de CT_CareProv; mismo orden que la grilla anterior:
+# profesional, fecha, servicio
+df_export = df_prof.assign(_orden_prof=range(len(df_prof))).merge(flags, on='Codigo')
+df_export['SERVICIO_DESC'] = df_export['SERVICIO'].map(mapa_servicios)
+df_export['_orden_serv'] = df_export['SERVICIO'].map({s: i for i, s in enumerate(servicios)})
 
-# --- Archivo completo (auditoría) ---
-output_full = (
-    'z_usabilidad_5_salida_en_vivo/2_proceso/'
-    'df_clinico_COMPLETO_auditoria.xlsx'
+df_export = (
+    df_export
+    .sort_values(['_orden_prof', 'FECHA', '_orden_serv'])
+    [['Codigo', 'NOMBRE', 'Tipo', 'FECHA', 'SERVICIO', 'SERVICIO_DESC'] + columnas_eventos]
+    .reset_index(drop=True)
 )
 
-# df_final.to_excel(output_full, index=False)
+# ======================================================
+# 8. EXPORTAR ARCHIVOS
+# ======================================================
 
 # --- Archivo filtrado (uso diario / Looker) ---
 output_filtered = (
     'z_usabilidad_5_salida_en_vivo/2_proceso/'
-    'df_clinico_FILTRADO_eventos.xlsx'
+    'df_clinico_FILTRADO_eventos'
 )
 
-df_export.to_excel(output_filtered, index=False)
+guardar_tabla(df_export, output_filtered)
 
 print("Archivos generados correctamente:")
-print("Completo :", output_full, "| Filas:", len(df_final))
+print("Eventos  :", len(eventos), "| Profesionales:", len(df_prof))
 print("Filtrado :", output_filtered, "| Filas:", len(df_export))
@@ -1,6 +1,9 @@
-import pandas as pd
 import logging
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from z_comun.intermedios import existe_tabla, leer_tabla, guardar_tabla
 
 # ============================
 # LOGGING
@@ -279,12 +282,12 @@ for archivo, reglas in CONFIG.items():
     ruta_entrada = os.path.join(base_origen, archivo)
     ruta_salida  = os.path.join(BASE_RESULTADOS, reglas['salida'])
 
-    if not os.path.exists(ruta_entrada):
+    if not existe_tabla(ruta_entrada):
         logging.warning(f"Archivo no encontrado: {ruta_entrada}")
         continue
 
     logging.info(f"Procesando {archivo}")
-    df = pd.read_excel(ruta_entrada)
+    df = leer_tabla(ruta_entrada)
 
     # Renombrar
     if reglas.get('rename'):
@@ -307,7 +310,8 @@ for archivo, reglas in CONFIG.items():
 
             logging.info(f"Aplicada acción '{accion}' | Filas: {len(df)}")
 
-    df.to_excel(ruta_salida, index=False)
+    # Resultados finales: se entregan también en .xlsx
+    guardar_tabla(df, ruta_salida, excel=True)
     logging.info(f"Archivo generado: {ruta_salida}")
 
 logging.info("Preprocesamiento finalizado correctamente")
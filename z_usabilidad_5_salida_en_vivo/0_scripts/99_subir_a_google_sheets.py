@@ -1,11 +1,15 @@
 import pandas as pd
 import logging
-import time
 from datetime import datetime
 from google.oauth2.service_account import Credentials
 import gspread
 from dotenv import load_dotenv
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from z_comun.intermedios import existe_tabla, leer_tabla
+from z_comun.google_sheets import PublicadorSheets
 
 # ======================================================
 # CONFIGURACIÓN LOGS
@@ -32,6 +36,9 @@ SHEET_NAME = (
 # ======================================================
 BASE_RESULTADOS = 'z_usabilidad_5_salida_en_vivo/3_resultados'
 
+# Hash por fila de lo último publicado en cada hoja (sincronización por diferencias)
+SNAPSHOTS_SHEETS = 'z_usabilidad_5_salida_en_vivo/2_proceso/.sheets_snapshots'
+
 # ======================================================
 # ARCHIVOS FINALES → HOJAS
 # ======================================================
@@ -79,20 +86,21 @@ except gspread.SpreadsheetNotFound:
     raise
 
 # ======================================================
-# FUNCIÓN GENÉRICA DE SUBIDA (LIMPIA PARA LOOKER)
+# FUNCIÓN GENÉRICA DE PREPARACIÓN (LIMPIA PARA LOOKER)
 # ======================================================
-def subir_excel_a_hoja(ruta_excel, nombre_hoja):
-    logging.info(f"Subiendo {ruta_excel} → hoja '{nombre_hoja}'")
+def preparar_hoja(ruta_excel, nombre_hoja):
+    """Filas (encabezado + datos) listas para subir, o None si no hay archivo/datos."""
+    logging.info(f"Preparando {ruta_excel} → hoja '{nombre_hoja}'")
 
-    if not os.path.exists(ruta_excel):
+    if not existe_tabla(ruta_excel):
         logging.warning(f"Archivo no encontrado: {ruta_excel}")
-        return
+        return None
 
-    df = pd.read_excel(ruta_excel)
+    df = leer_tabla(ruta_excel)
 
     if df.empty:
         logging.warning(f"Archivo vacío, se omite: {ruta_excel}")
-        return
+        return None
 
     # Fecha de actualización (misma para todas las filas)
     fecha_actualizacion = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -107,78 +115,27 @@ def subir_excel_a_hoja(ruta_excel, nombre_hoja):
                 pass
 
     df = df.astype(str)
-    data = [list(df.columns)] + df.values.tolist()
-
-    # Asegurar hoja
-    try:
-        ws = sh.worksheet(nombre_hoja)
-    except gspread.WorksheetNotFound:
-        ws = sh.add_worksheet(title=nombre_hoja, rows="100", cols="50")
-
-    ws.clear()
-    ws.update(values=data, range_name="A1")
-
-    logging.info(f"Hoja '{nombre_hoja}' actualizada. Filas: {len(df)}")
-
-    # Autoajustar columnas
-    time.sleep(1)
-    try:
-        sh.batch_update({
-            "requests": [{
-                "autoResizeDimensions": {
-                    "dimensions": {
-                        "sheetId": ws.id,
-                        "dimension": "COLUMNS",
-                        "startIndex": 0,
-                        "endIndex": len(df.columns) + 1
-                    }
-                }
-            }]
-        })
-    except Exception:
-        pass
-
-# ======================================================
-# FUNCIÓN PARA MOVER HOJA AL INICIO
-# ======================================================
-def mover_hoja_al_inicio(nombre_hoja):
-    try:
-        ws = sh.worksheet(nombre_hoja)
-
-        sh.batch_update({
-            "requests": [{
-                "updateSheetProperties": {
-                    "properties": {
-                        "sheetId": ws.id,
-                        "index": 0
-                    },
-                    "fields": "index"
-                }
-            }]
-        })
-
-        logging.info(f"Hoja '{nombre_hoja}' movida al inicio")
-
-    except Exception as e:
-        logging.warning(f"No se pudo mover la hoja '{nombre_hoja}': {e}")
-
-# ======================================================
-# SUBIR ARCHIVOS DE RESULTADOS
-# ======================================================
-for archivo, hoja in ARCHIVOS_RESULTADOS.items():
-    ruta = os.path.join(BASE_RESULTADOS, archivo)
-    subir_excel_a_hoja(ruta, hoja)
+    return [list(df.columns)] + df.values.tolist()
 
 # ======================================================
-# SUBIR RESUMEN (LOOKER)
+# PREPARAR ARCHIVOS DE RESULTADOS Y RESUMEN (LOOKER)
 # ======================================================
-for archivo, hoja in ARCHIVO_RESUMEN.items():
+# Todo se arma en local y se publica junto: un values.batchUpdate para los
+# datos y un batchUpdate para limpiar sobrantes, autoajustar y mover hojas.
+# Con el snapshot de la corrida anterior solo se envían las filas que
+# cambiaron; fecha_actualizacion no cuenta como cambio, pero su columna se
+# reescribe entera en cada corrida (Looker la usa como última actualización)
+publicador = PublicadorSheets(sh, snapshots=SNAPSHOTS_SHEETS)
+
+for archivo, hoja in {**ARCHIVOS_RESULTADOS, **ARCHIVO_RESUMEN}.items():
     ruta = os.path.join(BASE_RESULTADOS, archivo)
-    subir_excel_a_hoja(ruta, hoja)
+    filas = preparar_hoja(ruta, hoja)
+    if filas is not None:
+        publicador.agregar(hoja, filas, columnas_siempre=['fecha_actualizacion'])
 
 # ======================================================
-# MOVER RESUMEN AL INICIO
+# PUBLICAR (RESUMEN AL INICIO)
 # ======================================================
-mover_hoja_al_inicio('resumen')
+publicador.publicar(mover_al_inicio=['resumen'])
 
 logging.info("Todas las hojas fueron subidas correctamente")
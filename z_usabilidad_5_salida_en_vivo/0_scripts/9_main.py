@@ -1,85 +1,48 @@
-import subprocess
 import sys
-import time
 import os
+import logging
 from datetime import datetime
 
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from z_comun.iris import consultar, cerrar_iris
+from z_comun.intermedios import tabla_desde_filas, guardar_tabla
+from hospitalizados_dias import QUERY_DESCARGA, procesar
+
 # =====================================================
 # CONFIGURACIÓN GENERAL
 # =====================================================
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
 
 LOG_FILE = "z_usabilidad_5_salida_en_vivo/logs/9_hospitalizados_pipeline.log"
 os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
 
 FECHA_EJECUCION = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-# =====================================================
-# SCRIPTS A EJECUTAR (EN ORDEN)
-# =====================================================
-scripts = [
-    os.path.join(BASE_DIR, "9_hospitalizados_dias_paso1_descarga.py"),
-    os.path.join(BASE_DIR, "9_hospitalizados_dias_paso2_reglas_clinicas.py"),
-    os.path.join(BASE_DIR, "9_hospitalizados_dias_paso3_consolidar.py"),
-    os.path.join(BASE_DIR, "9_hospitalizados_dias_paso4_resumen_fechas.py"),
-    os.path.join(BASE_DIR, "9_hospitalizados_dias_paso5_ajuste_comparacion.py"),
-]
+ENTRADA = "z_usabilidad_5_salida_en_vivo/1_entrada"
+RESULTADOS = "z_usabilidad_5_salida_en_vivo/3_resultados"
+
+# HOSPITALIZADOS_ARTEFACTOS=1 guarda también la descarga (paso1) y el
+# resumen de servicios (paso4) para auditoría; el resto siempre se escribe
+ARTEFACTOS = os.getenv("HOSPITALIZADOS_ARTEFACTOS", "0") == "1"
 
 # =====================================================
-# FUNCIÓN EJECUCIÓN
+# SALIDAS: (ruta, xlsx para consulta, siempre)
 # =====================================================
-def ejecutar_script(script_path):
-    print(f"\n Ejecutando: {os.path.basename(script_path)}")
-    inicio = datetime.now()
-
-    try:
-        resultado = subprocess.run(
-            [sys.executable, script_path],
-            check=True,
-            text=True,
-            capture_output=True
-        )
-
-        duracion = (datetime.now() - inicio).total_seconds()
-
-        print(f" Finalizado en {duracion:.2f} segundos")
-        if resultado.stdout:
-            print("— STDOUT —")
-            print(resultado.stdout)
-
-        with open(LOG_FILE, "a", encoding="utf-8") as log:
-            log.write(
-                f"[{FECHA_EJECUCION}] OK - {script_path} "
-                f"({duracion:.2f}s)\n"
-            )
-
-        return True
-
-    except subprocess.CalledProcessError as e:
-        print(" ERROR en ejecución")
-        print("— STDERR —")
-        print(e.stderr)
-
-        with open(LOG_FILE, "a", encoding="utf-8") as log:
-            log.write(
-                f"[{FECHA_EJECUCION}] ERROR - {script_path}\n"
-                f"{e.stderr}\n"
-            )
-
-        return False
-
-    except Exception as ex:
-        print("✖ ERROR inesperado")
-        print(str(ex))
-
-        with open(LOG_FILE, "a", encoding="utf-8") as log:
-            log.write(
-                f"[{FECHA_EJECUCION}] ERROR INESPERADO - {script_path}\n"
-                f"{str(ex)}\n"
-            )
-
-        return False
-
+SALIDAS = {
+    "paso1": (f"{ENTRADA}/9_hospitalizados_dias_paso1_descarga", False, False),
+    # Entrada de 10_indicadores_cumplimiento_paso1
+    "paso2": (f"{RESULTADOS}/9_hospitalizados_dias_paso2_reglas_clinicas", False, True),
+    "paso3": (f"{RESULTADOS}/9_hospitalizados_dias_paso3_consolidado", True, True),
+    "paso4": (f"{RESULTADOS}/9_hospitalizados_dias_paso4_resumen_servicios", False, False),
+    "paso5": (f"{RESULTADOS}/9_hospitalizados_dias_paso5_resumen_ajustado", True, True),
+}
 
 # =====================================================
 # EJECUCIÓN PIPELINE
@@ -92,14 +55,38 @@ print("==============================================")
 with open(LOG_FILE, "a", encoding="utf-8") as log:
     log.write(f"\n=== EJECUCIÓN {FECHA_EJECUCION} ===\n")
 
-for script in scripts:
-    ok = ejecutar_script(script)
-    if not ok:
-        print(f"\n Pipeline detenido por error en:")
-        print(script)
-        break
+inicio = datetime.now()
+try:
+    columnas, filas = consultar(QUERY_DESCARGA)
+    duracion_descarga = (datetime.now() - inicio).total_seconds()
+    logging.info(f"Descarga IRIS: {len(filas)} filas en {duracion_descarga:.2f}s")
+
+    descarga = tabla_desde_filas(columnas, filas)
+    resultados = procesar(descarga)
+    resultados["paso1"] = descarga
+
+    for paso, (ruta, excel, siempre) in SALIDAS.items():
+        if siempre or ARTEFACTOS:
+            guardar_tabla(resultados[paso], ruta, excel=excel)
+            logging.info(f"{paso}: {len(resultados[paso])} filas -> {ruta}")
+
+    duracion = (datetime.now() - inicio).total_seconds()
+    print(f" Finalizado en {duracion:.2f} segundos (descarga {duracion_descarga:.2f}s)")
+    with open(LOG_FILE, "a", encoding="utf-8") as log:
+        log.write(
+            f"[{FECHA_EJECUCION}] OK - hospitalizados_dias "
+            f"({duracion:.2f}s, descarga {duracion_descarga:.2f}s)\n"
+        )
+
+except Exception as e:
+    print(" ERROR en ejecución")
+    print(str(e))
+    with open(LOG_FILE, "a", encoding="utf-8") as log:
+        log.write(f"[{FECHA_EJECUCION}] ERROR - hospitalizados_dias\n{e}\n")
+    sys.exit(1)
 
-    time.sleep(2)
+finally:
+    cerrar_iris()
 
 print("\n==============================================")
 print(" PIPELINE FINALIZADO")
@@ -0,0 +1,115 @@
+"""
+Cálculo columnar de estadías (minutos y días administrativos).
+
+Lo usan hospitalizados_dias (reglas clínicas, resumen de servicios y
+ajuste) y 10_indicadores_cumplimiento_paso1, para que todos cuenten igual:
+
+    - fecha ('%Y-%m-%d') + hora ('%H:%M:%S') -> datetime64; lo inválido es NaT
+    - sin término (NaT) se cuenta hasta 'now' (regla de episodio abierto)
+    - minutos enteros truncados; 0 si falta el inicio o el término
+    - días administrativos: cualquier minuto cuenta como 1 día
+
+eventos_en_intervalos ubica eventos (evoluciones) dentro de estadías para
+10_indicadores_cumplimiento_paso2.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+MINUTOS_DIA = 1440
+
+
+def ahora():
+    # Al segundo: así los minutos salen de una resta entera
+    return pd.Timestamp(datetime.now().replace(microsecond=0))
+
+
+def _parsear(valores, formato):
+    # Fechas y horas se repiten mucho: se parsea cada valor distinto una vez
+    codigos, unicos = pd.factorize(valores, use_na_sentinel=False)
+    parseados = pd.to_datetime(pd.Index(unicos).astype(str), format=formato, errors="coerce")
+    return pd.Series(parseados.values[codigos], index=valores.index)
+
+
+def fecha_hora(fechas, horas):
+    """Series datetime64 a partir de columnas de fecha y hora (texto, date o time)."""
+    fechas = pd.Series(fechas)
+    horas = pd.Series(horas, index=fechas.index)
+
+    if pd.api.types.is_datetime64_any_dtype(fechas):
+        dia = fechas.dt.normalize()
+    else:
+        dia = _parsear(fechas, "%Y-%m-%d")
+
+    hora = _parsear(horas, "%H:%M:%S")
+    return dia + (hora - hora.dt.normalize())
+
+
+def hasta(termino, now):
+    """Término efectivo: los abiertos (NaT) se cuentan hasta now."""
+    return termino.fillna(now)
+
+
+def minutos(inicio, fin):
+    segundos = (fin - inicio).dt.total_seconds()
+    return (segundos / 60).fillna(0).astype(np.int64)
+
+
+def dias_admin(mins):
+    mins = np.asarray(mins, dtype=np.int64)
+    return np.where(mins > 0, -(-mins // MINUTOS_DIA), 0)
+
+
+def por_grupo(claves, valores, operacion):
+    """
+    min / max / sum de 'valores' por clave, en orden de aparición de la
+    clave (como el recorrido fila a fila que reemplaza).
+    """
+    return pd.Series(valores).groupby(pd.Series(claves).values, sort=False, dropna=False).agg(operacion)
+
+
+def eventos_en_intervalos(claves_intervalo, inicio, fin, claves_evento, momento):
+    """
+    Pares (intervalo, evento) con la misma clave e inicio <= momento <= fin,
+    como posiciones (arrays de enteros). Equivale a merge por clave + filtro
+    de rango, pero sin armar todos los pares de la clave: los eventos se
+    ordenan por (clave, momento) y cada intervalo toma su tramo con
+    searchsorted. Claves nulas coinciden entre sí, como en merge.
+    """
+    claves_intervalo = pd.DataFrame(claves_intervalo).reset_index(drop=True)
+    claves_evento = pd.DataFrame(claves_evento).reset_index(drop=True)
+    claves_evento.columns = claves_intervalo.columns
+
+    # Un código entero por clave, común a ambos lados
+    claves = pd.concat([claves_intervalo, claves_evento], ignore_index=True)
+    codigos = claves.groupby(list(claves.columns), sort=False, dropna=False).ngroup().to_numpy()
+    cod_i, cod_e = codigos[:len(claves_intervalo)], codigos[len(claves_intervalo):]
+
+    t_ini = pd.Series(inicio).to_numpy(dtype="datetime64[ns]")
+    t_fin = pd.Series(fin).to_numpy(dtype="datetime64[ns]")
+    t_evt = pd.Series(momento).to_numpy(dtype="datetime64[ns]")
+    ok_i = ~(np.isnat(t_ini) | np.isnat(t_fin))
+    ok_e = ~np.isnat(t_evt)
+
+    # Rango denso de los instantes, para ordenar por (código, instante) con
+    # un solo entero sin desbordar
+    instantes = np.unique(np.concatenate([t_evt[ok_e], t_ini[ok_i], t_fin[ok_i]]))
+    paso = len(instantes) + 1
+
+    pos_e = np.flatnonzero(ok_e)
+    llave_e = cod_e[ok_e] * paso + np.searchsorted(instantes, t_evt[ok_e])
+    orden = np.argsort(llave_e, kind="stable")
+    llave_e = llave_e[orden]
+    pos_e = pos_e[orden]
+
+    pos_i = np.flatnonzero(ok_i)
+    base_i = cod_i[ok_i] * paso
+    desde = np.searchsorted(llave_e, base_i + np.searchsorted(instantes, t_ini[ok_i]), "left")
+    hasta = np.searchsorted(llave_e, base_i + np.searchsorted(instantes, t_fin[ok_i]), "right")
+    cantidad = np.clip(hasta - desde, 0, None)
+
+    # Expandir cada tramo [desde, hasta) a sus pares
+    total = int(cantidad.sum())
+    corrimiento = np.arange(total) - np.repeat(np.cumsum(cantidad) - cantidad, cantidad)
+    return np.repeat(pos_i, cantidad), pos_e[np.repeat(desde, cantidad) + corrimiento]
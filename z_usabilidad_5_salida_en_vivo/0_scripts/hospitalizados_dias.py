@@ -0,0 +1,152 @@
+"""
+Motor de días de hospitalización (antes 9_hospitalizados_dias_paso1..5).
+
+Toma una sola vez el resultado de la descarga IRIS y calcula en memoria,
+con operaciones columnares (estadia.py), las cuatro salidas que antes
+generaba un proceso por paso leyendo el libro .xlsx del anterior:
+
+    paso2  reglas_clinicas     minutos / días por fila (servicio y episodio)
+    paso3  consolidado         suma de minutos de servicio por episodio
+    paso4  resumen_servicios   inicio mínimo / término máximo por episodio
+    paso5  resumen_ajustado    paso4 con el inicio de servicio ajustado
+
+Todas las salidas usan un mismo 'now' para los servicios y episodios sin
+término.
+"""
+import numpy as np
+import pandas as pd
+
+from estadia import ahora, fecha_hora, hasta, minutos, dias_admin, por_grupo
+
+QUERY_DESCARGA = """
+     SELECT
+        ADM.PAADM_ADMNO AS episodio,
+        CASE PAADM_VISITSTATUS
+            WHEN 'A' THEN 'Actual'
+            WHEN 'C' THEN 'Suspendido'
+            WHEN 'D' THEN 'Egreso'
+            WHEN 'P' THEN 'Pre Admision'
+            WHEN 'R' THEN 'Liberado'
+            WHEN 'N' THEN 'No Atendido'
+        END AS EstadoAtencion,
+        PAADM_ADMDATE AS fecha_admision,
+        PAADM_ADMTIME AS hora_admision,
+        TRANS.TRANS_StartDate AS fecha_inicio_servicio,
+        TRANS.TRANS_StartTime AS hora_inicio_servicio,
+        TRANS.TRANS_EndDate   AS fecha_termino_servicio,
+        TRANS.TRANS_EndTime   AS hora_termino_servicio,
+        WARD.WARD_Desc AS servicio,
+        PAADM_DischgDate AS fechaAltaAdm,
+        PAADM_DischgTime AS horaAltaAdm,
+        ADM.PAADM_PAPMI_DR->PAPMI_ID AS rut_paciente,
+        ADM.PAADM_PAPMI_DR->PAPMI_PAPER_DR->PAPER_Name2 AS nombre_paciente,
+        ADM.PAADM_PAPMI_DR->PAPMI_PAPER_DR->PAPER_Name  AS apellidop_paciente,
+        ADM.PAADM_PAPMI_DR->PAPMI_PAPER_DR->PAPER_Name3 AS apellidom_paciente,
+        WARD_LocationDR
+    FROM PA_Adm ADM
+    INNER JOIN PA_AdmTransaction TRANS
+        ON ADM.PAADM_RowID = TRANS.TRANS_ParRef
+    LEFT JOIN PAC_Ward WARD
+        ON TRANS.TRANS_Ward_DR = WARD.WARD_RowID
+    WHERE ADM.PAADM_ADMDATE >= '2026-01-01'
+        AND TRANS.TRANS_StartDate >= '2026-01-07'
+        AND PAADM_HOSPITAL_DR->HOSP_code = '112100'
+        AND ADM.PAADM_TYPE = 'I'
+        AND WARD.WARD_Desc IS NOT NULL
+        AND ADM.PAADM_VISITSTATUS IN ('A','D')
+        AND ADM.PAADM_ADMDATE < DATEADD('day', 1, CURRENT_DATE)
+        AND WARD_LocationDR NOT IN (4709,3140)
+    ORDER BY
+        ADM.PAADM_ADMNO,
+        TRANS.TRANS_StartDate,
+        TRANS.TRANS_StartTime;
+"""
+
+# =========================================================
+# MOTOR
+# =========================================================
+def procesar(df, now=None):
+    """
+    Calcula paso2..paso5 a partir de la descarga (paso1) como DataFrame.
+    Devuelve {'paso2': df, 'paso3': df, 'paso4': df, 'paso5': df}.
+    """
+    now = ahora() if now is None else now
+    episodio = df["episodio"]
+
+    # -------------------------------------------------
+    # POR FILA: servicio y episodio (paso2)
+    # -------------------------------------------------
+    ini_srv = fecha_hora(df["fecha_inicio_servicio"], df["hora_inicio_servicio"])
+    # Si no hay término, se usa now SOLO para cálculo
+    fin_srv = hasta(fecha_hora(df["fecha_termino_servicio"], df["hora_termino_servicio"]), now)
+    min_srv = minutos(ini_srv, fin_srv)
+
+    fecha_alta = fecha_hora(df["fechaAltaAdm"], "00:00:00")
+    ini_epi = fecha_hora(df["fecha_admision"], df["hora_admision"])
+    fin_epi = hasta(fecha_hora(df["fechaAltaAdm"], df["horaAltaAdm"]), now)
+    min_epi = minutos(ini_epi, fin_epi)
+
+    paso2 = df.copy()
+    paso2["minutos_estadia_servicio"] = min_srv
+    paso2["dias_estadia_servicio"] = dias_admin(min_srv)
+    paso2["minutos_estadia_episodio"] = min_epi
+    paso2["dias_estadia_episodio"] = dias_admin(min_epi)
+
+    # -------------------------------------------------
+    # POR EPISODIO: admisión/alta de la primera fila, servicios agregados
+    # -------------------------------------------------
+    primera = ~episodio.duplicated()
+    episodios = episodio[primera].values
+    ini_epi_e = ini_epi[primera].values
+    fin_epi_e = fin_epi[primera].values
+    min_epi_e = min_epi[primera].values
+    dias_epi_e = dias_admin(min_epi_e)
+
+    min_srv_sum = por_grupo(episodio, min_srv, "sum").values
+    paso3 = pd.DataFrame({
+        "episodio": episodios,
+        "minutos_estadia_servicio_sum": min_srv_sum,
+        "dias_estadia_servicio_sum": dias_admin(min_srv_sum),
+        "minutos_estadia_episodio": min_epi_e,
+        "dias_estadia_episodio": dias_epi_e,
+    })
+
+    ini_srv_e = pd.Series(por_grupo(episodio, ini_srv, "min").values)
+    fin_srv_e = pd.Series(por_grupo(episodio, fin_srv, "max").values)
+    min_srv_e = minutos(ini_srv_e, fin_srv_e)
+    dias_srv_e = dias_admin(min_srv_e)
+
+    paso4 = pd.DataFrame({
+        "episodio": episodios,
+        "EstadoAtencion": df["EstadoAtencion"][primera].values,
+        "fecha_admision_completa": ini_epi_e,
+        "fechaAltaAdm_completa": np.where(fecha_alta[primera].notna(), fin_epi_e, np.datetime64("NaT")),
+        "fecha_inicio_servicio_completo": ini_srv_e,
+        "fecha_termino_servicio_completo": fin_srv_e.where(fin_srv_e != now),
+        "minutos_estadia_episodio": min_epi_e,
+        "dias_estadia_episodio": dias_epi_e,
+        "minutos_estadia_servicio": min_srv_e,
+        "dias_estadia_servicio": dias_srv_e,
+        "comparacion_fechas": np.where(dias_epi_e == dias_srv_e, "si", "no"),
+    })
+
+    # -------------------------------------------------
+    # AJUSTE (paso5): SOLO SI comparacion_fechas = "no", el servicio no
+    # puede empezar antes que el episodio
+    # -------------------------------------------------
+    paso5 = paso4.copy()
+    ini_epi_s = pd.Series(ini_epi_e)
+    ajustar = (
+        (paso4["comparacion_fechas"] == "no")
+        & ini_srv_e.notna() & ini_epi_s.notna()
+        & (ini_srv_e < ini_epi_s)
+    )
+    ini_srv_aj = ini_srv_e.where(~ajustar, ini_epi_s)
+    min_srv_aj = minutos(ini_srv_aj, fin_srv_e)
+    dias_srv_aj = dias_admin(min_srv_aj)
+    paso5["fecha_inicio_servicio_completo"] = ini_srv_aj
+    paso5["minutos_estadia_servicio"] = min_srv_aj
+    paso5["dias_estadia_servicio"] = dias_srv_aj
+    paso5["comparacion_fechas"] = np.where(dias_epi_e == dias_srv_aj, "si", "no")
+
+    return {"paso2": paso2, "paso3": paso3, "paso4": paso4, "paso5": paso5}
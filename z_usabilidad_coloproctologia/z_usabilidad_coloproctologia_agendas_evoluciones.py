@@ -1,5 +1,3 @@
-import jaydebeapi
-import jpype
 import mysql.connector
 from dotenv import load_dotenv
 import os
@@ -8,6 +6,12 @@ import sys
 from datetime import datetime
 from cryptography.fernet import Fernet
 
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from z_comun.iris import consultar, cerrar_iris
+from z_comun.proximidad import mas_cercano
+
 load_dotenv(override=True)
 
 os.makedirs("logs", exist_ok=True)
@@ -21,14 +25,6 @@ logging.basicConfig(level=logging.INFO,
 # Cargar variables de entorno desde el archivo .env
 load_dotenv()
 
-# Leer variables de entorno para InterSystems IRIS
-jdbc_driver_name = os.getenv('JDBC_DRIVER_NAME')
-jdbc_driver_loc = os.getenv('JDBC_DRIVER_PATH')
-iris_connection_string = os.getenv('CONEXION_STRING')
-
-iris_user = os.getenv('DB_USER')
-iris_password = os.getenv('DB_PASSWORD')
-
 # Leer variables de entorno para MySQL
 mysql_host = os.getenv('DB_MYSQL_HOST')
 mysql_port = os.getenv('DB_MYSQL_PORT')
@@ -47,35 +43,87 @@ def fail_and_exit(message):
     logging.error(message)
     sys.exit(1)
 
+# ============================================================
+# EVOLUCIONES CERCANAS A LA CITA
+# ============================================================
+# Para cada cita se busca la evolución (MR_NursingNotes) del mismo episodio
+# más cercana a la fecha agendada, a lo más 3 días antes o después: una de
+# médico u odontólogo y otra de enfermería hecha por el profesional de la
+# agenda. Las notas se extraen una vez para todo el período y se cruzan en
+# pandas (z_comun/proximidad.py), en vez de seis subconsultas por cita.
+
+FECHA_DESDE = '2025-10-01'
+
+DIAS_EVOLUCION = 3
+
+TIPOS_MEDICO_ODONTOLOGO = [
+    'Médico Cirujano', 'Médico', 'Cirujano Dentista',
+    'Psiquiatría', 'Psiquiatría Adultos', 'Odontólogo/Dentista',
+]
+TIPO_ENFERMERIA = 'Enfermera (o)'
+TIPOS_NOTAS = TIPOS_MEDICO_ODONTOLOGO + [TIPO_ENFERMERIA]
+
+# Notas de los episodios con cita en el local 2831 en el período (± DIAS_EVOLUCION)
+QUERY_NOTAS = '''
+    SELECT %nolock
+        b.NOT_ParRef->MRADM_ADM_DR->PAADM_ADMNo AS nro_episodio,
+        b.NOT_Date AS fecha,
+        b.NOT_NurseId_DR->CTPCP_Desc AS profesional,
+        b.NOT_NurseId_DR->CTPCP_CarPrvTp_DR->CTCPT_Desc AS tipo_profesional,
+        b.NOT_User_DR->SSUSR_Name AS usuario
+    FROM MR_NursingNotes b
+    WHERE b.NOT_Hospital_DR = 10448
+        AND b.NOT_Date >= DATEADD(DAY, -{dias}, '{desde}')
+        AND b.NOT_Date <= DATEADD(DAY, {dias}, CURRENT_DATE)
+        AND b.NOT_NurseId_DR->CTPCP_CarPrvTp_DR->CTCPT_Desc IN ({tipos})
+        AND b.NOT_ParRef->MRADM_ADM_DR IN (
+            SELECT appt.APPT_Adm_DR
+            FROM RB_Appointment appt
+            WHERE appt.APPT_AS_ParRef->AS_Date >= '{desde}'
+                AND appt.APPT_AS_ParRef->AS_Date <= CURRENT_TIMESTAMP
+                AND appt.APPT_AS_ParRef->AS_RES_ParRef->RES_CTLOC_DR = 2831
+        )
+'''
+
+
+def evolucion(agendas, notas, por):
+    """Indicador, fecha (DD-MM-AAAA) y usuario de la evolución más cercana."""
+    cercana = mas_cercano(agendas, notas, por, "fecha_agendada", "fecha", ["usuario"], dias=DIAS_EVOLUCION)
+    tiene = cercana["fecha_evento"].notna()
+    return (
+        tiene.map({True: 'Sí tiene evolución', False: 'No tiene evolución'}),
+        cercana["fecha_evento"].dt.strftime('%d-%m-%Y').where(tiene, ''),
+        cercana["usuario"].where(tiene, ''),
+    )
+
+
+def agregar_evoluciones(agendas, notas):
+    """Agrega a las citas las seis columnas de evoluciones, en el orden de la tabla."""
+    agendas = agendas.copy()
+    medicas = notas[notas["tipo_profesional"].isin(TIPOS_MEDICO_ODONTOLOGO)]
+    (agendas["tiene_evoluciones_medico_odontologo"],
+     agendas["fecha_evolucion_medico_odontologo"],
+     agendas["usuario_evolucion_medico_odontologo"]) = evolucion(agendas, medicas, ["nro_episodio"])
+
+    # Enfermería: además, la nota debe ser del profesional de la agenda
+    enfermeria = notas[notas["tipo_profesional"] == TIPO_ENFERMERIA].rename(
+        columns={"profesional": "profesional_agenda"}
+    )
+    (agendas["tiene_evoluciones_enfermería"],
+     agendas["fecha_evolucion_enfermería"],
+     agendas["usuario_evolucion_enfermería"]) = evolucion(
+        agendas, enfermeria, ["nro_episodio", "profesional_agenda"]
+    )
+    return agendas.fillna('')
+
 conn_mysql = None
-conn_iris = None
-cursor_iris = None
 cursor_mysql = None
 
 try:
     # Validar variables de entorno
-    if not jdbc_driver_name or not jdbc_driver_loc:
-        fail_and_exit("El nombre o la ruta del controlador JDBC no están configurados correctamente.")
-    if not iris_connection_string or not iris_user or not iris_password:
-        fail_and_exit("Las variables de entorno de InterSystems IRIS no están configuradas correctamente.")
     if not mysql_host or not mysql_port or not mysql_user or not mysql_password or not mysql_database:
         fail_and_exit("Las variables de entorno de MySQL no están configuradas correctamente.")
     
-    # Iniciar JVM si no está ya iniciada
-    if not jpype.isJVMStarted():
-        jpype.startJVM(jpype.getDefaultJVMPath(), "-Djava.class.path=" + jdbc_driver_loc)
-
-    # Crear conexión con InterSystems IRIS
-    try:
-        conn_iris = jaydebeapi.connect(
-            jdbc_driver_name,
-            iris_connection_string,
-            {'user': iris_user, 'password': iris_password},
-            jdbc_driver_loc
-        )
-    except Exception as e:
-        fail_and_exit(f"Error conectando a IRIS: {e}")
-
     # Consulta SQL para obtener datos
     query = ''' 
             SELECT 
@@ -100,104 +148,32 @@ try:
             sched.AS_RES_ParRef->RES_CTLOC_DR->CTLOC_Desc AS "local",
             sched.AS_RES_ParRef->RES_CTLOC_DR->CTLOC_Dep_DR->DEP_Desc AS "especialidad_local",
             sched.AS_RES_ParRef->RES_CTPCP_DR->CTPCP_CarPrvTp_DR->CTCPT_Desc AS "tipo_profesional",
-            sched.AS_RBEffDateSession_DR->SESS_SessionType_DR->SESS_Desc AS "tipo_de_sesion",
-            CASE 
-                WHEN EXISTS (
-                    SELECT 1
-                    FROM MR_NursingNotes b
-                    WHERE 
-                        b.NOT_Hospital_DR = 10448
-                        AND b.NOT_ParRef->MRADM_ADM_DR->PAADM_ADMNo = appt.APPT_Adm_DR->PAADM_ADMNo
-                        AND b.NOT_NurseId_DR->CTPCP_CarPrvTp_DR->CTCPT_Desc IN 
-                            ('Médico Cirujano', 'Médico', 'Cirujano Dentista', 
-                            'Psiquiatría', 'Psiquiatría Adultos', 'Odontólogo/Dentista')
-                        AND b.NOT_Date BETWEEN DATEADD(DAY, -3, sched.AS_Date) AND DATEADD(DAY, 3, sched.AS_Date)
-                ) THEN 'Sí tiene evolución'
-                ELSE 'No tiene evolución'
-            END AS "tiene_evoluciones_medico_odontologo",
-            (
-                SELECT TOP 1 
-                    CONVERT(VARCHAR(10), b.NOT_Date, 105)
-                FROM MR_NursingNotes b
-                WHERE 
-                    b.NOT_Hospital_DR = 10448
-                    AND b.NOT_ParRef->MRADM_ADM_DR->PAADM_ADMNo = appt.APPT_Adm_DR->PAADM_ADMNo
-                    AND b.NOT_NurseId_DR->CTPCP_CarPrvTp_DR->CTCPT_Desc IN 
-                        ('Médico Cirujano', 'Médico', 'Cirujano Dentista', 
-                        'Psiquiatría', 'Psiquiatría Adultos', 'Odontólogo/Dentista')
-                    AND b.NOT_Date BETWEEN DATEADD(DAY, -3, sched.AS_Date) AND DATEADD(DAY, 3, sched.AS_Date)
-                ORDER BY ABS(DATEDIFF(DAY, b.NOT_Date, sched.AS_Date))
-            ) AS "fecha_evolucion_medico_odontologo",
-            (
-                SELECT TOP 1 
-                    b.NOT_User_DR->SSUSR_Name
-                FROM MR_NursingNotes b
-                WHERE 
-                    b.NOT_Hospital_DR = 10448
-                    AND b.NOT_ParRef->MRADM_ADM_DR->PAADM_ADMNo = appt.APPT_Adm_DR->PAADM_ADMNo
-                    AND b.NOT_NurseId_DR->CTPCP_CarPrvTp_DR->CTCPT_Desc IN 
-                        ('Médico Cirujano', 'Médico', 'Cirujano Dentista', 
-                        'Psiquiatría', 'Psiquiatría Adultos', 'Odontólogo/Dentista')
-                    AND b.NOT_Date BETWEEN DATEADD(DAY, -3, sched.AS_Date) AND DATEADD(DAY, 3, sched.AS_Date)
-                ORDER BY ABS(DATEDIFF(DAY, b.NOT_Date, sched.AS_Date))
-            ) AS "usuario_evolucion_medico_odontologo",
-            CASE 
-                WHEN EXISTS (
-                    SELECT 1
-                    FROM MR_NursingNotes b
-                    WHERE 
-                        b.NOT_Hospital_DR = 10448
-                        AND b.NOT_ParRef->MRADM_ADM_DR->PAADM_ADMNo = appt.APPT_Adm_DR->PAADM_ADMNo
-                        AND b.NOT_NurseId_DR->CTPCP_Desc = sched.AS_RES_ParRef->RES_Desc
-                        AND b.NOT_NurseId_DR->CTPCP_CarPrvTp_DR->CTCPT_Desc = 'Enfermera (o)'
-                        AND b.NOT_Date BETWEEN DATEADD(DAY, -3, sched.AS_Date) AND DATEADD(DAY, 3, sched.AS_Date)
-                ) THEN 'Sí tiene evolución'
-                ELSE 'No tiene evolución'
-            END AS "tiene_evoluciones_enfermería",
-            (
-                SELECT TOP 1 
-                    CONVERT(VARCHAR(10), b.NOT_Date, 105)
-                FROM MR_NursingNotes b
-                WHERE 
-                    b.NOT_Hospital_DR = 10448
-                    AND b.NOT_ParRef->MRADM_ADM_DR->PAADM_ADMNo = appt.APPT_Adm_DR->PAADM_ADMNo
-                    AND b.NOT_NurseId_DR->CTPCP_Desc = sched.AS_RES_ParRef->RES_Desc
-                    AND b.NOT_NurseId_DR->CTPCP_CarPrvTp_DR->CTCPT_Desc = 'Enfermera (o)'
-                    AND b.NOT_Date BETWEEN DATEADD(DAY, -3, sched.AS_Date) AND DATEADD(DAY, 3, sched.AS_Date)
-                ORDER BY ABS(DATEDIFF(DAY, b.NOT_Date, sched.AS_Date))
-            ) AS "fecha_evolucion_enfermería",
-            (
-                SELECT TOP 1 
-                    b.NOT_User_DR->SSUSR_Name
-                FROM MR_NursingNotes b
-                WHERE 
-                    b.NOT_Hospital_DR = 10448
-                    AND b.NOT_ParRef->MRADM_ADM_DR->PAADM_ADMNo = appt.APPT_Adm_DR->PAADM_ADMNo
-                    AND b.NOT_NurseId_DR->CTPCP_Desc = sched.AS_RES_ParRef->RES_Desc
-                    AND b.NOT_NurseId_DR->CTPCP_CarPrvTp_DR->CTCPT_Desc = 'Enfermera (o)'
-                    AND b.NOT_Date BETWEEN DATEADD(DAY, -3, sched.AS_Date) AND DATEADD(DAY, 3, sched.AS_Date)
-                ORDER BY ABS(DATEDIFF(DAY, b.NOT_Date, sched.AS_Date))
-            ) AS "usuario_evolucion_enfermería"
+            sched.AS_RBEffDateSession_DR->SESS_SessionType_DR->SESS_Desc AS "tipo_de_sesion"
         FROM RB_Appointment appt
         LEFT JOIN RB_ApptSchedule sched 
             ON appt.APPT_AS_ParRef = sched.AS_RowId
         WHERE 
-            sched.AS_Date >='2025-10-01' AND sched.AS_Date <= CURRENT_TIMESTAMP
+            sched.AS_Date >= '{desde}' AND sched.AS_Date <= CURRENT_TIMESTAMP
             AND sched.AS_RES_ParRef->RES_CTLOC_DR->CTLOC_HOSPITAL_DR = 10448 
             AND sched.AS_RES_ParRef->RES_CTLOC_DR->CTLOC_RowID = 2831;
-        '''
+        '''.format(desde=FECHA_DESDE)
 
-    cursor_iris = conn_iris.cursor()
     try:
-        cursor_iris.execute(query)
-        rows = cursor_iris.fetchall()
+        columnas, rows = consultar(query)
+        agendas = pd.DataFrame(rows, columns=[c.lower() for c in columnas])
+        _, notas = consultar(QUERY_NOTAS.format(
+            desde=FECHA_DESDE, dias=DIAS_EVOLUCION, tipos=", ".join(f"'{t}'" for t in TIPOS_NOTAS)
+        ))
+        notas = pd.DataFrame(notas, columns=["nro_episodio", "fecha", "profesional", "tipo_profesional", "usuario"])
+        logging.info(f"{len(agendas)} citas, {len(notas)} evoluciones")
+        rows = agregar_evoluciones(agendas, notas).values.tolist()
     except Exception as e:
         fail_and_exit(f"Error ejecutando consulta IRIS: {e}")
 
     # Convertir filas a formato adecuado para MySQL
     formatted_rows = []
     for row in rows:
-        valores = [str(col) if col is not None else '' for col in row]
+        valores = list(row)
         fechaActualizacion = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         formatted_rows.append(tuple(valores + [fechaActualizacion]))
         
@@ -267,13 +243,8 @@ except Exception as e:
     fail_and_exit(f"Error inesperado: {e}")
 
 finally:
-    if cursor_iris:
-        cursor_iris.close()
-    if conn_iris:
-        conn_iris.close()
     if cursor_mysql:
         cursor_mysql.close()
     if conn_mysql:
         conn_mysql.close()
-    if jpype.isJVMStarted():
-        jpype.shutdownJVM()
+    cerrar_iris()
@@ -1,5 +1,3 @@
-import jaydebeapi
-import jpype
 import mysql.connector
 from dotenv import load_dotenv
 import os
@@ -8,6 +6,10 @@ import sys
 from datetime import datetime
 from cryptography.fernet import Fernet
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from z_comun.iris import consultar, cerrar_iris
+from z_comun.citas import agregar_citas
+
 load_dotenv(override=True)
 
 os.makedirs("logs", exist_ok=True)
@@ -22,14 +24,6 @@ logging.basicConfig(level=logging.INFO,
 # Cargar variables de entorno desde el archivo .env
 load_dotenv()
 
-# Leer variables de entorno para InterSystems IRIS
-jdbc_driver_name = os.getenv('JDBC_DRIVER_NAME')
-jdbc_driver_loc = os.getenv('JDBC_DRIVER_PATH')
-iris_connection_string = os.getenv('CONEXION_STRING')
-
-iris_user = os.getenv('DB_USER')
-iris_password = os.getenv('DB_PASSWORD')
-
 # Leer variables de entorno para MySQL
 mysql_host = os.getenv('DB_MYSQL_HOST')
 mysql_port = os.getenv('DB_MYSQL_PORT')
@@ -48,81 +42,18 @@ def fail_and_exit(msg):
     sys.exit(1)
 
 conn_mysql = None
-conn_iris = None
-cursor_iris = None
 cursor_mysql = None
 
 try:
     # Validar variables de entorno
-    if not jdbc_driver_name or not jdbc_driver_loc:
-        fail_and_exit("El nombre o la ruta del controlador JDBC no están configurados correctamente.")
-    if not iris_connection_string or not iris_user or not iris_password:
-        fail_and_exit("Las variables de entorno de InterSystems IRIS no están configuradas correctamente.")
     if not mysql_host or not mysql_port or not mysql_user or not mysql_password or not mysql_database:
         fail_and_exit("Las variables de entorno de MySQL no están configuradas correctamente.")
     
-    # Iniciar JVM
-    if not jpype.isJVMStarted():
-        jpype.startJVM(jpype.getDefaultJVMPath(), "-Djava.class.path=" + jdbc_driver_loc)
-
-    # Conexión IRIS
-    try:
-        conn_iris = jaydebeapi.connect(
-            jdbc_driver_name,
-            iris_connection_string,
-            {'user': iris_user, 'password': iris_password},
-            jdbc_driver_loc
-        )
-    except Exception as e:
-        fail_and_exit(f"Error conectando a InterSystems IRIS: {e}")
-
     # Consulta SQL IRIS
     query = ''' 
         SELECT
             PAADM_ADMNO "nro_episodio",
             PAADM_PAPMI_DR->PAPMI_no "nro_registro",
-            (SELECT TOP 1
-                APPT_AS_ParRef->AS_RES_ParRef->RES_CTLOC_DR->CTLOC_desc
-                FROM RB_APPOINTMENT 
-                WHERE APPT_AS_ParRef->AS_Date <= PAADM_DischgDate  
-                AND APPT_PAPMI_DR = PAADM_PAPMI_DR
-                AND APPT_Adm_DR = PAADM_RowID 
-                ORDER BY APPT_AS_ParRef->AS_Date DESC) AS "local",
-            (SELECT TOP 1
-                APPT_AS_ParRef->AS_RES_ParRef->RES_Code
-                FROM RB_APPOINTMENT 
-                WHERE APPT_AS_ParRef->AS_Date <= PAADM_DischgDate  
-                AND APPT_PAPMI_DR = PAADM_PAPMI_DR
-                AND APPT_Adm_DR = PAADM_RowID 
-                ORDER BY APPT_AS_ParRef->AS_Date DESC) AS "cod_recurso_cita",
-            (SELECT TOP 1
-                APPT_AS_ParRef->AS_RES_ParRef->RES_Desc
-                FROM RB_APPOINTMENT 
-                WHERE APPT_AS_ParRef->AS_Date <= PAADM_DischgDate  
-                AND APPT_PAPMI_DR = PAADM_PAPMI_DR
-                AND APPT_Adm_DR = PAADM_RowID 
-                ORDER BY APPT_AS_ParRef->AS_Date DESC) AS "recurso_cita",
-            (SELECT TOP 1 CONVERT(varchar,APPT_AS_ParRef->AS_Date,105)
-                FROM RB_APPOINTMENT 
-                WHERE APPT_AS_ParRef->AS_Date <= PAADM_DischgDate  
-                AND APPT_PAPMI_DR = PAADM_PAPMI_DR    
-                AND APPT_Adm_DR = PAADM_RowID 
-                ORDER BY APPT_AS_ParRef->AS_Date DESC) AS "fecha_cita",
-            (SELECT TOP 1
-                (CASE
-                    WHEN APPT_status = 'P' then 'Agendado'
-                    WHEN APPT_status = 'D' then 'Atendido'
-                    WHEN APPT_status = 'X' then 'Cancelado'
-                    WHEN APPT_status = 'A' then 'Llegó'
-                    WHEN APPT_status = 'N' then 'No atendido'
-                    WHEN APPT_status = 'T' then 'Transferido'
-                    WHEN APPT_status = 'H' then 'En Espera'
-                    ELSE APPT_status END)
-                FROM RB_APPOINTMENT 
-                WHERE APPT_AS_ParRef->AS_Date <= PAADM_DischgDate  
-                AND APPT_PAPMI_DR = PAADM_PAPMI_DR    
-                AND APPT_Adm_DR = PAADM_RowID 
-                ORDER BY APPT_AS_ParRef->AS_Date DESC) AS "estado_cita",
             CONVERT(VARCHAR,PAADM_PAAdm2_DR->PA_Adm2DischargeSummary->DIS_PADischargeSummary_DR->DIS_Date,105) "fecha_contrarref",
             PAADM_PAAdm2_DR->PA_Adm2DischargeSummary->DIS_PADischargeSummary_DR->PA_DischargeSummaryRevStat->REVSTAT_ReviewStatus_DR->CLSRS_Desc "etapa_contrarreferencia",
             PAADM_PAAdm2_DR->PA_Adm2DischargeSummary->DIS_PADischargeSummary_DR->DIS_ModeOfSeparation_DR->CTDSP_Desc "etapa_alta_amb",
@@ -148,7 +79,10 @@ try:
                     ELSE PAADM_RefClinTo_DR->CTRFC_Desc END) "referido_al_establecimiento_contrarreferencia",
             PAADM_RefClinic_DR->CTRFC_Desc "referido_por_alta_amb",
             PAADM_PAAdm2_DR->PA_Adm2DischargeSummary->DIS_PADischargeSummary_DR->DIS_UpdateUser_DR->SSUSR_Initials "cod_usuario_actualiza",
-            PAADM_PAAdm2_DR->PA_Adm2DischargeSummary->DIS_PADischargeSummary_DR->DIS_UpdateUser_DR->SSUSR_name "usuario_actualiza"
+            PAADM_PAAdm2_DR->PA_Adm2DischargeSummary->DIS_PADischargeSummary_DR->DIS_UpdateUser_DR->SSUSR_name "usuario_actualiza",
+            PAADM_RowID "id_episodio",
+            PAADM_PAPMI_DR "id_paciente",
+            PAADM_DischgDate "fecha_alta"
         FROM PA_ADM
         WHERE PAADM_HOSPITAL_DR = 10448
         AND PAADM_AdmDate >= '2025-04-23'
@@ -158,17 +92,17 @@ try:
     '''
 
     # Ejecutar consulta
-    cursor_iris = conn_iris.cursor()
     try:
-        cursor_iris.execute(query)
-        rows = cursor_iris.fetchall()
+        columnas, rows = consultar(query)
+        # Última cita del episodio, en una consulta aparte (z_comun/citas.py)
+        rows = agregar_citas(columnas, rows)
     except Exception as e:
         fail_and_exit(f"Error ejecutando consulta SQL en IRIS: {e}")
 
     # Formatear filas
     formatted_rows = []
     for row in rows:
-        valores = [str(col) if col is not None else '' for col in row]
+        valores = list(row)
         valores.append(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
         formatted_rows.append(tuple(valores))
 
@@ -227,13 +161,8 @@ except Exception as e:
     fail_and_exit(f"Error inesperado: {e}")
 
 finally:
-    if cursor_iris:
-        cursor_iris.close()
-    if conn_iris:
-        conn_iris.close()
     if cursor_mysql:
         cursor_mysql.close()
     if conn_mysql:
         conn_mysql.close()
-    if jpype.isJVMStarted():
-        jpype.shutdownJVM()
+    cerrar_iris()
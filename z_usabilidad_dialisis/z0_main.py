@@ -1,35 +1,40 @@
-import subprocess
 import sys
 import os
+import logging
 
 BASE = os.path.dirname(os.path.abspath(__file__))
-PROJECT_ROOT = os.path.dirname(BASE) 
+PROJECT_ROOT = os.path.dirname(BASE)
 
-def fail_and_exit(msg):
-    print(f"[ERROR] {msg}")
-    sys.exit(1)
+sys.path.append(PROJECT_ROOT)
+from z_comun.trabajos import ejecutar_trabajos
 
-scripts = [
-    "z_usabilidad_dialisis_evoluciones.py",
-    "z_usabilidad_dialisis_imagenes.py"
+import z_usabilidad_dialisis_evoluciones
+import z_usabilidad_dialisis_imagenes
+
+# Los scripts solo declaran su trabajo; aquí corren todos en un proceso
+# (una JVM, un pool IRIS y una conexión MySQL, ver z_comun/trabajos.py)
+trabajos = [
+    z_usabilidad_dialisis_evoluciones.TRABAJO,
+    z_usabilidad_dialisis_imagenes.TRABAJO,
 ]
 
 if __name__ == "__main__":
-    try:
-        for script in scripts:
-            script_path = os.path.join(BASE, script)
-            print(f"\n=== Ejecutando: {script} ===")
-
-            result = subprocess.run(
-                [sys.executable, script_path],
-                cwd=PROJECT_ROOT
-            )
-
-            if result.returncode != 0:
-                fail_and_exit(f"El script {script} terminó con error (exit code {result.returncode}).")
-
-        print("\nTodos los scripts finalizados correctamente.")
-        sys.exit(0)
-
-    except Exception as e:
-        fail_and_exit(f"Error inesperado al ejecutar scripts: {e}")
+    os.chdir(PROJECT_ROOT)
+    os.makedirs("logs", exist_ok=True)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(threadName)s - %(processName)s %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("logs/z_usabilidad_dialisis.log"),
+            logging.StreamHandler()
+        ]
+    )
+
+    fallidos = ejecutar_trabajos(trabajos)
+    if fallidos:
+        print(f"[ERROR] Trabajos con error: {', '.join(fallidos)}")
+        sys.exit(1)
+
+    print("\nTodos los trabajos finalizados correctamente.")
+    sys.exit(0)
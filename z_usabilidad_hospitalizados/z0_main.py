@@ -5,6 +5,9 @@ import os
 BASE = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(BASE)
 
+sys.path.append(PROJECT_ROOT)
+from z_comun.iris_worker import worker_iris
+
 scripts = [
     "z_usabilidad_hospitalizados_epicrisis.py",
     "z_usabilidad_hospitalizados_evoluciones.py",
@@ -12,18 +15,20 @@ scripts = [
 ]
 
 if __name__ == "__main__":
-    for script in scripts:
-        script_path = os.path.join(BASE, script)
-        print(f"\n=== Ejecutando: {script} ===")
+    # Una sola JVM + pool IRIS para los tres scripts (ver z_comun/iris_worker.py)
+    with worker_iris():
+        for script in scripts:
+            script_path = os.path.join(BASE, script)
+            print(f"\n=== Ejecutando: {script} ===")
 
-        result = subprocess.run(
-            [sys.executable, script_path],
-            cwd=PROJECT_ROOT
-        )
+            result = subprocess.run(
+                [sys.executable, script_path],
+                cwd=PROJECT_ROOT
+            )
 
-        if result.returncode != 0:
-            print(f"❌ ERROR ejecutando {script}")
-            print(f"Return code: {result.returncode}")
-            sys.exit(1) 
+            if result.returncode != 0:
+                print(f"❌ ERROR ejecutando {script}")
+                print(f"Return code: {result.returncode}")
+                sys.exit(1) 
 
     sys.exit(0)
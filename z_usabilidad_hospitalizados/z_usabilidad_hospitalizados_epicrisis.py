@@ -1,5 +1,3 @@
-import jaydebeapi
-import jpype
 import mysql.connector
 from dotenv import load_dotenv
 import os
@@ -8,6 +6,10 @@ import sys
 from datetime import datetime
 from cryptography.fernet import Fernet
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from z_comun.iris import consultar, cerrar_iris
+from z_comun.carga_mysql import FusionMySQL
+
 # ============================================================
 # CONFIGURACIÓN PRINCIPAL + LOGGING
 # ============================================================
@@ -25,13 +27,6 @@ logging.basicConfig(
     ]
 )
 
-# Cargar variables de entorno IRIS
-jdbc_driver_name = os.getenv('JDBC_DRIVER_NAME')
-jdbc_driver_loc  = os.getenv('JDBC_DRIVER_PATH')
-iris_connection_string = os.getenv('CONEXION_STRING')
-iris_user = os.getenv('DB_USER')
-iris_password = os.getenv('DB_PASSWORD')
-
 # Cargar variables de entorno MySQL
 mysql_host = os.getenv('DB_MYSQL_HOST')
 mysql_port = os.getenv('DB_MYSQL_PORT')
@@ -113,36 +108,13 @@ def create_table_if_not_exists(cursor, conn):
 # ============================================================
 
 conn_mysql = None
-conn_iris = None
-cursor_iris = None
 cursor_mysql = None
 
 try:
     # VALIDACIONES
-    if not jdbc_driver_name or not jdbc_driver_loc:
-        fail_and_exit("JDBC_DRIVER_NAME o JDBC_DRIVER_PATH no configurados.")
-
-    if not iris_connection_string or not iris_user or not iris_password:
-        fail_and_exit("Variables IRIS no configuradas correctamente.")
-
     if not mysql_host or not mysql_port or not mysql_user or not mysql_password or not mysql_database:
         fail_and_exit("Variables MySQL no configuradas correctamente.")
 
-    # INICIAR JVM
-    if not jpype.isJVMStarted():
-        jpype.startJVM(jpype.getDefaultJVMPath(), "-Djava.class.path=" + jdbc_driver_loc)
-
-    # CONEXIÓN A IRIS
-    logging.info("Conectando a InterSystems IRIS...")
-    conn_iris = jaydebeapi.connect(
-        jdbc_driver_name,
-        iris_connection_string,
-        {'user': iris_user, 'password': iris_password},
-        jdbc_driver_loc
-    )
-
-    cursor_iris = conn_iris.cursor()
-
     # CONSULTA IRIS
     query = """ 
         select %nolock PAADM_DepCode_DR->CTLOC_Hospital_DR->HOSP_Code as HOSP_Code,
@@ -189,11 +161,10 @@ try:
 
     #PAADM_DischgDate >= '2024-10-09'
 
-    cursor_iris.execute(query)
-    rows = cursor_iris.fetchall()
+    _, rows = consultar(query)
 
     formatted_rows = [
-        tuple('' if r is None else str(r) for r in row) 
+        tuple(row)
         + (datetime.now().strftime('%Y-%m-%d %H:%M:%S'),)
         for row in rows
     ]
@@ -205,7 +176,8 @@ try:
         port=mysql_port,
         user=mysql_user,
         password=mysql_password,
-        database=mysql_database
+        database=mysql_database,
+        allow_local_infile=True
     )
     cursor_mysql = conn_mysql.cursor()
 
@@ -214,30 +186,19 @@ try:
     # ================================
     create_table_if_not_exists(cursor_mysql, conn_mysql)
 
-    # TRUNCATE
-    cursor_mysql.execute("TRUNCATE TABLE z_usabilidad_hospitalizados_epicrisis")
-    conn_mysql.commit()
-
-    # INSERT
-    insert_query = """
-        INSERT INTO z_usabilidad_hospitalizados_epicrisis (
-            HOSP_Code, NombrePaciente, RUNPaciente, SexoCodigo, Sexo, Comuna,
-            EstablecimientoInscripcion, ServicioClinicoCodigo, ServicioClinico,
-            FechaAtencion, FechaEgreso, FechaAlta, DestinoEgreso, NumeroEpisodio,
-            MedicoContacto, Hosp, subtipoepi, TratamientoRecibido, ProximoControl,
-            IndicacionesAlAlta, DiagnosticoQueMotivoIngreso, local_actual, estado_epicrisis,
-            descripcion_estado_epicrisis, usuario_update_epicrisis, HoraAtencion, HoraEgreso,
-            fechaActualizacion
-        ) VALUES (
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-            %s, %s, %s, %s, %s, %s, %s, %s, %s
-        );
-    """
+    # FUSIÓN POR NumeroEpisodio (solo epicrisis nuevas o modificadas)
+    columnas = [
+        "HOSP_Code", "NombrePaciente", "RUNPaciente", "SexoCodigo", "Sexo", "Comuna",
+        "EstablecimientoInscripcion", "ServicioClinicoCodigo", "ServicioClinico",
+        "FechaAtencion", "FechaEgreso", "FechaAlta", "DestinoEgreso", "NumeroEpisodio",
+        "MedicoContacto", "Hosp", "subtipoepi", "TratamientoRecibido", "ProximoControl",
+        "IndicacionesAlAlta", "DiagnosticoQueMotivoIngreso", "local_actual",
+        "estado_epicrisis", "descripcion_estado_epicrisis", "usuario_update_epicrisis",
+        "HoraAtencion", "HoraEgreso", "fechaActualizacion"
+    ]
 
-    for i in range(0, len(formatted_rows), 1000):
-        chunk = formatted_rows[i:i+1000]
-        cursor_mysql.executemany(insert_query, chunk)
-        conn_mysql.commit()
+    with FusionMySQL(conn_mysql, "z_usabilidad_hospitalizados_epicrisis", "NumeroEpisodio", columnas) as fusion:
+        fusion.agregar(formatted_rows)
 
     logging.info("Datos transferidos exitosamente.")
     sys.exit(0)
@@ -246,8 +207,6 @@ except Exception as e:
     fail_and_exit(f"Error inesperado: {e}")
 
 finally:
-    if cursor_iris: cursor_iris.close()
-    if conn_iris: conn_iris.close()
     if cursor_mysql: cursor_mysql.close()
     if conn_mysql: conn_mysql.close()
-    if jpype.isJVMStarted(): jpype.shutdownJVM()
+    cerrar_iris()
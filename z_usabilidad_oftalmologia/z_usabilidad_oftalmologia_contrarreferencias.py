@@ -1,5 +1,3 @@
-import jaydebeapi
-import jpype
 import mysql.connector
 from dotenv import load_dotenv
 import os
@@ -8,6 +6,10 @@ import sys
 from datetime import datetime
 from cryptography.fernet import Fernet
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from z_comun.iris import consultar, cerrar_iris
+from z_comun.citas import agregar_citas
+
 # ============================================================
 # CONFIGURACIÓN PRINCIPAL + LOGGING
 # ============================================================
@@ -25,13 +27,6 @@ logging.basicConfig(
     ]
 )
 
-# Cargar variables de entorno IRIS
-jdbc_driver_name = os.getenv('JDBC_DRIVER_NAME')
-jdbc_driver_loc  = os.getenv('JDBC_DRIVER_PATH')
-iris_connection_string = os.getenv('CONEXION_STRING')
-iris_user = os.getenv('DB_USER')
-iris_password = os.getenv('DB_PASSWORD')
-
 # Cargar variables de entorno MySQL
 mysql_host = os.getenv('DB_MYSQL_HOST')
 mysql_port = os.getenv('DB_MYSQL_PORT')
@@ -51,44 +46,15 @@ def encrypt_parity_check(message):
     return fernet.encrypt(message.encode())
 
 conn_mysql = None
-conn_iris = None
-cursor_iris = None
 cursor_mysql = None
 
 try:
     # ============================================================
     # VALIDACIONES DE VARIABLES DE ENTORNO
     # ============================================================
-    if not jdbc_driver_name or not jdbc_driver_loc:
-        fail_and_exit("JDBC_DRIVER_NAME o JDBC_DRIVER_PATH no configurados.")
-
-    if not iris_connection_string or not iris_user or not iris_password:
-        fail_and_exit("Variables IRIS no configuradas correctamente.")
-
     if not mysql_host or not mysql_port or not mysql_user or not mysql_password or not mysql_database:
         fail_and_exit("Variables MySQL no configuradas correctamente.")
 
-    # ============================================================
-    # INICIAR JVM
-    # ============================================================
-    if not jpype.isJVMStarted():
-        jpype.startJVM(jpype.getDefaultJVMPath(), "-Djava.class.path=" + jdbc_driver_loc)
-
-    # ============================================================
-    # CONEXIÓN A IRIS
-    # ============================================================
-    logging.info("Conectando a InterSystems IRIS...")
-
-    try:
-        conn_iris = jaydebeapi.connect(
-            jdbc_driver_name,
-            iris_connection_string,
-            {'user': iris_user, 'password': iris_password},
-            jdbc_driver_loc
-        )
-    except Exception as e:
-        fail_and_exit(f"Error conectando a IRIS: {e}")
-
     # ============================================================
     # CONSULTA A IRIS
     # ============================================================
@@ -96,59 +62,6 @@ try:
         SELECT
         PAADM_ADMNO "nro_episodio",
         PAADM_PAPMI_DR->PAPMI_no "nro_registro",
-        (SELECT TOP 1
-            APPT_AS_ParRef->AS_RES_ParRef->RES_CTLOC_DR->CTLOC_desc
-            FROM RB_APPOINTMENT 
-            WHERE 
-            APPT_AS_ParRef->AS_Date <= PAADM_DischgDate  
-            and APPT_PAPMI_DR = PAADM_PAPMI_DR
-            and APPT_Adm_DR = PAADM_RowID 
-            order by APPT_AS_ParRef->AS_Date desc 
-        ) as "local",
-        (SELECT TOP 1
-            APPT_AS_ParRef->AS_RES_ParRef->RES_Code
-            FROM RB_APPOINTMENT 
-            WHERE 
-            APPT_AS_ParRef->AS_Date <= PAADM_DischgDate  
-            and APPT_PAPMI_DR = PAADM_PAPMI_DR
-            and APPT_Adm_DR = PAADM_RowID 
-            order by APPT_AS_ParRef->AS_Date desc 
-        ) as "cod_recurso_cita",
-        (SELECT TOP 1
-            APPT_AS_ParRef->AS_RES_ParRef->RES_Desc
-            FROM RB_APPOINTMENT 
-            WHERE 
-            APPT_AS_ParRef->AS_Date <= PAADM_DischgDate  
-            and APPT_PAPMI_DR = PAADM_PAPMI_DR
-            and APPT_Adm_DR = PAADM_RowID 
-            order by APPT_AS_ParRef->AS_Date desc 
-        ) as "recurso_cita",
-        (SELECT TOP 1
-            CONVERT (varchar,APPT_AS_ParRef->AS_Date,105)
-            FROM RB_APPOINTMENT 
-            WHERE 
-            APPT_AS_ParRef->AS_Date <= PAADM_DischgDate  
-            and APPT_PAPMI_DR = PAADM_PAPMI_DR    
-            and APPT_Adm_DR = PAADM_RowID 
-            order by APPT_AS_ParRef->AS_Date desc 
-        ) as "fecha_cita",
-        (SELECT TOP 1
-            (CASE
-                WHEN APPT_status = 'P' then 'Agendado'
-                WHEN APPT_status = 'D' then 'Atendido'
-                WHEN APPT_status = 'X' then 'Cancelado'
-                WHEN APPT_status = 'A' then 'Llegó'
-                WHEN APPT_status = 'N' then 'No atendido'
-                WHEN APPT_status = 'T' then 'Transferido'
-                WHEN APPT_status = 'H' then 'En Espera'
-                ELSE APPT_status end)
-            FROM RB_APPOINTMENT 
-            WHERE 
-            APPT_AS_ParRef->AS_Date <= PAADM_DischgDate  
-            and APPT_PAPMI_DR = PAADM_PAPMI_DR    
-            and APPT_Adm_DR = PAADM_RowID 
-            order by APPT_AS_ParRef->AS_Date desc 
-        ) as "estado_cita",
         CONVERT(VARCHAR,PAADM_PAAdm2_DR->PA_Adm2DischargeSummary->DIS_PADischargeSummary_DR->DIS_Date,105) "fecha_contrarref",
         PAADM_PAAdm2_DR->PA_Adm2DischargeSummary->DIS_PADischargeSummary_DR->PA_DischargeSummaryRevStat->REVSTAT_ReviewStatus_DR->CLSRS_Desc "etapa_contrarreferencia",
         PAADM_PAAdm2_DR->PA_Adm2DischargeSummary->DIS_PADischargeSummary_DR->DIS_ModeOfSeparation_DR->CTDSP_Desc  "etapa_alta_amb",
@@ -173,7 +86,10 @@ try:
             "referido_al_establecimiento_contrarreferencia",
         PAADM_RefClinic_DR->CTRFC_Desc "referido_por_alta_amb",
         PAADM_PAAdm2_DR->PA_Adm2DischargeSummary->DIS_PADischargeSummary_DR->DIS_UpdateUser_DR->SSUSR_Initials "cod_usuario_actualiza",
-        PAADM_PAAdm2_DR->PA_Adm2DischargeSummary->DIS_PADischargeSummary_DR->DIS_UpdateUser_DR->SSUSR_name "usuario_actualiza"
+        PAADM_PAAdm2_DR->PA_Adm2DischargeSummary->DIS_PADischargeSummary_DR->DIS_UpdateUser_DR->SSUSR_name "usuario_actualiza",
+        PAADM_RowID "id_episodio",
+        PAADM_PAPMI_DR "id_paciente",
+        PAADM_DischgDate "fecha_alta"
         FROM PA_ADM
         WHERE PAADM_HOSPITAL_DR = 10448
         AND PAADM_AdmDate>='2025-04-23'
@@ -183,11 +99,10 @@ try:
         AND PAADM_PAAdm2_DR->PA_Adm2DischargeSummary->DIS_PADischargeSummary_DR->DIS_Date >= '2025-04-23';
     '''
 
-    cursor_iris = conn_iris.cursor()
-
     try:
-        cursor_iris.execute(query)
-        rows = cursor_iris.fetchall()
+        columnas, rows = consultar(query)
+        # Última cita del episodio, en una consulta aparte (z_comun/citas.py)
+        rows = agregar_citas(columnas, rows)
     except Exception as e:
         fail_and_exit(f"Error ejecutando consulta IRIS: {e}")
 
@@ -195,7 +110,7 @@ try:
     formatted_rows = []
     for row in rows:
         formatted_rows.append(
-            tuple('' if r is None else str(r) for r in row) +
+            tuple(row) +
             (datetime.now().strftime('%Y-%m-%d %H:%M:%S'),)
         )
 
@@ -283,13 +198,8 @@ except Exception as e:
     fail_and_exit(f"Error inesperado: {e}")
 
 finally:
-    if cursor_iris:
-        cursor_iris.close()
-    if conn_iris:
-        conn_iris.close()
     if cursor_mysql:
         cursor_mysql.close()
     if conn_mysql:
         conn_mysql.close()
-    if jpype.isJVMStarted():
-        jpype.shutdownJVM()
+    cerrar_iris()
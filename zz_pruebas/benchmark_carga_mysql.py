@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import random
+import string
+import mysql.connector
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from z_comun.carga_mysql import CargaMySQL
+
+# Compara executemany por chunks de 1000 (antes) contra INSERT multi-fila y
+# LOAD DATA LOCAL INFILE (z_comun/carga_mysql.py) en una MySQL local.
+# Usa DB_MYSQL_* del .env; crea y borra la tabla zz_benchmark_carga.
+load_dotenv(override=True)
+
+FILAS = int(os.getenv("FILAS", 100000))
+TABLA = "zz_benchmark_carga"
+
+conn = mysql.connector.connect(
+    host=os.getenv("DB_MYSQL_HOST"),
+    port=int(os.getenv("DB_MYSQL_PORT", 3306)),
+    user=os.getenv("DB_MYSQL_USER"),
+    password=os.getenv("DB_MYSQL_PASSWORD"),
+    database=os.getenv("DB_MYSQL_DATABASE"),
+    allow_local_infile=True
+)
+cursor = conn.cursor()
+
+
+def texto(n):
+    # Incluye los caracteres que LOAD DATA necesita escapar (como en ANAOP_Notes)
+    base = string.ascii_letters + "áéíóúñ \t\n\r\\'\""
+    return "".join(random.choice(base) for _ in range(n))
+
+
+filas = [
+    [f"H{i:010d}", f"{random.randint(1, 28):02d}-01-2025", texto(20), texto(300), ""]
+    for i in range(FILAS)
+]
+
+
+def recrear():
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLA}")
+    cursor.execute(f"""
+        CREATE TABLE {TABLA} (
+            episodio VARCHAR(11),
+            fecha VARCHAR(10),
+            nombre VARCHAR(40),
+            notas TEXT,
+            vacio VARCHAR(10)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    conn.commit()
+
+
+def verificar():
+    cursor.execute(f"SELECT episodio, fecha, nombre, notas, vacio FROM {TABLA} ORDER BY episodio")
+    cargadas = [list(f) for f in cursor.fetchall()]
+    if cargadas != filas:
+        print("  ERROR: el contenido cargado no coincide con el original")
+
+
+def executemany_chunks():
+    sql = f"INSERT INTO {TABLA} VALUES (%s, %s, %s, %s, %s)"
+    for i in range(0, len(filas), 1000):
+        cursor.executemany(sql, filas[i:i + 1000])
+        conn.commit()
+
+
+def carga(modo):
+    with CargaMySQL(conn, TABLA, modo=modo) as c:
+        for i in range(0, len(filas), 5000):
+            c.agregar(filas[i:i + 5000])
+
+
+print(f"==== Benchmark carga MySQL ({FILAS} filas) ====")
+for nombre, funcion in [
+    ("executemany 1000 (antes)", executemany_chunks),
+    ("INSERT multi-fila", lambda: carga("insert")),
+    ("LOAD DATA LOCAL INFILE", lambda: carga("infile")),
+]:
+    recrear()
+    inicio = time.perf_counter()
+    funcion()
+    print(f"{nombre:<26} {time.perf_counter() - inicio:.2f}s")
+    verificar()
+
+cursor.execute(f"DROP TABLE IF EXISTS {TABLA}")
+conn.commit()
+cursor.close()
+conn.close()
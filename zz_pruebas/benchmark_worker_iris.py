@@ -0,0 +1,77 @@
+import os
+import re
+import sys
+import subprocess
+
+# Compara el pipeline 5 Salida en vivo completo sin worker IRIS (antes: cada
+# paso levanta su JVM y su conexión) y con worker (después), en total y por
+# paso, con las duraciones que 0_main ya escribe en pipeline.log.
+#
+# Corre el pipeline real, con sus cargas a Google Sheets y MySQL: ejecutarlo
+# en lugar de una corrida del cron (comentar la línea mientras tanto). Las
+# corridas se alternan (sin, con, sin, con...) para que cachés del disco y
+# de IRIS no favorezcan a un modo.
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(PROJECT_ROOT, "z_usabilidad_5_salida_en_vivo", "0_scripts", "0_main.py")
+LOG_FILE = os.path.join(PROJECT_ROOT, "z_usabilidad_5_salida_en_vivo", "logs", "pipeline.log")
+REPETICIONES = int(os.getenv("REPETICIONES", 2))
+
+MODOS = {"sin worker": "0", "con worker": "1"}
+
+PASO_OK = re.compile(r"^\[[^\]]+\] (.+?) OK \(([\d.]+)s\)$")
+PASO_ERROR = re.compile(r"^\[[^\]]+\] ERROR (?:inesperado )?en (.+)$")
+TOTAL = re.compile(r"^\[[^\]]+\] TOTAL pipeline \(([\d.]+)s\)$")
+
+
+def correr(iris_worker):
+    """Ejecuta 0_main y devuelve ({paso: segundos}, total) leídos de lo que agregó al log."""
+    inicio_log = os.path.getsize(LOG_FILE) if os.path.exists(LOG_FILE) else 0
+    result = subprocess.run(
+        [sys.executable, MAIN], cwd=PROJECT_ROOT,
+        env=dict(os.environ, IRIS_WORKER=iris_worker), capture_output=True, text=True
+    )
+    with open(LOG_FILE, encoding="utf-8") as f:
+        f.seek(inicio_log)
+        lineas = f.read().splitlines()
+
+    pasos, total, errores = {}, None, []
+    for linea in lineas:
+        if m := PASO_OK.match(linea):
+            pasos[os.path.basename(m.group(1))] = float(m.group(2))
+        elif m := PASO_ERROR.match(linea):
+            errores.append(os.path.basename(m.group(1)))
+        elif m := TOTAL.match(linea):
+            total = float(m.group(1))
+    if result.returncode != 0 or errores or total is None:
+        print(result.stdout[-2000:])
+        print(result.stderr[-2000:])
+        print(f"ERROR: la corrida con IRIS_WORKER={iris_worker} falló ({', '.join(errores) or 'sin TOTAL'})")
+        sys.exit(1)
+    return pasos, total
+
+
+def promedio(valores):
+    return sum(valores) / len(valores) if valores else float("nan")
+
+
+if __name__ == "__main__":
+    print("==== Benchmark worker IRIS: pipeline 5 Salida en vivo ====")
+    corridas = {modo: [] for modo in MODOS}
+    for k in range(REPETICIONES):
+        for modo, valor in MODOS.items():
+            pasos, total = correr(valor)
+            corridas[modo].append((pasos, total))
+            print(f"corrida {k + 1}/{REPETICIONES} {modo}: {total:.2f}s")
+
+    antes, despues = corridas["sin worker"], corridas["con worker"]
+    nombres = list(dict.fromkeys(n for pasos, _ in antes + despues for n in pasos))
+
+    print(f"\n{'paso':<42}{'sin worker':>12}{'con worker':>12}{'diferencia':>12}")
+    for nombre in nombres:
+        a = promedio([p[nombre] for p, _ in antes if nombre in p])
+        d = promedio([p[nombre] for p, _ in despues if nombre in p])
+        print(f"{nombre:<42}{a:>11.2f}s{d:>11.2f}s{d - a:>+11.2f}s")
+    a = promedio([t for _, t in antes])
+    d = promedio([t for _, t in despues])
+    print(f"{'TOTAL pipeline':<42}{a:>11.2f}s{d:>11.2f}s{d - a:>+11.2f}s ({(d - a) / a:+.1%})")
+    print(f"\nPromedio de {REPETICIONES} corrida(s) por modo")
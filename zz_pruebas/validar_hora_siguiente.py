@@ -0,0 +1,170 @@
+import os
+import ast
+import sys
+import time
+import random
+import logging
+from datetime import date, datetime
+
+import pandas as pd
+
+# Compara calcular_hora_siguiente (z_pabellon_uso_gestion_tiempo_transcurrido)
+# contra el recorrido fila a fila que reemplazó, sobre un fixture con empates
+# en la hora de ingreso, la última cirugía de cada pabellón, egresos nulos o
+# inválidos y fechas/pabellones/horas faltantes. Termina con exit code 1 si
+# alguna fila difiere. No usa MySQL.
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(
+    PROJECT_ROOT, "z_pabellon", "z_pabellon_uso_gestion", "z_pabellon_uso_gestion_tiempo_transcurrido.py"
+)
+FILAS_ALEATORIAS = int(os.getenv("FILAS", 3000))
+
+
+def cargar_funcion(ruta, nombre):
+    """El script se conecta a MySQL al importarse: se compila solo la función."""
+    with open(ruta, encoding="utf-8") as f:
+        arbol = ast.parse(f.read(), ruta)
+    nodo = next(n for n in arbol.body if isinstance(n, ast.FunctionDef) and n.name == nombre)
+    espacio = {"pd": pd, "logging": logging, "datetime": datetime}
+    exec(compile(ast.Module(body=[nodo], type_ignores=[]), ruta, "exec"), espacio)
+    return espacio[nombre]
+
+
+def hora_siguiente_fila_a_fila(df):
+    """Recorrido anterior (copiado tal cual del script antes del cambio)."""
+    df = df.copy()
+    df['hora_ingreso_quirofano_dt'] = pd.to_datetime(
+        df['hora_ingreso_quirofano'], format='%H:%M:%S', errors='coerce'
+    )
+
+    df['hora_ingreso_siguiente'] = None
+
+    for i, row in df.iterrows():
+        if pd.isna(row['hora_ingreso_quirofano_dt']) or pd.isna(row['fecha_cirugia']):
+            continue
+
+        posteriores = df[
+            (df['fecha_cirugia'] == row['fecha_cirugia']) &
+            (df['pabellon'] == row['pabellon']) &
+            (df['hora_ingreso_quirofano_dt'] > row['hora_ingreso_quirofano_dt'])
+        ]
+
+        if not posteriores.empty:
+            siguiente = posteriores.sort_values(by='hora_ingreso_quirofano_dt').iloc[0]
+            hora_siguiente = siguiente['hora_ingreso_quirofano']
+            hora_egreso = row['hora_egreso_quirofano']
+
+            if pd.notnull(hora_egreso) and pd.notnull(hora_siguiente):
+                try:
+                    egreso_dt = datetime.strptime(hora_egreso, "%H:%M:%S")
+                    ingreso_sig_dt = datetime.strptime(hora_siguiente, "%H:%M:%S")
+                    if ingreso_sig_dt > egreso_dt:
+                        df.at[i, 'hora_ingreso_siguiente'] = hora_siguiente
+                except Exception as e:
+                    logging.warning(f"Error al validar hora siguiente en episodio {row['episodio']}: {e}")
+            else:
+                df.at[i, 'hora_ingreso_siguiente'] = hora_siguiente
+
+    df.drop(columns=['hora_ingreso_quirofano_dt'], inplace=True)
+    return df
+
+
+# ============================================================
+# FIXTURE
+# ============================================================
+D1 = date(2025, 3, 10)
+D2 = date(2025, 3, 11)
+
+# (episodio, fecha_cirugia, pabellon, ingreso, egreso, siguiente esperada, minutos esperados)
+CASOS = [
+    # Pabellón 1: dos cirugías entran a la misma hora; ambas apuntan a la próxima hora distinta
+    ("e01", D1, "PAB 1", "08:00:00", "09:00:00", "10:00:00", 60),
+    ("e02", D1, "PAB 1", "08:00:00", "09:30:00", "10:00:00", 30),
+    ("e03", D1, "PAB 1", "10:00:00", "11:00:00", "12:00:00", 60),
+    # Última del pabellón en el día: sin siguiente
+    ("e04", D1, "PAB 1", "12:00:00", "13:00:00", None, None),
+    # Pabellón 2: egreso nulo informa la siguiente sin recambio
+    ("e05", D1, "PAB 2", "08:30:00", None, "09:00:00", None),
+    # Egreso después del ingreso siguiente (solape): no se informa
+    ("e06", D1, "PAB 2", "09:00:00", "11:30:00", None, None),
+    ("e07", D1, "PAB 2", "11:00:00", "12:00:00", None, None),
+    # Empate en la última hora: ninguna tiene siguiente
+    ("e08", D1, "PAB 3", "15:00:00", "16:00:00", None, None),
+    ("e09", D1, "PAB 3", "15:00:00", "16:30:00", None, None),
+    # Egreso inválido: no se informa
+    ("e10", D2, "PAB 1", "08:00:00", "xx", None, None),
+    ("e11", D2, "PAB 1", "09:00:00", None, None, None),
+    # Egreso igual al ingreso siguiente: estrictamente posterior, no se informa
+    ("e12", D2, "PAB 2", "08:00:00", "10:00:00", None, None),
+    ("e13", D2, "PAB 2", "10:00:00", "10:45:00", None, None),
+    # Sin hora, sin fecha o sin pabellón: no cruzan
+    ("e14", D2, "PAB 3", None, "09:00:00", None, None),
+    ("e15", None, "PAB 3", "07:00:00", "08:00:00", None, None),
+    ("e16", D2, None, "07:00:00", "08:00:00", None, None),
+    ("e17", D2, "PAB 3", "11:00:00", None, None, None),
+]
+
+
+def fixture():
+    filas = [
+        {"episodio": c[0], "fecha_cirugia": c[1], "pabellon": c[2],
+         "hora_ingreso_quirofano": c[3], "hora_egreso_quirofano": c[4]}
+        for c in CASOS
+    ]
+    azar = random.Random(13)
+    for k in range(FILAS_ALEATORIAS):
+        ingreso = azar.randrange(7 * 60, 20 * 60, 15)
+        egreso = ingreso + azar.randrange(15, 240, 5)
+        r = azar.random()
+        filas.append({
+            "episodio": f"r{k:05d}",
+            "fecha_cirugia": None if r < 0.02 else date(2025, 4, 1 + azar.randrange(10)),
+            "pabellon": None if 0.02 <= r < 0.04 else f"PAB {azar.randrange(1, 6)}",
+            "hora_ingreso_quirofano": None if 0.04 <= r < 0.06 else f"{ingreso // 60:02d}:{ingreso % 60:02d}:00",
+            "hora_egreso_quirofano": (
+                None if 0.06 <= r < 0.12 else "" if 0.12 <= r < 0.13
+                else f"{min(egreso, 23 * 60 + 59) // 60:02d}:{min(egreso, 23 * 60 + 59) % 60:02d}:00"
+            ),
+        })
+    return pd.DataFrame(filas)
+
+
+def normalizar(serie):
+    return [None if pd.isna(v) else v for v in serie]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    calcular_hora_siguiente = cargar_funcion(SCRIPT, "calcular_hora_siguiente")
+    df = fixture()
+
+    inicio = time.perf_counter()
+    antes = hora_siguiente_fila_a_fila(df)
+    t_antes = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    despues = calcular_hora_siguiente(df)
+    t_despues = time.perf_counter() - inicio
+
+    errores = 0
+    assert list(despues['episodio']) == list(df['episodio']), "calcular_hora_siguiente cambió el orden de las filas"
+    for ep, a, d in zip(df['episodio'], normalizar(antes['hora_ingreso_siguiente']),
+                        normalizar(despues['hora_ingreso_siguiente'])):
+        if a != d:
+            errores += 1
+            if errores <= 10:
+                print(f"  {ep}: fila a fila={a!r} agrupado={d!r}")
+
+    esperados = despues.set_index('episodio')
+    for ep, _, _, _, _, siguiente, minutos in CASOS:
+        obtenido = (normalizar([esperados.at[ep, 'hora_ingreso_siguiente']])[0],
+                    esperados.at[ep, 'minutos_recambio'])
+        if obtenido != (siguiente, minutos):
+            errores += 1
+            print(f"  {ep}: esperado={(siguiente, minutos)!r} obtenido={obtenido!r}")
+
+    print(f"{len(df)} filas | fila a fila: {t_antes:.2f}s | agrupado: {t_despues:.3f}s")
+    if errores:
+        print(f"ERROR: {errores} diferencias")
+        sys.exit(1)
+    print("OK: hora_ingreso_siguiente idéntica y casos del fixture correctos")
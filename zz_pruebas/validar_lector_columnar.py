@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import z_comun.iris as iris
+
+# Compara el lector columnar (lector_columnar.jar) contra la conversión por
+# celda de jaydebeapi, consulta por consulta, sobre la misma conexión IRIS.
+# Termina con exit code 1 si alguna celda difiere. Correr después de
+# compilar el jar (README, paso 7):
+#     python zz_pruebas/validar_lector_columnar.py ["SELECT ..."]
+QUERIES = sys.argv[1:] or [
+    # Valores límite: decimales (jaydebeapi los entrega como float), dobles,
+    # fechas, timestamps, separador y escape dentro de un texto, NULL
+    """
+    SELECT
+        CAST(12 AS NUMERIC(10, 2)) AS entero_decimal,
+        CAST(0.00001 AS NUMERIC(12, 6)) AS decimal_chico,
+        CAST(-123456.789 AS NUMERIC(12, 3)) AS decimal_negativo,
+        CAST(1.5 AS DOUBLE) AS doble,
+        CAST(0.1 AS DOUBLE) AS doble_inexacto,
+        CAST(1E16 AS DOUBLE) AS doble_grande,
+        CURRENT_DATE AS fecha,
+        CURRENT_TIMESTAMP AS marca,
+        'a' || CHAR(31) || 'b' || CHAR(27) || 'c' AS texto_separador,
+        NULL AS nulo
+    """,
+    "SELECT TOP 5000 * FROM RB_OperatingRoom",
+    "SELECT TOP 5000 * FROM OR_Anaest_Operation",
+]
+
+
+def leer(conn, query, columnar):
+    iris._lector = None if columnar else False
+    inicio = time.perf_counter()
+    columnas, filas = iris.ejecutar_en_conexion(conn, query)
+    return columnas, filas, time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    conn = iris.conectar_iris()
+    errores = 0
+    try:
+        iris._lector = None
+        if not iris._lector_columnar():
+            print(f"ERROR: lector columnar no disponible ({iris.IRIS_LECTOR_JAR})")
+            sys.exit(1)
+
+        for query in QUERIES:
+            columnas, por_celda, t_celda = leer(conn, query, columnar=False)
+            _, columnar, t_columnar = leer(conn, query, columnar=True)
+            diferencias = 0
+            if len(por_celda) != len(columnar):
+                diferencias += 1
+                print(f"  filas: por celda={len(por_celda)} columnar={len(columnar)}")
+            for n, (a, b) in enumerate(zip(por_celda, columnar)):
+                for columna, x, y in zip(columnas, a, b):
+                    if x != y:
+                        diferencias += 1
+                        if diferencias <= 10:
+                            print(f"  fila {n}, {columna}: por celda={x!r} columnar={y!r}")
+            resumen = " ".join(query.split())[:60]
+            print(f"{resumen}... | {len(por_celda)} filas | por celda: {t_celda:.2f}s | "
+                  f"columnar: {t_columnar:.2f}s | {diferencias} diferencias")
+            errores += diferencias
+    finally:
+        conn.close()
+        iris.cerrar_iris()
+
+    if errores:
+        print(f"ERROR: {errores} diferencias")
+        sys.exit(1)
+    print("OK: el lector columnar entrega los mismos valores que jaydebeapi")